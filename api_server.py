@@ -0,0 +1,347 @@
+# api_server.py
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextvars
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+API_HOST = os.environ.get("API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("API_PORT", 8787))
+# Threads for forecasts, technicals and prompt context; models stay loaded in this process.
+API_WORKERS = int(os.environ.get("API_WORKERS", max(2, min(8, os.cpu_count() or 1))))
+# Suggestions waiting on Ollama get their own threads so they never block numeric requests.
+API_LLM_WORKERS = int(os.environ.get("API_LLM_WORKERS", 4))
+WATCHLIST_FILE = "data/watchlist.json"
+MAX_HEADER_BYTES = 16 * 1024
+
+REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the
+    computation and later callers await the same result. A caller that goes
+    away does not cancel the shared computation.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    async def do(self, key, factory):
+        self.stats["calls"] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._in_flight.pop(key, None) if self._in_flight.get(key) is t else None)
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+def _symbol(query: dict) -> str:
+    symbol = (query.get("symbol") or [""])[0].strip().upper()
+    if not symbol:
+        raise HTTPError(400, "Missing ?symbol=")
+    return symbol
+
+def _flag(query: dict, name: str, default: bool = True) -> bool:
+    value = (query.get(name) or [None])[0]
+    return default if value is None else value.lower() not in ("0", "false", "no")
+
+def _last_bar(symbol: str):
+    from history_store import days_to_dates
+    from history_cache import get_history
+    records = get_history(symbol)
+    if len(records) == 0:
+        raise ValueError(f"No history for {symbol}")
+    return str(days_to_dates(records["date"][-1:])[0]), float(records["close"][-1])
+
+def forecast_payload(symbol: str, horizons: tuple, window: int) -> dict:
+    from ml.predict import forecast
+    date, close = _last_bar(symbol)
+    predictions = forecast(symbol, horizons, window)
+    return {
+        "symbol": symbol,
+        "date": date,
+        "last_close": close,
+        "window": window,
+        "forecast": {str(h): price for h, price in predictions.items()},
+        "change_pct": {str(h): round((price / close - 1) * 100, 2) for h, price in predictions.items()},
+    }
+
+def technicals_payload(symbol: str) -> dict:
+    from ml.predict import get_technicals
+    date, close = _last_bar(symbol)
+    return {"symbol": symbol, "date": date, "last_close": close, "technicals": get_technicals(symbol)}
+
+def suggestion_inputs(symbol: str, refresh_news: bool = True) -> dict:
+    from llm_agent import gather_inputs
+    if refresh_news:
+        from news_service import refresh_news_sync
+        refresh_news_sync([symbol])
+    return gather_inputs(symbol, _last_bar(symbol)[1])
+
+def suggestion_payload(inputs: dict, use_cache: bool = True) -> dict:
+    from llm_agent import answer, parse_suggestion
+    response, cached = answer(inputs, use_cache=use_cache)
+    if response.startswith("❌"):
+        raise RuntimeError(response)
+    return {
+        "symbol": inputs["symbol"],
+        "date": inputs["date"],
+        "last_close": inputs["last_close"],
+        "forecast": {"1": inputs["predicted_price"], "5": inputs["predicted_week"], "20": inputs["predicted_month"]},
+        "technicals": inputs["technicals"],
+        **parse_suggestion(response),
+        "response": response,
+        "cached": cached,
+    }
+
+class ApiServer:
+    """
+    Minimal HTTP/1.1 JSON API on asyncio streams (keep-alive, GET only):
+
+        GET /forecast?symbol=TCS.NS&horizons=1,5,20&window=60
+        GET /technicals?symbol=TCS.NS
+        GET /suggest?symbol=TCS.NS&cache=1&news=1
+        GET /health, GET /stats
+
+    Histories and models stay cached in this process (history_cache,
+    model_registry); numeric work runs on a thread pool and identical
+    concurrent requests share one computation.
+    """
+
+    def __init__(self, workers: int = API_WORKERS, llm_workers: int = API_LLM_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="api")
+        self.llm_pool = ThreadPoolExecutor(max_workers=max(1, llm_workers), thread_name_prefix="api-llm")
+        self.flight = SingleFlight()
+        self.started = time.time()
+        self.requests = {}
+        self.server = None
+        self.routes = {
+            "/forecast": self.forecast,
+            "/technicals": self.technicals,
+            "/suggest": self.suggest,
+            "/health": self.health,
+            "/stats": self.stats,
+        }
+
+    async def _run(self, pool, fn, *args):
+        # Run in the pool with the caller's context, so spans nest under the request's trace.
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(pool, context.run, fn, *args)
+
+    async def forecast(self, query):
+        import tracing
+        symbol = _symbol(query)
+        try:
+            horizons = tuple(sorted({int(h) for h in (query.get("horizons") or ["1,5,20"])[0].split(",") if h}))
+            window = int((query.get("window") or ["60"])[0])
+        except ValueError:
+            raise HTTPError(400, "horizons and window must be integers")
+        if not horizons or horizons[0] < 1:
+            raise HTTPError(400, "horizons must be positive")
+
+        async def compute():
+            with tracing.trace("api.forecast", symbol=symbol):
+                return await self._run(self.pool, forecast_payload, symbol, horizons, window)
+        return await self.flight.do(("forecast", symbol, horizons, window), compute)
+
+    async def technicals(self, query):
+        import tracing
+        symbol = _symbol(query)
+
+        async def compute():
+            with tracing.trace("api.technicals", symbol=symbol):
+                return await self._run(self.pool, technicals_payload, symbol)
+        return await self.flight.do(("technicals", symbol), compute)
+
+    async def suggest(self, query):
+        import tracing
+        symbol = _symbol(query)
+        use_cache, news = _flag(query, "cache"), _flag(query, "news")
+
+        async def compute():
+            with tracing.trace("api.suggest", symbol=symbol):
+                inputs = await self._run(self.pool, suggestion_inputs, symbol, news)
+                return await self._run(self.llm_pool, suggestion_payload, inputs, use_cache)
+        return await self.flight.do(("suggest", symbol, use_cache, news), compute)
+
+    async def health(self, query):
+        return {"status": "ok", "uptime_seconds": round(time.time() - self.started, 1)}
+
+    async def stats(self, query):
+        from history_cache import cache_stats
+        from llm_scheduler import scheduler_stats
+        from ml.model_registry import registry_stats
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "single_flight": {**self.flight.stats, "in_flight": self.flight.in_flight()},
+            "models": registry_stats(),
+            "histories": cache_stats(),
+            "llm": scheduler_stats(),
+        }
+
+    async def dispatch(self, method: str, target: str):
+        parts = urlsplit(target)
+        handler = self.routes.get(parts.path.rstrip("/") or "/")
+        if handler is None:
+            raise HTTPError(404, f"Unknown endpoint {parts.path}")
+        if method != "GET":
+            raise HTTPError(405, "Only GET is supported")
+        stats = self.requests.setdefault(parts.path, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        started = time.perf_counter()
+        try:
+            return await handler(parse_qs(parts.query))
+        except HTTPError:
+            stats["errors"] += 1
+            raise
+        except FileNotFoundError as e:
+            stats["errors"] += 1
+            raise HTTPError(404, str(e))
+        except ValueError as e:
+            stats["errors"] += 1
+            raise HTTPError(400, str(e))
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            stats["count"] += 1
+            stats["total_ms"] = round(stats["total_ms"] + elapsed, 3)
+            stats["max_ms"] = round(max(stats["max_ms"], elapsed), 3)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 400, {"error": "Request headers too large"}, keep_alive=False)
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length:
+                    await reader.readexactly(length)  # request bodies are not used
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                if method == "OPTIONS":
+                    await self._respond(writer, 204, None, keep_alive)
+                else:
+                    try:
+                        status, payload = 200, await self.dispatch(method, target)
+                    except HTTPError as e:
+                        status, payload = e.status, {"error": str(e)}
+                    except Exception as e:
+                        status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                    await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass  # the client went away mid-response
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=str).encode("utf-8") if payload is not None else b""
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Access-Control-Allow-Origin: *\r\n"
+            f"Access-Control-Allow-Methods: GET, OPTIONS\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def warm_up(self, symbols):
+        """Load histories, models and indicator state for `symbols` so first requests are fast."""
+        def warm():
+            from history_cache import get_history
+            from ml.model_registry import warm_up
+            from ml.predict import get_technicals
+            for symbol in symbols:
+                try:
+                    get_history(symbol)
+                    get_technicals(symbol)
+                except Exception as e:
+                    print(f"⚠️ Failed to warm up {symbol}: {e}")
+            return warm_up(symbols)
+        started = time.monotonic()
+        loaded = await self._run(self.pool, warm)
+        print(f"🔥 Warmed up {len(symbols)} histories and {len(loaded)} models in {time.monotonic() - started:.1f}s")
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT):
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.llm_pool.shutdown(wait=False, cancel_futures=True)
+
+def load_watchlist(path=WATCHLIST_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f).get("stocks", [])
+    return []
+
+async def serve(host: str, port: int, workers: int, llm_workers: int, warm_symbols):
+    api = ApiServer(workers, llm_workers)
+    server = await api.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"🌐 API listening on http://{address[0]}:{address[1]} ({workers} workers)")
+    try:
+        if warm_symbols:
+            await api.warm_up(warm_symbols)
+        async with server:
+            await server.serve_forever()
+    finally:
+        api.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve forecasts, technicals and suggestions over HTTP.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    parser.add_argument("--llm-workers", type=int, default=API_LLM_WORKERS)
+    parser.add_argument("--no-warm", action="store_true", help="do not preload the watchlist's models")
+    args = parser.parse_args(argv)
+
+    warm = [] if args.no_warm else load_watchlist()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.llm_workers, warm))
+    except KeyboardInterrupt:
+        print("👋 API stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
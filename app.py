@@ -1,14 +1,45 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from llm_agent import suggest_trade
-from ml.predict import predict_next_close
-from stock_data import download_all_news
+import importlib
 import json
+import multiprocessing
 import subprocess
 import os
-import sys
+import queue
+import threading
+import time
+import tracing
+from task_executor import TaskExecutor
+
+# ML, pandas, TensorFlow, yfinance, bs4 and feedparser are imported lazily
+# inside the handlers that need them so the window appears immediately.
 
 WATCHLIST_FILE = "data/watchlist.json"
+# Import the heavy modules on a background thread once the window is up.
+PRELOAD_MODULES = os.environ.get("PRELOAD_MODULES", "1") != "0"
+PRELOAD_MODULE_NAMES = ["numpy", "history_cache", "ml.predict", "llm_agent", "news_service"]
+# Preload every watchlist model in the background when the window opens.
+WARM_UP_MODELS = os.environ.get("WARM_UP_MODELS", "1") != "0"
+# When set to a file path, startup milestones are appended to it as JSON lines
+# and the app runs one suggestion and exits (see benchmarks/startup_benchmark.py).
+STARTUP_BENCHMARK_FILE = os.environ.get("STARTUP_BENCHMARK")
+# Traces kept in the ⏱️ Timings tab (newest first).
+TIMING_PANEL_MAX = 50
+# Training runs one symbol per worker process; each TF process already uses several cores.
+TRAIN_PROCESSES = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+def _train_symbol(symbol):
+    """Process-pool entry point; imported lazily so the GUI process never loads TensorFlow for training."""
+    from ml.train_all import train_symbol
+    status = train_symbol(symbol, window=60)
+    if status["status"] == "failed":
+        raise RuntimeError(status["error"])
+    return status
+
+def _init_train_worker(workers):
+    """Size each training process's TF thread pools so the pool as a whole uses every core once."""
+    from ml.train_all import _init_worker, thread_settings
+    _init_worker(*thread_settings(workers))
 
 class StockLLMAssistantApp:
     def __init__(self, root):
@@ -18,9 +49,50 @@ class StockLLMAssistantApp:
         self.root.resizable(True, True)
 
         self.symbol_var = tk.StringVar()
-        self.result_text = tk.Text(root, wrap=tk.WORD, height=20, width=120)
+        self.status_var = tk.StringVar(value="Ready")
+        self.use_cache_var = tk.BooleanVar(value=True)
+        self.executor = TaskExecutor(root, process_workers=TRAIN_PROCESSES, process_initializer=_init_train_worker,
+                                     process_initargs=(TRAIN_PROCESSES,))
+        self.executor.listeners.append(self._on_task_event)
+        self.result_tabs = {}
+        # Finished traces arrive on worker threads; the Tk loop drains them.
+        self._traces = queue.SimpleQueue()
+        tracing.listeners.append(self._traces.put)
         self.build_ui()
         self.load_watchlist()
+        self.root.after_idle(self._on_first_idle)
+
+    def _on_first_idle(self):
+        self.root.update_idletasks()
+        self._mark_startup("first_window")
+        if STARTUP_BENCHMARK_FILE:
+            self.root.after(0, self._run_startup_benchmark)
+        elif PRELOAD_MODULES or WARM_UP_MODELS:
+            threading.Thread(target=self._preload, daemon=True).start()
+
+    def _preload(self):
+        if PRELOAD_MODULES:
+            for name in PRELOAD_MODULE_NAMES:
+                try:
+                    importlib.import_module(name)
+                except Exception as e:
+                    print(f"⚠️ Preload of {name} failed: {e}")
+        if WARM_UP_MODELS:
+            from ml.model_registry import warm_up
+            warm_up(self._get_stocks())
+
+    def _mark_startup(self, event):
+        if not STARTUP_BENCHMARK_FILE:
+            return
+        with open(STARTUP_BENCHMARK_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"event": event, "time": time.time()}) + "\n")
+
+    def _run_startup_benchmark(self):
+        def finished(_=None):
+            self._mark_startup("first_suggestion")
+            self.root.quit()
+        if not self.suggest_trade(on_finished=finished):
+            finished()
 
     def build_ui(self):
         frame = ttk.Frame(self.root, padding=10)
@@ -32,13 +104,105 @@ class StockLLMAssistantApp:
         self.symbol_dropdown.pack(side=tk.LEFT, padx=5)
 
         ttk.Button(frame, text="🧠 Suggest Trade", command=self.suggest_trade).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame, text="🧠 Suggest All", command=self.suggest_all).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(frame, text="⚡ Reuse answers", variable=self.use_cache_var).pack(side=tk.LEFT, padx=5)
         ttk.Button(frame, text="⚙️ Manage Stocks", command=self.manage_stocks_popup).pack(side=tk.LEFT, padx=5)
         ttk.Button(frame, text="🚀 Start Ollama", command=self.start_ollama).pack(side=tk.LEFT, padx=5)
         ttk.Button(frame, text="📥 Download", command=self.download_history).pack(side=tk.LEFT, padx=5)
         ttk.Button(frame, text="🔁 Train", command=self.train_model).pack(side=tk.LEFT, padx=5)
         ttk.Button(frame, text="❌ Exit", command=self.root.quit).pack(side=tk.RIGHT, padx=5)
 
-        self.result_text.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        # Status bar: current stage, progress and cancellation of running jobs
+        status = ttk.Frame(self.root, padding=(10, 0, 10, 5))
+        status.pack(side=tk.BOTTOM, fill=tk.X)
+        ttk.Label(status, textvariable=self.status_var, anchor=tk.W).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(status, text="⛔ Cancel", command=self.cancel_tasks).pack(side=tk.RIGHT, padx=5)
+        self.progress = ttk.Progressbar(status, length=200, mode="determinate", maximum=1.0)
+        self.progress.pack(side=tk.RIGHT, padx=5)
+
+        # One tab for general output plus one per analysed symbol
+        self.notebook = ttk.Notebook(self.root)
+        self.notebook.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        self.result_text = tk.Text(self.notebook, wrap=tk.WORD, height=20, width=120)
+        self.notebook.add(self.result_text, text="Output")
+
+        # Per-stage timings of each suggestion (see tracing.py)
+        if tracing.TRACE_ENABLED:
+            self.timings_tree = ttk.Treeview(self.notebook, columns=("ms", "details"), show="tree headings")
+            self.timings_tree.heading("#0", text="Stage")
+            self.timings_tree.heading("ms", text="ms")
+            self.timings_tree.heading("details", text="Details")
+            self.timings_tree.column("#0", width=300)
+            self.timings_tree.column("ms", width=80, anchor=tk.E)
+            self.timings_tree.column("details", width=560)
+            self.notebook.add(self.timings_tree, text="⏱️ Timings")
+            for record in tracing.load_traces(TIMING_PANEL_MAX):
+                self._show_trace(record)
+            self.root.after(250, self._poll_traces)
+
+    def _poll_traces(self):
+        while True:
+            try:
+                record = self._traces.get_nowait()
+            except queue.Empty:
+                break
+            self._show_trace(record)
+        self.root.after(250, self._poll_traces)
+
+    def _show_trace(self, record):
+        def insert(parent, node, label):
+            details = " ".join(f"{k}={v}" for k, v in node.get("attrs", {}).items())
+            item = self.timings_tree.insert(parent, 0 if parent == "" else tk.END, text=label,
+                                            values=(f"{node['duration_ms']:.1f}", details), open=parent == "")
+            for child in node.get("children", []):
+                insert(item, child, child["name"])
+
+        started = time.strftime("%H:%M:%S", time.localtime(record["time"]))
+        insert("", record, f"{started} {record['name']}")
+        for item in self.timings_tree.get_children("")[TIMING_PANEL_MAX:]:
+            self.timings_tree.delete(item)
+
+    def _result_widget(self, symbol, select=True):
+        if symbol not in self.result_tabs:
+            text = tk.Text(self.notebook, wrap=tk.WORD, height=20, width=120)
+            self.notebook.add(text, text=symbol)
+            self.result_tabs[symbol] = text
+        text = self.result_tabs[symbol]
+        if select:
+            self.notebook.select(text)
+        return text
+
+    def _show_result(self, symbol, content):
+        text = self._result_widget(symbol)
+        text.delete("1.0", tk.END)
+        text.insert(tk.END, content)
+
+    def _on_task_event(self, event, handle, payload):
+        running = list(self.executor.running.values())
+        if event == "progress":
+            if payload.get("message"):
+                self.status_var.set(payload["message"])
+            if payload.get("fraction") is not None:
+                self.progress.configure(mode="determinate", value=payload["fraction"])
+        elif event == "started":
+            self.status_var.set(f"{handle.name}…")
+        elif event in ("done", "error", "cancelled"):
+            timings = f" — {handle.timings()}" if handle.stages else ""
+            self.status_var.set(f"{handle.name} {event} in {handle.elapsed:.1f}s{timings}"
+                                + (f" ({len(running)} still running)" if running else ""))
+
+        if running and not any(t.name.startswith(("Download", "Train")) for t in running):
+            if str(self.progress["mode"]) != "indeterminate":
+                self.progress.configure(mode="indeterminate")
+                self.progress.start(15)
+        elif not running:
+            self.progress.stop()
+            self.progress.configure(mode="determinate", value=0)
+
+    def cancel_tasks(self):
+        if self.executor.running:
+            self.executor.cancel_all()
+            self.status_var.set("Cancelling…")
 
     def load_watchlist(self):
         if os.path.exists(WATCHLIST_FILE):
@@ -103,29 +267,80 @@ class StockLLMAssistantApp:
         ttk.Button(btn_frame, text="➖ Remove", command=remove).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="✅ Save", command=save_and_close).pack(side=tk.LEFT, padx=5)
 
-    def suggest_trade(self):
-        symbol = self.symbol_var.get().strip()
+    def suggest_trade(self, symbol=None, on_finished=None):
+        symbol = symbol or self.symbol_var.get().strip()
         if not symbol:
             messagebox.showwarning("Missing", "Please select a stock symbol")
-            return
-        try:
-            # Download news for all stocks before prediction
-            download_all_news()
-            predicted = predict_next_close(symbol)
-            last_close = self.get_last_close(symbol)
-            response = suggest_trade(symbol, last_close)
-            response += f"\n\n🧠 Predicted Close: ₹{predicted:.2f}"
-            self.result_text.delete("1.0", tk.END)
-            self.result_text.insert(tk.END, response)
-        except Exception as e:
-            self.result_text.delete("1.0", tk.END)
-            self.result_text.insert(tk.END, f"❌ Error: {e}")
+            return None
+
+        def done(response):
+            self._show_result(symbol, response)
+            if on_finished:
+                on_finished(response)
+
+        def failed(e):
+            self._show_result(symbol, f"❌ Error: {e}")
+            if on_finished:
+                on_finished(None)
+
+        def cancelled():
+            self._show_result(symbol, "⛔ Cancelled")
+            if on_finished:
+                on_finished(None)
+
+        streaming = {"started": False}
+
+        def progress(payload):
+            token = payload.get("token")
+            if token:
+                text = self._result_widget(symbol, select=False)
+                if not streaming["started"]:
+                    streaming["started"] = True
+                    text.delete("1.0", tk.END)
+                text.insert(tk.END, token)
+                text.see(tk.END)
+
+        self._show_result(symbol, f"⏳ Analysing {symbol}…")
+        return self.executor.submit(self._suggest_task, symbol, self.use_cache_var.get(), name=f"Suggest {symbol}",
+                                    on_done=done, on_error=failed, on_progress=progress,
+                                    on_cancelled=cancelled)
+
+    def suggest_all(self):
+        for symbol in self._get_stocks():
+            self.suggest_trade(symbol)
+
+    def _suggest_task(self, ctx, symbol, use_cache=True):
+        """Runs on a worker thread: must not touch Tk widgets."""
+        import llm_scheduler
+        from llm_agent import gather_inputs, build_prompt, answer
+        from prompt_builder import estimate_tokens
+        from news_service import refresh_news_sync
+
+        with tracing.trace("app.suggest_trade", symbol=symbol):
+            with ctx.stage("news"):
+                # Refresh (or serve from cache) only the selected stock's news
+                refresh_news_sync([symbol])
+            with ctx.stage("predict"):
+                last_close = self.get_last_close(symbol)
+                try:
+                    inputs = gather_inputs(symbol, last_close)
+                except Exception as e:
+                    return f"⚠️ Prediction error: {e}"
+            with ctx.stage("llm"):
+                prompt = build_prompt(inputs)
+                ctx.progress(message=f"{ctx.handle.name}: llm (prompt ~{estimate_tokens(prompt)} tokens)…")
+                # Stream tokens into the symbol's tab; stop generating as soon as the task is cancelled
+                response, cached = answer(inputs, use_cache=use_cache, prompt=prompt,
+                                          on_token=lambda token: False if ctx.cancelled else ctx.progress(token=token),
+                                          priority=llm_scheduler.INTERACTIVE, cancelled=ctx.handle.cancel_event)
+        if cached:
+            response += "\n\n⚡ Cached answer (nothing changed since it was generated)"
+        return response + f"\n\n🧠 Predicted Close: ₹{inputs['predicted_price']:.2f}"
 
     def get_last_close(self, symbol):
-        with open(f"stock_history/{symbol}.json", "r") as f:
-            data = json.load(f)
-        last_day = sorted(data.keys())[-1]
-        return float(data[last_day]["close"])
+        from history_store import last_close
+        from history_cache import get_history
+        return last_close(get_history(symbol))
 
 
     def start_ollama(self):
@@ -136,28 +351,69 @@ class StockLLMAssistantApp:
             messagebox.showerror("❌ Ollama Error", str(e))
 
     def download_history(self):
-        try:
-            subprocess.run(["python", "update_history.py"], check=True)
-            messagebox.showinfo("Success", "Downloaded stock history.")
-        except Exception as e:
-            messagebox.showerror("Download Failed", str(e))
+        symbols = self._get_stocks()
+        if not symbols:
+            messagebox.showwarning("Missing", "No stocks in the watchlist")
+            return
+
+        def task(ctx):
+            from history_downloader import download_watchlist
+            completed = []
+
+            def on_status(status):
+                completed.append(status)
+                ctx.progress(len(completed) / len(symbols), f"Downloaded {status['symbol']} ({status['status']})")
+
+            return download_watchlist(symbols, on_status=on_status, should_cancel=lambda: ctx.cancelled)
+
+        def done(statuses):
+            failed = [s["symbol"] for s in statuses if s["status"] == "failed"]
+            if failed:
+                messagebox.showerror("Download Failed", "Failed: " + ", ".join(failed))
+            else:
+                messagebox.showinfo("Success", "Downloaded stock history.")
+
+        self.executor.submit(task, name="Download history", on_done=done,
+                             on_error=lambda e: messagebox.showerror("Download Failed", str(e)))
 
     def train_model(self):
-        try:
-            result = subprocess.run(
-                [sys.executable, "-m", "ml.train_lstm_model"],
-                capture_output=True,
-                text=True,
-                check=True
+        symbols = self._get_stocks()
+        if not symbols:
+            messagebox.showwarning("Missing", "No stocks in the watchlist")
+            return
+        # One process-pool job per symbol so training uses several cores and
+        # cancelling stops every symbol that has not started yet.
+        results = {"done": [], "failed": [], "cancelled": []}
+
+        def finish_one(kind, symbol, detail=None):
+            results[kind].append(f"{symbol}: {detail}" if detail else symbol)
+            finished = sum(len(v) for v in results.values())
+            self.progress.configure(mode="determinate", value=finished / len(symbols))
+            if finished == len(symbols):
+                summary = f"Trained: {', '.join(results['done']) or '-'}"
+                if results["failed"]:
+                    summary += "\nFailed:\n" + "\n".join(results["failed"])
+                if results["cancelled"]:
+                    summary += f"\nCancelled: {', '.join(results['cancelled'])}"
+                self.result_text.insert(tk.END, summary + "\n")
+                if results["failed"]:
+                    messagebox.showerror("❌ Training Failed", summary)
+                else:
+                    messagebox.showinfo("✅ Training Complete", summary)
+
+        for symbol in symbols:
+            self.executor.submit_process(
+                _train_symbol, symbol, name=f"Train {symbol}",
+                on_done=lambda status, s=symbol: finish_one(
+                    "done", s, "unchanged, skipped" if status["status"] == "skipped" else None),
+                on_error=lambda e, s=symbol: finish_one("failed", s, e),
+                on_cancelled=lambda s=symbol: finish_one("cancelled", s),
             )
-            messagebox.showinfo("✅ Training Complete", result.stdout)
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("❌ Training Failed", e.stderr or e.stdout)
-        except Exception as e:
-            messagebox.showerror("❌ Error", str(e))
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = StockLLMAssistantApp(root)
     root.mainloop()
+    app.executor.shutdown()
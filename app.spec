@@ -1,12 +1,25 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+# Built as a one-folder app: a one-file exe has to unpack TensorFlow and the
+# rest of the ML stack into a temp directory on every launch before the
+# window can appear. The ML modules are imported lazily by app.py, so they
+# are listed explicitly to make sure they are bundled.
 
 a = Analysis(
     ['app.py'],
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=[
+        'llm_agent',
+        'stock_data',
+        'news_service',
+        'history_store',
+        'history_cache',
+        'ml.predict',
+        'ml.model_registry',
+        'ml.numpy_lstm',
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -19,16 +32,13 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='app',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
     upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +46,13 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    name='app',
+)
@@ -0,0 +1,234 @@
+"""
+Benchmark the hot paths on a synthetic dataset (see synthetic_data.py):
+history loading, forecasting, technicals, training windows, prompt assembly
+and the LLM round trip against a local fake Ollama (tools/fake_ollama.py).
+
+    python benchmarks/hot_paths.py --symbols 11 --days 2500 --output results.json
+    python benchmarks/hot_paths.py --root /tmp/bench --only predict   # reuse a dataset
+    python benchmarks/hot_paths.py --compare before.json after.json
+
+Each case's first call is reported separately as "first_ms" (model loads,
+indicator state builds, ...); every symbol is then warmed up and the case is
+timed --repeat times, cycling through the symbols. Timings are wall-clock
+milliseconds.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+def summarize(samples_ms: list) -> dict:
+    ordered = sorted(samples_ms)
+    return {
+        "calls": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+def run_case(fn, symbols: list, repeat: int) -> dict:
+    """
+    Time fn(symbol): the first call separately, then `repeat` calls cycling
+    through `symbols` after every symbol has been called once.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        fn(symbols[0])
+        first_ms = (time.perf_counter() - started) * 1000
+        for symbol in symbols[1:]:
+            fn(symbol)
+        samples = []
+        for i in range(repeat):
+            symbol = symbols[(i + 1) % len(symbols)]
+            started = time.perf_counter()
+            fn(symbol)
+            samples.append((time.perf_counter() - started) * 1000)
+    return {"first_ms": round(first_ms, 3), **summarize(samples)}
+
+def build_cases(manifest: dict, llm_url: str) -> dict:
+    """{name: fn(symbol)}, importing the app modules only after the working directory is set."""
+    import pandas as pd
+    import llm_client
+    import llm_agent
+    import llm_scheduler
+    import history_cache
+    from history_store import load_history, load_json_history, json_history_path, ohlcv_matrix, to_frame
+    from ml import predict
+    from ml.dataset import batches
+    from ml.indicators import compute_indicators
+    from ml.prepare_data import load_stock_data
+
+    llm_client.OLLAMA_API = llm_url
+    window = manifest["window"]
+    cases = {}
+
+    if manifest.get("json_histories"):
+        def history_json_dataframe(symbol):
+            # The original loader: parse the whole JSON file and transpose it into a frame.
+            with open(json_history_path(symbol), "r") as f:
+                return pd.DataFrame(json.load(f)).T
+        cases["history_json_dataframe"] = history_json_dataframe
+        cases["history_json_records"] = load_json_history
+
+    cases["history_store_load"] = lambda s: to_frame(load_history(s))
+    cases["history_cache_frame"] = history_cache.get_frame
+    cases["history_last_window"] = lambda s: ohlcv_matrix(history_cache.get_history(s)[-window:])
+
+    if manifest.get("models"):
+        cases["predict_next_close"] = lambda s: predict.predict_next_close(s, window)
+        cases["predict_multi_5"] = lambda s: predict.predict_multi(s, 5, window)
+        cases["forecast_1_5_20"] = lambda s: predict.forecast(s, (1, 5, 20), window)
+
+    cases["get_technicals"] = lambda s: predict.get_technicals(s, window)
+    cases["indicators_full_recompute"] = lambda s: compute_indicators(history_cache.get_history(s)["close"])
+
+    cases["prepare_data_windows"] = lambda s: load_stock_data(s, window)
+
+    def dataset_epoch(symbol):
+        X, y, _ = load_stock_data(symbol, window)
+        for _ in batches(X, y, batch_size=32, shuffle=True):
+            pass
+    cases["dataset_epoch_batches"] = dataset_epoch
+
+    if manifest.get("models"):
+        def last_close(symbol):
+            return float(history_cache.get_history(symbol)["close"][-1])
+
+        cases["prompt_assembly"] = lambda s: llm_agent.build_prompt(llm_agent.gather_inputs(s, last_close(s)))
+
+        prompt = llm_agent.build_prompt(llm_agent.gather_inputs(manifest["symbols"][0],
+                                                                last_close(manifest["symbols"][0])))
+        cases["llm_generate"] = lambda s: llm_scheduler.generate(prompt)
+        cases["suggest_trade"] = lambda s: llm_agent.suggest_trade(s, last_close(s), use_cache=False)
+    return cases
+
+def time_to_first_token(llm_url: str, repeat: int) -> dict:
+    import llm_scheduler
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            first = []
+
+            def on_token(token):
+                if not first:
+                    first.append((time.perf_counter() - started) * 1000)
+            llm_scheduler.generate("ping", on_token=on_token)
+            samples.extend(first)
+    return summarize(samples) if samples else None
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(before_path: str, after_path: str):
+    with open(before_path, "r", encoding="utf-8") as f:
+        before = json.load(f)["results"]
+    with open(after_path, "r", encoding="utf-8") as f:
+        after = json.load(f)["results"]
+    print(f"{'case':<28} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name in dict.fromkeys([*before, *after]):
+        a, b = before.get(name), after.get(name)
+        if not a or not b:
+            print(f"{name:<28} {'-' if not a else a['median_ms']:>10} {'-' if not b else b['median_ms']:>10}")
+            continue
+        ratio = a["median_ms"] / b["median_ms"] if b["median_ms"] else float("inf")
+        print(f"{name:<28} {a['median_ms']:>10.3f} {b['median_ms']:>10.3f} {ratio:>7.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", help="Existing synthetic dataset (default: generate one in a temp dir)")
+    parser.add_argument("--symbols", type=int, default=11)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", nargs="+", help="Run the cases whose names contain any of these")
+    parser.add_argument("--backend", choices=("keras", "numpy"), help="LSTM backend (default: LSTM_BACKEND)")
+    parser.add_argument("--llm-first-token", type=float, default=0.05, help="Fake Ollama delay before the first token (s)")
+    parser.add_argument("--llm-token", type=float, default=0.002, help="Fake Ollama delay per token (s)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    from benchmarks.synthetic_data import write_dataset
+    from tools.fake_ollama import start_fake_ollama
+
+    temp_dir = None
+    root = args.root
+    if root and os.path.exists(os.path.join(root, "synthetic.json")):
+        with open(os.path.join(root, "synthetic.json"), "r") as f:
+            manifest = json.load(f)
+    else:
+        if not root:
+            temp_dir = tempfile.TemporaryDirectory(prefix="stock-bench-")
+            root = temp_dir.name
+        print(f"Generating {args.symbols} symbols × {args.days} days in {root}...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            manifest = write_dataset(root, args.symbols, args.days, args.seed)
+
+    output = os.path.abspath(args.output) if args.output else None
+    # The app uses paths relative to the working directory; only the model directory is absolute.
+    os.chdir(root)
+    from ml import model_registry
+    model_registry.MODEL_DIR = os.path.join(os.path.abspath(root), "trained_models")
+    backend = args.backend or ("numpy" if manifest.get("models") and not manifest.get("keras_models")
+                               else model_registry.LSTM_BACKEND)
+    model_registry.set_backend(backend)
+
+    server, llm_url = start_fake_ollama(first_token_delay=args.llm_first_token, token_delay=args.llm_token)
+    results = {}
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            cases = build_cases(manifest, llm_url)
+        if args.only:
+            cases = {name: fn for name, fn in cases.items() if any(o in name for o in args.only)}
+        for name, fn in cases.items():
+            results[name] = run_case(fn, manifest["symbols"], args.repeat)
+            r = results[name]
+            print(f"{name:<28} median {r['median_ms']:>10.3f} ms  p95 {r['p95_ms']:>10.3f} ms  "
+                  f"first {r['first_ms']:>10.3f} ms")
+        if not args.only or any("llm" in o for o in args.only):
+            results["llm_time_to_first_token"] = time_to_first_token(llm_url, args.repeat)
+    finally:
+        server.shutdown()
+
+    report = {
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "platform": {"python": platform.python_version(), "machine": platform.machine(),
+                     "system": platform.system(), "cpus": os.cpu_count()},
+        "config": {"symbols": len(manifest["symbols"]), "days": manifest["days"], "seed": manifest["seed"],
+                   "window": manifest["window"], "backend": backend, "repeat": args.repeat,
+                   "llm_first_token": args.llm_first_token, "llm_token": args.llm_token},
+        "results": results,
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+    if temp_dir is not None:
+        os.chdir(PROJECT_ROOT)
+        temp_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Exercise the LLM request scheduler against a slow fake Ollama
+(tools/fake_ollama.py): a batch of low-priority requests like a watchlist
+scan, interactive requests arriving while it runs, one request with a tight
+deadline, one cancelled while queued and a few simulated 503s.
+
+    python benchmarks/llm_scheduler_load.py
+    python benchmarks/llm_scheduler_load.py --batch 40 --max-in-flight 2 --first-token 1.0
+
+Prints per-priority wait times, the scheduler's counters and the most
+requests the fake server saw at once; exits non-zero if the concurrency
+limit was exceeded or an interactive request waited behind the batch.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=12, help="low-priority requests submitted at once")
+    parser.add_argument("--interactive", type=int, default=3, help="interactive requests arriving mid-batch")
+    parser.add_argument("--max-in-flight", type=int, default=2)
+    parser.add_argument("--first-token", type=float, default=0.3, help="fake Ollama delay before the first token (s)")
+    parser.add_argument("--token", type=float, default=0.01, help="fake Ollama delay per token (s)")
+    parser.add_argument("--fail", type=int, default=2, help="answer this many requests with 503 first")
+    args = parser.parse_args()
+
+    import llm_client
+    import llm_scheduler
+    from llm_scheduler import LLMScheduler, INTERACTIVE, BATCH, PRIORITY_NAMES
+    from tools.fake_ollama import start_fake_ollama
+
+    server, url = start_fake_ollama(first_token_delay=args.first_token, token_delay=args.token)
+    server.fail_next = args.fail
+    llm_client.OLLAMA_API = url
+    scheduler = LLMScheduler(max_in_flight=args.max_in_flight, backoff=0.1)
+    llm_scheduler._scheduler = scheduler
+
+    results = []
+    lock = threading.Lock()
+
+    def request(name, priority, timeout=None, cancelled=None):
+        started = time.perf_counter()
+        try:
+            scheduler.generate(f"{name}: ping", priority=priority, timeout=timeout, cancelled=cancelled)
+            outcome = "ok"
+        except llm_scheduler.SchedulerError as e:
+            outcome = type(e).__name__
+        except Exception as e:
+            outcome = f"error: {e}"
+        with lock:
+            results.append({"name": name, "priority": PRIORITY_NAMES[priority], "outcome": outcome,
+                            "seconds": round(time.perf_counter() - started, 3)})
+
+    cancel = threading.Event()
+    threads = [threading.Thread(target=request, args=(f"batch-{i}", BATCH)) for i in range(args.batch)]
+    threads.append(threading.Thread(target=request, args=("tight-deadline", BATCH, 0.5)))
+    threads.append(threading.Thread(target=request, args=("cancelled", BATCH, None, cancel)))
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.first_token)
+    cancel.set()
+    interactive = [threading.Thread(target=request, args=(f"interactive-{i}", INTERACTIVE))
+                   for i in range(args.interactive)]
+    for t in interactive:
+        t.start()
+        time.sleep(0.05)
+    for t in threads + interactive:
+        t.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    for r in sorted(results, key=lambda r: r["seconds"]):
+        print(f"{r['name']:<16} {r['priority']:<12} {r['outcome']:<18} {r['seconds']:>7.3f}s")
+    stats = scheduler.stats()
+    print(json.dumps(stats, indent=2))
+    print(f"⏱️ {len(results)} requests in {elapsed:.1f}s; fake Ollama saw at most {server.max_in_flight} at once")
+
+    batch_waits = stats["wait_seconds"].get("batch", {})
+    interactive_waits = stats["wait_seconds"].get("interactive", {})
+    ok = server.max_in_flight <= args.max_in_flight
+    if interactive_waits and batch_waits:
+        ok = ok and interactive_waits["max"] < batch_waits["max"]
+    print("✅ Limits and priorities held" if ok else "❌ Scheduler limits or priorities were violated")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Measure GUI startup: time-to-first-window and time-to-first-suggestion.
+
+Runs the app (from source, or a frozen PyInstaller build with --exe) with the
+STARTUP_BENCHMARK environment variable pointing at a marks file. The app
+appends a timestamp when its window is first drawn and after its first
+Suggest Trade run, then exits.
+
+    python benchmarks/startup_benchmark.py --runs 3
+    python benchmarks/startup_benchmark.py --exe dist/app/app.exe --runs 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def run_once(command, timeout):
+    fd, marks_path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    env = dict(os.environ, STARTUP_BENCHMARK=marks_path)
+    try:
+        start = time.time()
+        subprocess.run(command, cwd=PROJECT_ROOT, env=env, timeout=timeout,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(marks_path, "r", encoding="utf-8") as f:
+            marks = [json.loads(line) for line in f if line.strip()]
+    finally:
+        os.remove(marks_path)
+    return {m["event"]: m["time"] - start for m in marks}
+
+def summarize(samples):
+    return {
+        "runs": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+    } if samples else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exe", help="Path to a frozen build; defaults to running app.py from source")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    command = [os.path.abspath(args.exe)] if args.exe else [sys.executable, os.path.join(PROJECT_ROOT, "app.py")]
+    runs = []
+    for i in range(args.runs):
+        marks = run_once(command, args.timeout)
+        runs.append(marks)
+        if "first_window" in marks and "first_suggestion" in marks:
+            print(f"Run {i + 1}: first window {marks['first_window']:.2f}s, "
+                  f"first suggestion {marks['first_suggestion']:.2f}s")
+        else:
+            print(f"Run {i + 1}: incomplete marks {marks}")
+
+    results = {
+        "command": command,
+        "frozen": bool(args.exe),
+        "time_to_first_window": summarize([r["first_window"] for r in runs if "first_window" in r]),
+        "time_to_first_suggestion": summarize([r["first_suggestion"] for r in runs if "first_suggestion" in r]),
+        "runs": runs,
+    }
+    print(json.dumps({k: results[k] for k in ("time_to_first_window", "time_to_first_suggestion")}, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
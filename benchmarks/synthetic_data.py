@@ -0,0 +1,192 @@
+"""
+Generate a synthetic dataset for the benchmarks: random-walk OHLCV histories
+for any number of symbols, untrained LSTM models with the production
+architecture, their scalers, a few headlines and trades per symbol, and
+optionally the legacy JSON histories.
+
+    python benchmarks/synthetic_data.py --root /tmp/bench --symbols 50 --days 5000
+
+The root gets the repository's layout (stock_history/, trained_models/,
+data/), so the app can be pointed at it by running from that directory.
+Prices are deterministic for a given --seed; dates end today.
+"""
+import os
+import sys
+import json
+import argparse
+import datetime
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from history_store import HISTORY_DTYPE, dates_to_days, records_to_dict, ohlcv_matrix
+
+LSTM_UNITS = 50  # same architecture as ml.train_lstm_model
+
+def symbol_names(count: int) -> list:
+    return [f"SYN{i:03d}.NS" for i in range(count)]
+
+def generate_history(days: int, seed: int = 0, start_price: float = None, end: str = None) -> np.ndarray:
+    """
+    `days` business days of geometric random-walk prices ending at `end`
+    (default today), with realistic open/high/low spreads and volumes.
+    """
+    rng = np.random.default_rng(seed)
+    end = np.datetime64(end or datetime.date.today().isoformat(), "D")
+    dates = np.busday_offset(end, -np.arange(days)[::-1], roll="backward")
+    start_price = start_price or float(rng.uniform(50, 5000))
+    returns = rng.normal(0.0003, rng.uniform(0.01, 0.025), days)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = close * np.exp(rng.normal(0, 0.005, days))
+    spread = np.abs(rng.normal(0, 0.01, days))
+    records = np.empty(days, dtype=HISTORY_DTYPE)
+    records["date"] = dates_to_days(dates.astype(str))
+    records["open"] = open_
+    records["high"] = np.maximum(open_, close) * (1 + spread)
+    records["low"] = np.minimum(open_, close) * (1 - spread)
+    records["close"] = close
+    records["volume"] = rng.lognormal(14, 0.5, days).astype(np.int64)
+    return records
+
+def write_context(root: str, names: list, seed: int = 0, headlines: int = 20, trades: int = 6):
+    """Legacy data/news.json and data/trade_log.json; data_repository imports them on first use."""
+    rng = np.random.default_rng(seed)
+    today = datetime.date.today()
+    news, trade_log = {}, []
+    for symbol in names:
+        base = symbol.split(".")[0]
+        news[symbol] = [
+            {"date": (today - datetime.timedelta(days=int(rng.integers(0, 45)))).isoformat(),
+             "headline": f"{base} {rng.choice(['rallies', 'slips', 'holds steady', 'reports results'])} "
+                         f"as analysts weigh outlook #{k} - Synthetic Wire"}
+            for k in range(headlines)
+        ]
+        for k in range(trades):
+            trade_log.append({
+                "date": (today - datetime.timedelta(days=int(rng.integers(1, 365)))).isoformat(),
+                "action": "BUY" if k % 3 != 2 else "SELL",
+                "symbol": symbol,
+                "price": round(float(rng.uniform(50, 5000)), 2),
+                "quantity": int(rng.integers(1, 20)),
+            })
+    with open(os.path.join(root, "data", "news.json"), "w") as f:
+        json.dump(news, f, indent=2)
+    with open(os.path.join(root, "data", "trade_log.json"), "w") as f:
+        json.dump(trade_log, f, indent=2)
+
+def _keras_model(path: str, window: int, seed: int):
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, Input
+    tf.keras.utils.set_random_seed(seed)
+    model = Sequential([
+        Input(shape=(window, 5)),
+        LSTM(LSTM_UNITS, return_sequences=True),
+        Dropout(0.2),
+        LSTM(LSTM_UNITS),
+        Dropout(0.2),
+        Dense(1),
+    ])
+    model.save(path)
+
+def _h5_model(path: str, window: int, seed: int):
+    """The Keras .h5 layout that ml.numpy_lstm reads, written without TensorFlow."""
+    import h5py
+    rng = np.random.default_rng(seed)
+    layers, weights = [], {}
+    inputs = 5
+    for name, return_sequences in (("lstm", True), ("lstm_1", False)):
+        limit = np.sqrt(6 / (inputs + 4 * LSTM_UNITS))
+        bias = np.zeros(4 * LSTM_UNITS, dtype=np.float32)
+        bias[LSTM_UNITS:2 * LSTM_UNITS] = 1.0  # unit forget bias, as Keras initializes it
+        weights[name] = {
+            "kernel": rng.uniform(-limit, limit, (inputs, 4 * LSTM_UNITS)).astype(np.float32),
+            "recurrent_kernel": np.linalg.qr(rng.normal(size=(4 * LSTM_UNITS, LSTM_UNITS)))[0].T.astype(np.float32),
+            "bias": bias,
+        }
+        layers.append({"class_name": "LSTM", "config": {
+            "name": name, "units": LSTM_UNITS, "return_sequences": return_sequences,
+            "activation": "tanh", "recurrent_activation": "sigmoid"}})
+        layers.append({"class_name": "Dropout", "config": {"name": f"dropout_{name}", "rate": 0.2}})
+        inputs = LSTM_UNITS
+    weights["dense"] = {"kernel": rng.normal(0, 0.1, (LSTM_UNITS, 1)).astype(np.float32),
+                        "bias": np.zeros(1, dtype=np.float32)}
+    layers.append({"class_name": "Dense", "config": {"name": "dense", "units": 1, "activation": "linear"}})
+    config = {"class_name": "Sequential", "config": {"name": "sequential", "layers": layers}}
+
+    with h5py.File(path, "w") as f:
+        f.attrs["model_config"] = json.dumps(config)
+        group = f.create_group("model_weights")
+        group.attrs["layer_names"] = [name.encode() for name in weights]
+        for name, values in weights.items():
+            layer = group.create_group(name)
+            names = [f"{name}/cell/{key}:0" for key in values]
+            layer.attrs["weight_names"] = [n.encode() for n in names]
+            for n, value in zip(names, values.values()):
+                layer.create_dataset(n, data=value)
+
+def write_model(path: str, window: int = 60, seed: int = 0, keras: bool = None):
+    """
+    Write an untrained model with random weights. Uses Keras (loadable by
+    both backends) when TensorFlow is installed, else h5py (numpy backend only).
+    """
+    if keras is None:
+        try:
+            import tensorflow  # noqa: F401
+            keras = True
+        except ImportError:
+            keras = False
+    (_keras_model if keras else _h5_model)(path, window, seed)
+    return keras
+
+def write_dataset(root: str, symbols: int = 11, days: int = 2500, seed: int = 0, window: int = 60,
+                  models: bool = True, json_histories: bool = True, keras: bool = None) -> dict:
+    """Write the dataset under `root` and return a manifest (also saved as root/synthetic.json)."""
+    import joblib
+    from sklearn.preprocessing import MinMaxScaler
+    from ml.model_registry import safe_model_name
+
+    names = symbol_names(symbols)
+    for sub in ("stock_history", "trained_models", "data"):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+    for i, symbol in enumerate(names):
+        records = generate_history(days, seed=seed * 100003 + i)
+        np.save(os.path.join(root, "stock_history", f"{symbol}.npy"), records)
+        if json_histories:
+            with open(os.path.join(root, "stock_history", f"{symbol}.json"), "w") as f:
+                json.dump(records_to_dict(records), f)
+        if models:
+            base = os.path.join(root, "trained_models", safe_model_name(symbol))
+            keras = write_model(f"{base}_lstm_model.h5", window, seed + i, keras)
+            joblib.dump(MinMaxScaler().fit(ohlcv_matrix(records)), f"{base}_scaler.save")
+    with open(os.path.join(root, "data", "watchlist.json"), "w") as f:
+        json.dump({"stocks": names}, f, indent=2)
+    write_context(root, names, seed)
+
+    manifest = {"symbols": names, "days": days, "seed": seed, "window": window,
+                "models": models, "keras_models": bool(models and keras), "json_histories": json_histories}
+    with open(os.path.join(root, "synthetic.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", required=True, help="Directory to write the dataset to")
+    parser.add_argument("--symbols", type=int, default=11)
+    parser.add_argument("--days", type=int, default=2500, help="Trading days per symbol (~250 per year)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--no-models", action="store_true", help="Only write histories")
+    parser.add_argument("--no-json", action="store_true", help="Skip the legacy JSON histories")
+    parser.add_argument("--h5py", action="store_true", help="Write models without TensorFlow (numpy backend only)")
+    args = parser.parse_args()
+
+    manifest = write_dataset(args.root, args.symbols, args.days, args.seed, args.window,
+                             models=not args.no_models, json_histories=not args.no_json,
+                             keras=False if args.h5py else None)
+    print(f"✅ {len(manifest['symbols'])} symbols × {manifest['days']} days written to {args.root}")
+
+if __name__ == "__main__":
+    main()
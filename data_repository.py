@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+import datetime
+import threading
+
+DB_PATH = "data/assistant.db"
+TRADE_LOG_PATH = "data/trade_log.json"
+NEWS_PATH = "data/news.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    action TEXT NOT NULL,
+    price NUMERIC NOT NULL,
+    quantity NUMERIC,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS trades_symbol_date ON trades (symbol, date);
+
+CREATE TABLE IF NOT EXISTS news (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    headline TEXT NOT NULL,
+    link TEXT,
+    UNIQUE (symbol, date, headline)
+);
+CREATE INDEX IF NOT EXISTS news_symbol_date ON news (symbol, date);
+
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    rows INTEGER
+);
+"""
+
+_local = threading.local()
+# The JSON import runs once per process; BEGIN IMMEDIATE keeps other processes out while it does.
+_migrate_lock = threading.RLock()
+_migrated = set()
+
+def connect(path: str = None) -> sqlite3.Connection:
+    """
+    Per-thread connection to the repository, created on first use. A new
+    database imports the legacy data/trade_log.json and data/news.json.
+    """
+    path = path or DB_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        connections[path] = conn
+        if path == DB_PATH and path not in _migrated:
+            migrate_json(path=path)
+    return conn
+
+def _insert_trades(conn, trades) -> int:
+    rows = [
+        (t["symbol"], t["date"], str(t["action"]), t["price"], t.get("quantity"), t.get("note"))
+        for t in trades
+    ]
+    conn.executemany(
+        "INSERT INTO trades (symbol, date, action, price, quantity, note) VALUES (?, ?, ?, ?, ?, ?)", rows
+    )
+    return len(rows)
+
+def _insert_news(conn, symbol, items) -> int:
+    rows = [(symbol, item["date"], item["headline"], item.get("link")) for item in items]
+    before = conn.total_changes
+    conn.executemany("INSERT OR IGNORE INTO news (symbol, date, headline, link) VALUES (?, ?, ?, ?)", rows)
+    return conn.total_changes - before
+
+def add_trades(trades, path: str = None) -> int:
+    """Append trade dicts ({date, action, symbol, price[, quantity, note]}) in one transaction."""
+    conn = connect(path)
+    with conn:
+        return _insert_trades(conn, trades)
+
+def _where(symbol, start, end):
+    clauses, args = [], []
+    if symbol is not None:
+        clauses.append("symbol = ?")
+        args.append(symbol)
+    if start:
+        clauses.append("date >= ?")
+        args.append(start)
+    if end:
+        clauses.append("date <= ?")
+        args.append(end)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+def get_trades(symbol: str = None, start: str = None, end: str = None, path: str = None) -> list:
+    """Trades (all symbols if `symbol` is None) between ISO dates `start` and `end`, oldest first."""
+    where, args = _where(symbol, start, end)
+    rows = connect(path).execute(
+        "SELECT symbol, date, action, price, quantity, note FROM trades" + where + " ORDER BY date, id", args
+    ).fetchall()
+    return [{k: row[k] for k in row.keys() if row[k] is not None} for row in rows]
+
+def add_news(symbol: str, items, path: str = None) -> int:
+    """
+    Append-only ingestion of `symbol`'s headlines ({date, headline[, link]});
+    headlines already stored for the same date are ignored. Returns the number added.
+    """
+    conn = connect(path)
+    with conn:
+        return _insert_news(conn, symbol, items)
+
+def get_news(symbol: str, start: str = None, end: str = None, limit: int = None, path: str = None) -> list:
+    """`symbol`'s headlines between ISO dates `start` and `end`, newest first."""
+    where, args = _where(symbol, start, end)
+    query = "SELECT date, headline, link FROM news" + where + " ORDER BY date DESC, id"
+    if limit:
+        query += " LIMIT ?"
+        args.append(int(limit))
+    rows = connect(path).execute(query, args).fetchall()
+    return [{k: row[k] for k in row.keys() if row[k] is not None} for row in rows]
+
+def _load_json(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        return json.loads(content) if content else default
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        print(f"⚠️ Failed to load {path}: {e}")
+        return default
+
+def migrate_json(trade_path: str = TRADE_LOG_PATH, news_path: str = NEWS_PATH, path: str = None) -> dict:
+    """
+    Import the legacy JSON trade log and news file. Each file is imported once
+    (recorded in the migrations table), so this is safe to call repeatedly,
+    from any number of threads or processes; edits made to a file after it
+    was imported are ignored (record new trades with `--add-trade`). Returns
+    {file: rows imported} for the files imported by this call.
+    """
+    path = path or DB_PATH
+    with _migrate_lock:
+        conn = connect(path)
+        imported = {}
+        # Check and import in one write transaction, so a second process waits and then sees the rows.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = {row["name"] for row in conn.execute("SELECT name FROM migrations")}
+            if trade_path not in done and os.path.exists(trade_path):
+                trades = _load_json(trade_path, [])
+                imported[trade_path] = _insert_trades(conn, trades if isinstance(trades, list) else [])
+            if news_path not in done and os.path.exists(news_path):
+                news = _load_json(news_path, {})
+                imported[news_path] = sum(_insert_news(conn, symbol, items) for symbol, items in
+                                          (news.items() if isinstance(news, dict) else []))
+            conn.executemany("INSERT INTO migrations (name, rows) VALUES (?, ?)", imported.items())
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        _migrated.add(path)
+    for name, rows in imported.items():
+        print(f"✅ Imported {rows} rows from {name}")
+    return imported
+
+def export_news_json(symbols, news_path: str = NEWS_PATH, path: str = None):
+    """Write the stored headlines of `symbols` in the legacy {symbol: [items]} layout."""
+    data = {symbol: get_news(symbol, path=path) for symbol in symbols}
+    tmp_path = news_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, news_path)
+
+def _number(value: str) -> str:
+    float(value)  # validate, but store the text so the NUMERIC column keeps "3" as 3, not 3.0
+    return value
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trades and news stored in data/assistant.db.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--add-trade", nargs="+", metavar="ARG",
+                       help="record a trade: SYMBOL BUY|SELL PRICE [QUANTITY]")
+    group.add_argument("--trades", nargs="?", const="", metavar="SYMBOL", help="list trades (of SYMBOL)")
+    group.add_argument("--migrate", action="store_true", help="import data/trade_log.json and data/news.json")
+    group.add_argument("--stats", action="store_true", help="per-symbol row counts")
+    parser.add_argument("--date", default=None, help="trade date (YYYY-MM-DD, default today)")
+    parser.add_argument("--note", default=None, help="free-text note stored with the trade")
+    args = parser.parse_args(argv)
+
+    if args.add_trade:
+        if len(args.add_trade) not in (3, 4):
+            parser.error("--add-trade takes SYMBOL BUY|SELL PRICE [QUANTITY]")
+        symbol, action, price, *quantity = args.add_trade
+        action = action.upper()
+        if action not in ("BUY", "SELL"):
+            parser.error(f"action must be BUY or SELL, not {action!r}")
+        try:
+            date = (datetime.date.fromisoformat(args.date) if args.date else datetime.date.today()).isoformat()
+            trade = {"symbol": symbol.upper(), "date": date, "action": action, "price": _number(price),
+                     "quantity": _number(quantity[0]) if quantity else None, "note": args.note}
+        except ValueError as e:
+            parser.error(str(e))
+        add_trades([trade])
+        print(f"✅ Recorded {action} {symbol.upper()} @ {price}{f' × {quantity[0]}' if quantity else ''} on {date}")
+    elif args.trades is not None:
+        for t in get_trades(args.trades.upper() or None):
+            print(f"{t['date']} {t['symbol']:<14} {t['action']:<4} {t['price']:>10} {t.get('quantity', ''):>6}"
+                  f"  {t.get('note', '')}".rstrip())
+    elif args.migrate:
+        migrate_json()
+    else:
+        conn = connect()
+        for table in ("trades", "news"):
+            for row in conn.execute(f"SELECT symbol, COUNT(*) AS n, MAX(date) AS last FROM {table} GROUP BY symbol"):
+                print(f"{table} {row['symbol']}: {row['n']} rows, last {row['last']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from history_store import load_history, history_source, to_frame
+
+# Upper bound for all cached histories (record arrays plus any frames built from them).
+HISTORY_CACHE_MAX_BYTES = int(os.environ.get("HISTORY_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+class _Entry:
+    def __init__(self, records, signature):
+        self.records = records
+        self.signature = signature
+        self.frame = None
+
+    @property
+    def nbytes(self):
+        size = self.records.nbytes
+        if self.frame is not None:
+            size += int(self.frame.memory_usage(index=True, deep=False).sum())
+        return size
+
+_lock = threading.RLock()
+_entries = OrderedDict()
+_max_bytes = HISTORY_CACHE_MAX_BYTES
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _signature(path: str):
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+def _evict():
+    total = sum(entry.nbytes for entry in _entries.values())
+    # Never evict the most recently used entry, even if it alone exceeds the cap.
+    while total > _max_bytes and len(_entries) > 1:
+        _, entry = _entries.popitem(last=False)
+        total -= entry.nbytes
+        _stats["evictions"] += 1
+
+def _get_entry(symbol: str) -> _Entry:
+    path = history_source(symbol)
+    if path is None:
+        raise FileNotFoundError(f"Stock history for {symbol} not found")
+    signature = _signature(path)
+    with _lock:
+        entry = _entries.get(symbol)
+        if entry is not None and entry.signature == signature:
+            _entries.move_to_end(symbol)
+            _stats["hits"] += 1
+            return entry
+        _stats["misses"] += 1
+
+    # Parse outside the lock so one slow symbol does not block the others.
+    records = np.array(load_history(symbol))
+    records.setflags(write=False)
+    entry = _Entry(records, signature)
+    with _lock:
+        _entries[symbol] = entry
+        _entries.move_to_end(symbol)
+        _evict()
+    return entry
+
+def get_history(symbol: str) -> np.ndarray:
+    """
+    Return the sorted, read-only OHLCV record array for `symbol`, parsing the
+    file only when it is not cached or has changed on disk since it was cached.
+    """
+    return _get_entry(symbol).records
+
+def get_frame(symbol: str):
+    """
+    Return the history as a float DataFrame indexed by ISO date. The frame is
+    shared between callers, so treat it as read-only.
+    """
+    entry = _get_entry(symbol)
+    with _lock:
+        if entry.frame is None:
+            entry.frame = to_frame(entry.records)
+            _evict()
+        return entry.frame
+
+def invalidate(symbol: str = None):
+    """Drop one symbol (or everything when `symbol` is None) from the cache."""
+    with _lock:
+        if symbol is None:
+            _entries.clear()
+        else:
+            _entries.pop(symbol, None)
+
+def set_max_bytes(max_bytes: int):
+    global _max_bytes
+    with _lock:
+        _max_bytes = int(max_bytes)
+        _evict()
+
+def cache_stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "symbols": list(_entries.keys()),
+            "bytes": sum(entry.nbytes for entry in _entries.values()),
+            "max_bytes": _max_bytes,
+        }
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+from history_store import append_history, merge_history, frame_to_records, last_stored_date
+
+FULL_HISTORY_START = "2013-01-01"
+DOWNLOAD_STATUS_FILE = "data/download_status.json"
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 20
+# Requests per second allowed per host, and how many may be sent in a burst.
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 20
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: int = 1):
+        tokens = min(float(tokens), self.burst)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def host_limiter(host: str, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST) -> RateLimiter:
+    """Return the process-wide limiter for `host`, creating it on first use."""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = RateLimiter(rate, burst)
+        return _limiters[host]
+
+class YFinanceFetcher:
+    """
+    Fetch daily OHLCV frames from Yahoo Finance. Several symbols are fetched
+    with one multi-ticker yf.download call; a single symbol uses Ticker.history.
+    """
+    host = "query1.finance.yahoo.com"
+
+    def __init__(self, threads: int = DEFAULT_WORKERS):
+        self.threads = threads
+        # yf.download keeps per-call results in module globals, so batch calls must not overlap.
+        self.download_lock = threading.Lock()
+
+    def __call__(self, symbols, start, end) -> dict:
+        import yfinance as yf
+        if len(symbols) == 1:
+            df = yf.Ticker(symbols[0]).history(start=start, end=end)
+            return {symbols[0]: df}
+        with self.download_lock:
+            df = yf.download(symbols, start=start, end=end, group_by="ticker",
+                             threads=self.threads, progress=False)
+        frames = {}
+        for symbol in symbols:
+            if isinstance(df.columns, pd.MultiIndex) and symbol in df.columns.get_level_values(0):
+                frames[symbol] = df[symbol]
+        return frames
+
+def download_start(symbol: str, incremental: bool = True) -> str:
+    """First date to request: the day after the last stored bar in incremental mode."""
+    last = last_stored_date(symbol) if incremental else None
+    if last is None:
+        return FULL_HISTORY_START
+    return (pd.Timestamp(last) + timedelta(days=1)).strftime("%Y-%m-%d")
+
+def _plan_batches(symbols, incremental, end, batch_size):
+    """Group symbols that need the same start date into batches; report the ones already current."""
+    by_start, current = {}, []
+    for symbol in symbols:
+        start = download_start(symbol, incremental)
+        if start >= end:
+            current.append(symbol)
+        else:
+            by_start.setdefault(start, []).append(symbol)
+    batches = []
+    for start, group in sorted(by_start.items()):
+        for i in range(0, len(group), batch_size):
+            batches.append((start, group[i:i + batch_size]))
+    return batches, current
+
+def _run_batch(fetcher, limiter, start, end, symbols, incremental, retries, backoff):
+    began = time.monotonic()
+    frames, error, attempts = None, None, 0
+    for attempt in range(1, retries + 2):
+        attempts = attempt
+        limiter.acquire(len(symbols))
+        try:
+            frames = fetcher(symbols, start, end)
+            error = None
+            break
+        except Exception as e:
+            error = e
+            if attempt <= retries:
+                time.sleep(backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.25))
+
+    statuses = []
+    for symbol in symbols:
+        status = {"symbol": symbol, "start": start, "attempts": attempts, "rows": 0, "error": None}
+        if frames is None:
+            status.update(status="failed", error=str(error))
+        else:
+            df = frames.get(symbol)
+            try:
+                records = frame_to_records(df) if df is not None and not df.empty else None
+                if records is None or len(records) == 0:
+                    status["status"] = "no_data"
+                else:
+                    added = append_history(symbol, records) if incremental else merge_history(symbol, records)
+                    status.update(status="updated" if added else "up_to_date", rows=added)
+            except Exception as e:
+                status.update(status="failed", error=str(e))
+        status["seconds"] = round(time.monotonic() - began, 3)
+        statuses.append(status)
+    return statuses
+
+def download_watchlist(symbols, incremental=True, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                       retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, rate=None, fetcher=None,
+                       on_status=None, should_cancel=None, status_path=DOWNLOAD_STATUS_FILE) -> list:
+    """
+    Update the history of every symbol in `symbols` concurrently.
+
+    Symbols are grouped into batches that share a start date; each batch is
+    one fetcher call on a bounded thread pool, throttled by the per-host rate
+    limiter (`rate` overrides its requests per second) and retried with
+    exponential backoff. `fetcher(symbols, start, end)`
+    must return {symbol: OHLCV DataFrame}; it defaults to YFinanceFetcher and
+    can be swapped for a stub (see tools/stub_ohlcv.py). `on_status` is called
+    with each symbol's status dict as it completes; once `should_cancel()`
+    returns True, batches that have not started are skipped and reported as
+    cancelled. Returns all statuses.
+    """
+    fetcher = fetcher or YFinanceFetcher(threads=workers)
+    limiter = host_limiter(getattr(fetcher, "host", "default"))
+    if rate:
+        limiter.rate = float(rate)
+    end = datetime.today().strftime("%Y-%m-%d")
+    batches, current = _plan_batches(list(dict.fromkeys(symbols)), incremental, end, batch_size)
+
+    statuses = []
+    def report(status):
+        statuses.append(status)
+        if on_status:
+            on_status(status)
+
+    for symbol in current:
+        report({"symbol": symbol, "status": "up_to_date", "rows": 0, "attempts": 0, "seconds": 0.0, "error": None})
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(_run_batch, fetcher, limiter, start, end, batch, incremental, retries, backoff)
+            for start, batch in batches
+        ]
+        pending = dict(zip(futures, batches))
+        for future in as_completed(futures):
+            del pending[future]
+            if future.cancelled():
+                continue
+            for status in future.result():
+                report(status)
+            if should_cancel and should_cancel():
+                for other in list(pending):
+                    if other.cancel():
+                        for symbol in pending.pop(other)[1]:
+                            report({"symbol": symbol, "status": "cancelled", "rows": 0, "attempts": 0,
+                                    "seconds": 0.0, "error": None})
+
+    if status_path:
+        os.makedirs(os.path.dirname(status_path) or ".", exist_ok=True)
+        with open(status_path, "w") as f:
+            json.dump({"finished": datetime.now().isoformat(timespec="seconds"), "symbols": statuses}, f, indent=2)
+    return statuses
+
+def print_report(statuses):
+    icons = {"updated": "✅", "up_to_date": "✅", "no_data": "⚠️", "failed": "❌", "cancelled": "⛔"}
+    for s in sorted(statuses, key=lambda s: s["symbol"]):
+        detail = f"+{s['rows']} rows" if s["status"] == "updated" else s["status"].replace("_", " ")
+        if s.get("error"):
+            detail += f": {s['error']}"
+        print(f"{icons.get(s['status'], '•')} {s['symbol']}: {detail} ({s['attempts']} attempts, {s['seconds']:.2f}s)")
@@ -0,0 +1,286 @@
+import io
+import os
+import sys
+import json
+import numpy as np
+
+HISTORY_DIR = "stock_history"
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+# One packed record per trading day. `date` is days since 1970-01-01 so the
+# whole file can be memory-mapped and sliced without any parsing.
+HISTORY_DTYPE = np.dtype([
+    ("date", "<i4"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<i8"),
+])
+
+def history_path(symbol: str) -> str:
+    return os.path.join(HISTORY_DIR, f"{symbol}.npy")
+
+def json_history_path(symbol: str) -> str:
+    return os.path.join(HISTORY_DIR, f"{symbol}.json")
+
+def history_source(symbol: str):
+    """
+    Return the file backing `symbol`'s history: the binary store if present,
+    otherwise the legacy JSON file. None if neither exists.
+    """
+    for path in (history_path(symbol), json_history_path(symbol)):
+        if os.path.exists(path):
+            return path
+    return None
+
+def empty_history() -> np.ndarray:
+    return np.empty(0, dtype=HISTORY_DTYPE)
+
+def dates_to_days(dates) -> np.ndarray:
+    """Convert ISO date strings / datetimes to int32 days since the epoch."""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int32)
+
+def days_to_dates(days) -> np.ndarray:
+    """Convert int32 day numbers back to ISO date strings."""
+    return np.asarray(days, dtype=np.int64).astype("datetime64[D]").astype(str)
+
+def records_from_dict(data: dict) -> np.ndarray:
+    """
+    Build a sorted record array from the legacy {date: {open, high, ...}} layout.
+    """
+    if not data:
+        return empty_history()
+    records = np.empty(len(data), dtype=HISTORY_DTYPE)
+    records["date"] = dates_to_days(list(data.keys()))
+    rows = list(data.values())
+    for field in FIELDS:
+        records[field] = [row[field] for row in rows]
+    return np.sort(records, order="date")
+
+def records_to_dict(records: np.ndarray) -> dict:
+    """Inverse of records_from_dict, used for exports and debugging."""
+    out = {}
+    for day, row in zip(days_to_dates(records["date"]), records):
+        out[day] = {
+            "open": float(row["open"]),
+            "high": float(row["high"]),
+            "low": float(row["low"]),
+            "close": float(row["close"]),
+            "volume": int(row["volume"]),
+        }
+    return out
+
+def load_json_history(symbol: str) -> np.ndarray:
+    with open(json_history_path(symbol), "r") as f:
+        return records_from_dict(json.load(f))
+
+def load_history(symbol: str, mmap: bool = True) -> np.ndarray:
+    """
+    Load the sorted OHLCV record array for `symbol`.
+
+    The binary store is memory-mapped by default, so only the pages that are
+    actually touched get read. Symbols that have not been migrated yet fall
+    back to parsing the legacy JSON file.
+    """
+    path = history_path(symbol)
+    if os.path.exists(path):
+        return np.load(path, mmap_mode="r" if mmap else None)
+    if os.path.exists(json_history_path(symbol)):
+        return load_json_history(symbol)
+    raise FileNotFoundError(f"Stock history for {symbol} not found in {HISTORY_DIR}")
+
+def save_history(symbol: str, records: np.ndarray):
+    """
+    Write `records` as the binary history for `symbol`. The file is written
+    next to the target and renamed into place so readers never see a partial file.
+    """
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    records = np.sort(np.asarray(records, dtype=HISTORY_DTYPE), order="date")
+    path = history_path(symbol)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, records)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _read_npy_header(f):
+    """Return (version, shape, dtype, data_offset) for an open .npy file."""
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if fortran_order or len(shape) != 1:
+        raise ValueError("History file is not a 1-D record array")
+    return version, shape, dtype, f.tell()
+
+def _npy_header_bytes(version, length: int) -> bytes:
+    header = io.BytesIO()
+    d = {"descr": np.lib.format.dtype_to_descr(HISTORY_DTYPE), "fortran_order": False, "shape": (length,)}
+    if version == (1, 0):
+        np.lib.format.write_array_header_1_0(header, d)
+    else:
+        np.lib.format.write_array_header_2_0(header, d)
+    return header.getvalue()
+
+def last_stored_date(symbol: str):
+    """ISO date of the newest stored bar for `symbol`, or None if there is no history."""
+    if history_source(symbol) is None:
+        return None
+    records = load_history(symbol)
+    if len(records) == 0:
+        return None
+    return str(days_to_dates(records["date"][-1:])[0])
+
+def merge_history(symbol: str, records: np.ndarray) -> int:
+    """
+    Merge `records` into the stored history, keeping existing rows for dates
+    that are already present, and atomically rewrite the file. Used for
+    backfills; returns the number of rows added.
+    """
+    existing = load_history(symbol, mmap=False) if history_source(symbol) else empty_history()
+    records = np.asarray(records, dtype=HISTORY_DTYPE)
+    new = records[~np.isin(records["date"], existing["date"])]
+    if len(new) or not os.path.exists(history_path(symbol)):
+        save_history(symbol, np.concatenate([existing, new]))
+    return len(new)
+
+def append_history(symbol: str, records: np.ndarray) -> int:
+    """
+    Append the rows of `records` that are newer than the last stored bar.
+
+    Existing data is never rewritten: the new rows are written after the end
+    of the .npy data and flushed, and only then is the header's row count
+    patched in place (numpy reserves header space for this). A crash before
+    the header update leaves the old history intact; the stray tail is
+    truncated on the next append. Returns the number of rows appended.
+    """
+    records = np.sort(np.asarray(records, dtype=HISTORY_DTYPE), order="date")
+    path = history_path(symbol)
+    if not os.path.exists(path):
+        # First write, or a symbol still on legacy JSON: create the binary file.
+        return merge_history(symbol, records)
+
+    with open(path, "r+b") as f:
+        version, shape, dtype, offset = _read_npy_header(f)
+        if dtype != HISTORY_DTYPE:
+            raise ValueError(f"Unexpected history dtype in {path}: {dtype}")
+        length = shape[0]
+        end = offset + length * HISTORY_DTYPE.itemsize
+
+        if length:
+            f.seek(end - HISTORY_DTYPE.itemsize)
+            last = np.frombuffer(f.read(HISTORY_DTYPE.itemsize), dtype=HISTORY_DTYPE)[0]["date"]
+            records = records[records["date"] > last]
+        _, first = np.unique(records["date"], return_index=True)
+        records = records[first]
+        if len(records) == 0:
+            return 0
+
+        header = _npy_header_bytes(version, length + len(records))
+        in_place = len(header) == offset
+        if in_place:
+            f.truncate(end)
+            f.seek(end)
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+            f.write(header)
+            f.flush()
+            os.fsync(f.fileno())
+
+    if not in_place:
+        # No room to grow the header in place (e.g. files written by old numpy): rewrite atomically.
+        save_history(symbol, np.concatenate([load_history(symbol, mmap=False), records]))
+    return len(records)
+
+def frame_to_records(df) -> np.ndarray:
+    """
+    Vectorized conversion of a yfinance OHLCV frame (Open/High/Low/Close/Volume
+    columns, one row per day) into sorted history records. Rows without prices are dropped.
+    """
+    import pandas as pd
+    if isinstance(df.columns, pd.MultiIndex):
+        # Single-ticker download with (Price, Ticker) columns
+        price_level = 0 if "Open" in df.columns.get_level_values(0) else 1
+        df = df.droplevel(1 - price_level, axis=1)
+    df = df.dropna(subset=["Open", "High", "Low", "Close"])
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    records = np.empty(len(df), dtype=HISTORY_DTYPE)
+    records["date"] = index.values.astype("datetime64[D]").astype(np.int32)
+    for field in FIELDS:
+        column = df[field.capitalize()].to_numpy()
+        if field == "volume":
+            column = np.nan_to_num(column.astype(np.float64)).astype(np.int64)
+        records[field] = column
+    return np.sort(records, order="date")
+
+def ohlcv_matrix(records: np.ndarray) -> np.ndarray:
+    """Return an (n, 5) float64 matrix of open/high/low/close/volume."""
+    out = np.empty((len(records), len(FIELDS)), dtype=np.float64)
+    for i, field in enumerate(FIELDS):
+        out[:, i] = records[field]
+    return out
+
+def to_frame(records: np.ndarray):
+    """
+    Build the float DataFrame the rest of the code used to get from
+    `pd.DataFrame(data).T.astype(float).sort_index()`.
+    """
+    import pandas as pd
+    return pd.DataFrame(
+        ohlcv_matrix(records),
+        index=pd.Index(days_to_dates(records["date"])),
+        columns=FIELDS,
+    )
+
+def last_close(records: np.ndarray) -> float:
+    if len(records) == 0:
+        raise ValueError("Empty stock history")
+    return float(records["close"][-1])
+
+def find_date(records: np.ndarray, date: str):
+    """Return the row index for ISO `date`, or None if it is not a trading day in the history."""
+    day = dates_to_days([date])[0]
+    idx = int(np.searchsorted(records["date"], day))
+    if idx < len(records) and records["date"][idx] == day:
+        return idx
+    return None
+
+def migrate_json_to_store(symbols=None, remove_json: bool = False) -> list:
+    """
+    One-shot conversion of stock_history/<SYMBOL>.json files into the binary store.
+    Returns the list of migrated symbols.
+    """
+    if symbols is None:
+        if not os.path.isdir(HISTORY_DIR):
+            return []
+        symbols = sorted(
+            name[:-len(".json")] for name in os.listdir(HISTORY_DIR) if name.endswith(".json")
+        )
+    migrated = []
+    for symbol in symbols:
+        try:
+            records = load_json_history(symbol)
+            save_history(symbol, records)
+            if remove_json:
+                os.remove(json_history_path(symbol))
+            migrated.append(symbol)
+            print(f"✅ Migrated {symbol} ({len(records)} rows)")
+        except Exception as e:
+            print(f"❌ Failed to migrate {symbol}: {e}")
+    return migrated
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] != "--migrate":
+        print("Usage: python history_store.py --migrate [--remove-json] [SYMBOL ...]")
+    else:
+        remove = "--remove-json" in args
+        names = [a for a in args[1:] if not a.startswith("--")]
+        migrate_json_to_store(names or None, remove_json=remove)
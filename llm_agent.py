@@ -1,20 +1,56 @@
+import re
 import datetime
 from model_context_provider import get_trade_context, get_news_summary
-from ml.predict import predict_next_close, predict_multi, get_technicals
-from llm_client import ask_llm_sync  # use your own file/module here
+from prompt_builder import estimate_tokens
+from ml.predict import forecast, get_technicals
+import llm_client
+import llm_scheduler
+import llm_cache
+import tracing
 
-def suggest_trade(symbol: str, last_close: float) -> str:
-    try:
-        predicted_price = predict_next_close(symbol)
-        predicted_week = predict_multi(symbol, days_ahead=5)
-        predicted_month = predict_multi(symbol, days_ahead=20)
+# Bump whenever build_prompt changes so answers cached for the old prompt are not reused.
+PROMPT_VERSION = 2
+ACTIONS = ("Buy", "Average", "Hold", "Exit")
+
+_ACTION_RE = re.compile(r"^[\s*#>-]*Action[\s*]*:[\s*]*([A-Za-z]+)", re.IGNORECASE | re.MULTILINE)
+_CONFIDENCE_RE = re.compile(r"^[\s*#>-]*Confidence[\s*]*:[\s*]*(\d{1,3})", re.IGNORECASE | re.MULTILINE)
+_RATIONALE_RE = re.compile(r"^[\s*#>-]*Rationale[\s*]*:[\s*]*(.*?)(?:\n\s*\n|\Z)",
+                           re.IGNORECASE | re.MULTILINE | re.DOTALL)
+
+def gather_inputs(symbol: str, last_close: float) -> dict:
+    """
+    Collect everything the prompt needs: LSTM forecasts, technicals, news and trade history.
+    """
+    with tracing.span("llm_agent.gather_inputs", symbol=symbol):
+        predictions = forecast(symbol, horizons=[1, 5, 20])
+        today = datetime.date.today().isoformat()
         technicals = get_technicals(symbol)
-    except Exception as e:
-        return f"⚠️ Prediction error: {e}"
+        with tracing.span("context.news"):
+            news = get_news_summary(symbol, today)
+        with tracing.span("context.trades"):
+            past_trades = get_trade_context(symbol, last_close)
+    return {
+        "date": today,
+        "symbol": symbol,
+        "last_close": last_close,
+        "predicted_price": predictions[1],
+        "predicted_week": predictions[5],
+        "predicted_month": predictions[20],
+        "technicals": technicals,
+        "news": news,
+        "past_trades": past_trades,
+    }
 
-    past_trades = get_trade_context()
-    news = get_news_summary(symbol)
-    today = datetime.date.today().isoformat()
+def build_prompt(inputs: dict) -> str:
+    symbol = inputs["symbol"]
+    last_close = inputs["last_close"]
+    predicted_price = inputs["predicted_price"]
+    predicted_week = inputs["predicted_week"]
+    predicted_month = inputs["predicted_month"]
+    technicals = inputs["technicals"]
+    news = inputs["news"]
+    past_trades = inputs["past_trades"]
+    today = inputs["date"]
 
     prompt = f"""
 Date: {today}
@@ -34,7 +70,7 @@ Technical Indicators:
 Recent News:
 {news}
 
-Your Past Trades:
+Your Position in {symbol}:
 {past_trades}
 
 ---
@@ -53,16 +89,93 @@ Rationale: (2-3 sentences, concise, actionable, and specific for a non-daily tra
 3. Be direct, avoid generic disclaimers, and focus on actionable advice for a patient, non-daily trader.
 """
 
+    return prompt
+
+def ask(prompt: str, on_token=None, priority: int = llm_scheduler.NORMAL, timeout: float = None,
+        cancelled=None) -> str:
+    """
+    Send `prompt` to the LLM through the request scheduler. If given,
+    on_token(token) is called for each streamed token; returning False from it
+    stops the generation. `priority`, `timeout` and `cancelled` are passed to
+    llm_scheduler.generate.
+    """
     # 🔍 DEBUG print before sending to LLM
-    print("🧠 Sending prompt to LLM:\n", prompt)
+    print(f"🧠 Sending prompt to LLM (~{estimate_tokens(prompt)} tokens):\n", prompt)
     with open("llm_prompt_debug.txt", "w", encoding="utf-8") as f:
         f.write(prompt)
 
     try:
-        response = ask_llm_sync(prompt)
-        print("🤖 LLM Response:\n", response)
-        with open("llm_response_debug.txt", "w", encoding="utf-8") as f:
-            f.write(response)
-        return response
-    except Exception as e:
+        response = llm_scheduler.generate(prompt, on_token=on_token, priority=priority, timeout=timeout,
+                                          cancelled=cancelled)
+    except llm_scheduler.SchedulerError as e:
         return f"❌ LLM Error: {e}"
+    except Exception as e:
+        return llm_client.error_text(e)
+    print("🤖 LLM Response:\n", response)
+    with open("llm_response_debug.txt", "w", encoding="utf-8") as f:
+        f.write(response)
+    return response
+
+def answer(inputs: dict, on_token=None, use_cache: bool = True, prompt: str = None, **schedule):
+    """
+    Answer for `inputs`, served from the response cache when the same model
+    was already asked about identical inputs. Returns (response, cached).
+    Only complete answers are cached: errors and generations stopped through
+    on_token are not. `prompt` is build_prompt(inputs), if the caller already
+    built it; `schedule` (priority, timeout, cancelled) goes to ask().
+    """
+    with tracing.span("llm_agent.answer", symbol=inputs["symbol"]) as sp:
+        response, cached = _answer(inputs, on_token, use_cache, prompt, sp, schedule)
+        sp.set(cached=cached, response_chars=len(response))
+    return response, cached
+
+def _answer(inputs, on_token, use_cache, prompt, sp, schedule):
+    use_cache = use_cache and llm_cache.LLM_CACHE_ENABLED
+    key = llm_cache.cache_key(llm_client.OLLAMA_MODEL, inputs, PROMPT_VERSION)
+    if use_cache:
+        entry = llm_cache.get(key)
+        if entry is not None:
+            print(f"⚡ Cached LLM answer for {inputs['symbol']}")
+            return entry["response"], True
+
+    stopped = False
+    def forward(token):
+        nonlocal stopped
+        if on_token is not None and on_token(token) is False:
+            stopped = True
+            return False
+
+    prompt = prompt or build_prompt(inputs)
+    sp.set(prompt_tokens_est=estimate_tokens(prompt))
+    response = ask(prompt, on_token=forward, **schedule)
+    sp.set(stopped=stopped)
+    if not stopped and not response.startswith("❌"):
+        try:
+            llm_cache.put(key, response, model=llm_client.OLLAMA_MODEL,
+                          meta={"symbol": inputs["symbol"], "date": inputs["date"]})
+        except OSError as e:
+            print(f"⚠️ Failed to cache LLM answer: {e}")
+    return response, False
+
+def parse_suggestion(response: str) -> dict:
+    """
+    Pull the Action / Confidence / Rationale lines the prompt asks for out of
+    a response. Missing or malformed fields are None.
+    """
+    action = _ACTION_RE.search(response)
+    action = action.group(1).capitalize() if action else None
+    confidence = _CONFIDENCE_RE.search(response)
+    rationale = _RATIONALE_RE.search(response)
+    return {
+        "action": action if action in ACTIONS else None,
+        "confidence": min(int(confidence.group(1)), 100) if confidence else None,
+        "rationale": " ".join(rationale.group(1).split()) if rationale else None,
+    }
+
+def suggest_trade(symbol: str, last_close: float, use_cache: bool = True) -> str:
+    with tracing.trace("llm_agent.suggest_trade", symbol=symbol):
+        try:
+            inputs = gather_inputs(symbol, last_close)
+        except Exception as e:
+            return f"⚠️ Prediction error: {e}"
+        return answer(inputs, use_cache=use_cache)[0]
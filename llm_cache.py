@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+
+LLM_CACHE_DIR = "data/llm_cache"
+# Set LLM_CACHE=0 to always ask the LLM.
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") != "0"
+# Seconds a cached answer is served before it is regenerated.
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 12 * 60 * 60))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 500))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 20 * 1024 * 1024))
+# Floats are rounded before hashing so that noise in the last digits of a forecast
+# does not turn an unchanged request into a cache miss.
+FLOAT_DIGITS = 4
+
+_lock = threading.Lock()
+
+def normalize(value):
+    """
+    Canonical, JSON-serializable form of the prompt inputs: floats rounded,
+    numpy scalars unwrapped, whitespace in strings collapsed.
+    """
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        value = value.item()  # numpy scalar
+    if isinstance(value, bool) or value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return round(value, FLOAT_DIGITS)
+    return " ".join(str(value).split())
+
+def cache_key(model: str, inputs: dict, version=None) -> str:
+    """sha256 of the model name, the prompt template version and the normalized inputs."""
+    payload = json.dumps({"model": model, "version": version, "inputs": normalize(inputs)},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _entry_path(key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{key}.json")
+
+def get(key: str, ttl: int = LLM_CACHE_TTL, cache_dir: str = LLM_CACHE_DIR):
+    """Return the cached entry for `key`, or None if it is missing or older than `ttl` seconds."""
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable LLM cache entry {path}: {e}")
+        return None
+    if time.time() - entry.get("created_at", 0) >= ttl:
+        return None
+    try:
+        os.utime(path)  # mark as recently used for eviction
+    except OSError:
+        pass
+    return entry
+
+def put(key: str, response: str, model: str = None, meta: dict = None, cache_dir: str = LLM_CACHE_DIR,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES, max_bytes: int = LLM_CACHE_MAX_BYTES):
+    """Store `response` under `key` (atomically) and evict old entries beyond the size limits."""
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = {"created_at": time.time(), "model": model, "response": response, **(meta or {})}
+    path = _entry_path(key, cache_dir)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    evict(max_entries, max_bytes, cache_dir)
+
+def _entries(cache_dir):
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+def evict(max_entries: int = LLM_CACHE_MAX_ENTRIES, max_bytes: int = LLM_CACHE_MAX_BYTES,
+          cache_dir: str = LLM_CACHE_DIR, ttl: int = LLM_CACHE_TTL) -> int:
+    """
+    Drop expired entries, then the least recently used ones until at most
+    `max_entries` entries and `max_bytes` bytes remain. Returns the number removed.
+    """
+    with _lock:
+        now = time.time()
+        entries = sorted(_entries(cache_dir))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            # Hits refresh the mtime, so an mtime past the TTL means the entry is expired too.
+            expired = now - mtime >= ttl
+            if not expired and len(entries) - removed <= max_entries and total <= max_bytes:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+            total -= size
+        return removed
+
+def clear(cache_dir: str = LLM_CACHE_DIR) -> int:
+    return evict(max_entries=0, max_bytes=0, cache_dir=cache_dir)
+
+def cache_stats(cache_dir: str = LLM_CACHE_DIR) -> dict:
+    entries = _entries(cache_dir)
+    return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries)}
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args == ["--clear"]:
+        print(f"🗑️ Removed {clear()} cached LLM answers")
+    elif args == ["--stats"]:
+        stats = cache_stats()
+        print(f"{stats['entries']} cached LLM answers, {stats['bytes'] / 1024:.1f} KB")
+    else:
+        print("Usage: python llm_cache.py --stats | --clear")
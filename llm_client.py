@@ -1,40 +1,111 @@
-import asyncio
+import os
+import json
+import time
+import threading
 import httpx
+import tracing
 
-OLLAMA_API = "http://localhost:11434/api/generate"
+OLLAMA_API = os.environ.get("OLLAMA_API", "http://localhost:11434/api/generate")
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.2")  # ⚠️ Make sure this matches `ollama list`
+# How long Ollama keeps the model loaded after a request (Ollama duration string).
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
 
-async def ask_llm(prompt: str) -> str:
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "model": "llama3.2",   # ⚠️ Make sure this matches `ollama list`
+# Default for callers that pass no timeout; llm_scheduler passes each request's remaining deadline.
+OLLAMA_TIMEOUT = httpx.Timeout(None, connect=10.0)
+OLLAMA_LIMITS = httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=300)
+
+_sync_client = None
+_sync_lock = threading.Lock()
+
+def get_client() -> httpx.Client:
+    """Process-wide keep-alive client, shared by every thread."""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(timeout=OLLAMA_TIMEOUT, limits=OLLAMA_LIMITS)
+        return _sync_client
+
+def close_clients():
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+
+def _payload(prompt: str, model: str = None) -> dict:
+    return {
+        "model": model or OLLAMA_MODEL,
         "prompt": prompt,
-        "stream": False
+        "stream": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
     }
 
-    try:
-        async with httpx.AsyncClient() as client:
-            # Set timeout=None to wait indefinitely for LLM response
-            response = await client.post(OLLAMA_API, json=payload, headers=headers, timeout=None)
+def _handle_line(line: str, parts: list, on_token, sp=tracing.NULL_SPAN, started: float = None) -> bool:
+    """
+    Consume one NDJSON line of an Ollama stream. Returns False when `on_token`
+    asked to stop. The final `done` line is not treated as a stop: reading the
+    body to its end is what lets the connection go back to the pool.
+    Time to first token and Ollama's token counts are recorded on `sp`.
+    """
+    if not line.strip():
+        return True
+    chunk = json.loads(line)
+    if chunk.get("error"):
+        raise RuntimeError(chunk["error"])
+    token = chunk.get("response", "")
+    if token:
+        if not parts and started is not None:
+            sp.set(ttft_ms=round((time.perf_counter() - started) * 1000, 1))
+        parts.append(token)
+        if on_token is not None and on_token(token) is False:
+            sp.set(stopped=True)
+            return False
+    if chunk.get("done") and "prompt_eval_count" in chunk:
+        print(f"🧮 Prompt tokens: {chunk['prompt_eval_count']}, generated: {chunk.get('eval_count')}")
+        sp.set(prompt_tokens=chunk["prompt_eval_count"], response_tokens=chunk.get("eval_count"),
+               **{f"ollama_{k}_ms": round(chunk[f"{k}_duration"] / 1e6, 1)
+                  for k in ("load", "prompt_eval", "eval") if chunk.get(f"{k}_duration")})
+    return True
 
-            # 🔍 Print status + raw text
-            print("🔁 Status Code:", response.status_code)
-            print("📡 Raw Response Text:", repr(response.text[:300]))
+def _result(parts: list) -> str:
+    text = "".join(parts).strip()
+    return text if text else "❌ Ollama returned an empty response."
 
-            if not response.text.strip():
-                return "❌ Ollama returned an empty response."
+def _timeout(seconds: float = None):
+    """OLLAMA_TIMEOUT, or a bound of `seconds` on connecting and on each read."""
+    if seconds is None:
+        return OLLAMA_TIMEOUT
+    return httpx.Timeout(seconds, connect=min(seconds, OLLAMA_TIMEOUT.connect))
 
-            try:
-                data = response.json()
-                return data.get("response", "").strip()
-            except Exception as json_err:
-                return f"❌ JSON parse error: {json_err}\n↪ Raw: {response.text[:300]}"
+def stream_llm(prompt: str, on_token=None, model: str = None, timeout: float = None, on_response=None) -> str:
+    """
+    Stream a completion over the shared keep-alive connection, calling
+    on_token(token) for each token as it arrives. Returning False from
+    on_token stops the generation early. Returns the full response text.
+    `timeout` bounds the wait for each chunk (default: no limit);
+    on_response(response) receives the open response, so another thread can
+    close it to abort the generation.
+    """
+    parts = []
+    with tracing.span("llm_client.stream", model=model or OLLAMA_MODEL) as sp:
+        started = time.perf_counter()
+        with get_client().stream("POST", OLLAMA_API, json=_payload(prompt, model),
+                                 timeout=_timeout(timeout)) as response:
+            print("🔁 Status Code:", response.status_code)
+            if on_response is not None:
+                on_response(response)
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not _handle_line(line, parts, on_token, sp, started):
+                    break
+    return _result(parts)
 
-    except httpx.RequestError as e:
+def error_text(e: Exception) -> str:
+    """The "❌ ..." message shown for a failed request."""
+    if isinstance(e, httpx.RequestError):
         return f"❌ HTTP Request error: {e}"
-    except httpx.HTTPStatusError as e:
+    if isinstance(e, httpx.HTTPStatusError):
         return f"❌ HTTP Status error: {e}"
-    except Exception as e:
-        return f"❌ General error: {e}"
-
-def ask_llm_sync(prompt: str) -> str:
-    return asyncio.run(ask_llm(prompt))
+    if isinstance(e, json.JSONDecodeError):
+        return f"❌ JSON parse error: {e}"
+    return f"❌ General error: {e}"
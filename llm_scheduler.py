@@ -0,0 +1,270 @@
+import os
+import time
+import heapq
+import random
+import itertools
+import threading
+import contextvars
+from collections import deque
+import httpx
+import llm_client
+import tracing
+
+# Every LLM request goes through one process-wide scheduler: at most
+# LLM_MAX_IN_FLIGHT generations run at once and the rest wait in a priority
+# queue, so a watchlist scan cannot starve the suggestion the user just asked
+# for. Each request has a deadline covering its wait and its generation, can
+# be cancelled while queued or streaming, and is retried on transient errors
+# (connection failures, 429/5xx) as long as no token has been delivered yet.
+LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", os.environ.get("OLLAMA_NUM_PARALLEL", 1)))
+# Waiting non-interactive requests beyond this are rejected instead of queued.
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", 64))
+# Seconds from submission to the last token; 0 disables the deadline.
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 300))
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", 2))
+LLM_RETRY_BACKOFF = float(os.environ.get("LLM_RETRY_BACKOFF", 0.5))
+
+INTERACTIVE, NORMAL, BATCH = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BATCH: "batch"}
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+# How often queued and running requests re-check their cancellation flag.
+_POLL_SECONDS = 0.1
+_WAIT_SAMPLES = 500
+
+class SchedulerError(RuntimeError):
+    pass
+
+class QueueFull(SchedulerError):
+    pass
+
+class DeadlineExceeded(SchedulerError):
+    pass
+
+class RequestCancelled(SchedulerError):
+    pass
+
+def _is_transient(e: Exception) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code in TRANSIENT_STATUS
+    # Timeouts are the deadline's business, not a reason to try again.
+    return isinstance(e, httpx.TransportError) and not isinstance(e, httpx.TimeoutException)
+
+def _cancel_check(cancelled):
+    """Accept a threading.Event, a zero-argument callable or None."""
+    if cancelled is None:
+        return lambda: False
+    if hasattr(cancelled, "is_set"):
+        return cancelled.is_set
+    return cancelled
+
+class LLMScheduler:
+    """
+    Priority queue with a concurrency limit in front of llm_client.stream_llm.
+    generate() blocks the calling thread until its turn comes and the answer
+    has streamed. The stream itself runs on a worker thread, so a cancelled
+    caller returns at once even while Ollama has yet to send anything.
+    """
+
+    def __init__(self, max_in_flight: int = LLM_MAX_IN_FLIGHT, max_queue: int = LLM_MAX_QUEUE,
+                 timeout: float = LLM_TIMEOUT, retries: int = LLM_RETRIES, backoff: float = LLM_RETRY_BACKOFF,
+                 stream=None):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max_queue
+        self.timeout = timeout or None
+        self.retries = retries
+        self.backoff = backoff
+        self._stream = stream or llm_client.stream_llm
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, seq, ticket)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._counters = {k: 0 for k in ("submitted", "completed", "failed", "rejected", "timed_out",
+                                         "cancelled", "retries")}
+        self._max_depth = 0
+        self._waits = {p: deque(maxlen=_WAIT_SAMPLES) for p in PRIORITY_NAMES}
+
+    def _count(self, key, n=1):
+        with self._cond:
+            self._counters[key] += n
+
+    def _acquire(self, priority, deadline, is_cancelled) -> float:
+        """Wait for a free slot behind every higher-priority request; returns the seconds waited."""
+        entry = (priority, next(self._seq), object())
+        queued = time.monotonic()
+        with self._cond:
+            self._counters["submitted"] += 1
+            if priority != INTERACTIVE and len(self._queue) >= self.max_queue:
+                self._counters["rejected"] += 1
+                raise QueueFull(f"LLM queue is full ({len(self._queue)} waiting)")
+            heapq.heappush(self._queue, entry)
+            self._max_depth = max(self._max_depth, len(self._queue))
+            try:
+                while not (self._queue[0] is entry and self._in_flight < self.max_in_flight):
+                    if is_cancelled():
+                        self._counters["cancelled"] += 1
+                        raise RequestCancelled("LLM request cancelled while queued")
+                    remaining = _POLL_SECONDS if deadline is None else min(_POLL_SECONDS, deadline - time.monotonic())
+                    if remaining <= 0:
+                        self._counters["timed_out"] += 1
+                        raise DeadlineExceeded(f"LLM request timed out after {time.monotonic() - queued:.1f}s "
+                                               f"in the queue")
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            waited = time.monotonic() - queued
+            self._waits[priority].append(waited)
+            # The next request in line may be able to start too.
+            self._cond.notify_all()
+        return waited
+
+    def _release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def generate(self, prompt: str, on_token=None, priority: int = NORMAL, timeout: float = None,
+                 cancelled=None, model: str = None) -> str:
+        """
+        Queue `prompt` and stream its answer, calling on_token(token) as in
+        llm_client.stream_llm. `timeout` (default LLM_TIMEOUT) covers the wait
+        and the generation; `cancelled` is an Event or a callable polled while
+        waiting and on every token. Raises QueueFull, DeadlineExceeded,
+        RequestCancelled or the last error once retries are used up.
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        is_cancelled = _cancel_check(cancelled)
+
+        with tracing.span("llm_scheduler.queue", priority=PRIORITY_NAMES.get(priority, priority)) as sp:
+            waited = self._acquire(priority, deadline, is_cancelled)
+            sp.set(wait_ms=round(waited * 1000, 1), depth=self.queue_depth())
+
+        result = {}
+        responses = []
+        done = threading.Event()
+
+        def run():
+            try:
+                result["response"] = self._generate(prompt, on_token, deadline, is_cancelled, model,
+                                                    responses.append)
+            except BaseException as e:
+                result["error"] = e
+            finally:
+                # The slot is held until the HTTP request has really ended, even for an abandoned caller.
+                self._release()
+                done.set()
+
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name="llm-request", daemon=True).start()
+        while not done.wait(_POLL_SECONDS):
+            if is_cancelled():
+                for response in responses:
+                    try:
+                        response.close()  # hang up so Ollama stops generating
+                    except Exception:
+                        pass
+                raise RequestCancelled("LLM request cancelled")
+        if "error" in result:
+            raise result["error"]
+        return result["response"]
+
+    def _generate(self, prompt, on_token, deadline, is_cancelled, model, on_response):
+        delivered = False
+        stop = None
+
+        def forward(token):
+            nonlocal delivered, stop
+            if is_cancelled():
+                stop = RequestCancelled("LLM request cancelled")
+                return False
+            if deadline is not None and time.monotonic() > deadline:
+                stop = DeadlineExceeded("LLM request timed out while generating")
+                return False
+            delivered = True
+            if on_token is not None and on_token(token) is False:
+                return False
+
+        attempt = 0
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded("LLM request timed out before it could start")
+                response = self._stream(prompt, on_token=forward, model=model, timeout=remaining,
+                                        on_response=on_response)
+            except httpx.TimeoutException as e:
+                self._count("timed_out")
+                raise DeadlineExceeded(f"LLM request timed out: {e}") from e
+            except DeadlineExceeded:
+                self._count("timed_out")
+                raise
+            except Exception as e:
+                if is_cancelled():
+                    self._count("cancelled")
+                    raise RequestCancelled("LLM request cancelled") from e
+                backoff = self.backoff * 2 ** attempt * (1 + random.random() / 2)
+                if (attempt < self.retries and _is_transient(e) and not delivered and not is_cancelled()
+                        and (deadline is None or time.monotonic() + backoff < deadline)):
+                    attempt += 1
+                    self._count("retries")
+                    tracing.set_attrs(retries=attempt)
+                    print(f"🔁 LLM request failed ({str(e).splitlines()[0]}); "
+                          f"retry {attempt}/{self.retries} in {backoff:.1f}s")
+                    time.sleep(backoff)
+                    continue
+                self._count("failed")
+                raise
+            if stop is not None:
+                self._count("cancelled" if isinstance(stop, RequestCancelled) else "timed_out")
+                raise stop
+            self._count("completed")
+            return response
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self) -> dict:
+        """Counters, queue depth and wait-time percentiles (seconds, per priority) of recent requests."""
+        with self._cond:
+            waits = {}
+            for priority, samples in self._waits.items():
+                if not samples:
+                    continue
+                ordered = sorted(samples)
+                waits[PRIORITY_NAMES[priority]] = {
+                    "count": len(ordered),
+                    "p50": round(ordered[len(ordered) // 2], 3),
+                    "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+                    "max": round(ordered[-1], 3),
+                }
+            return {
+                **self._counters,
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_depth,
+                "wait_seconds": waits,
+            }
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
+
+def generate(prompt: str, on_token=None, priority: int = NORMAL, timeout: float = None, cancelled=None,
+             model: str = None) -> str:
+    return get_scheduler().generate(prompt, on_token, priority, timeout, cancelled, model)
+
+def scheduler_stats() -> dict:
+    return get_scheduler().stats()
@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from history_store import ohlcv_matrix, days_to_dates, dates_to_days
+from history_cache import get_history
+from ml.model_registry import get_model
+from ml.predict import DEFAULT_HORIZONS, CLOSE_INDEX, rollout_scaled, inverse_closes
+
+BACKTEST_DIR = "backtests"
+WATCHLIST_FILE = "data/watchlist.json"
+BATCH_SIZE = 1024
+
+def batched_forecasts(model, scaler, series: np.ndarray, window: int, steps: int, origins: np.ndarray,
+                      batch_size: int = BATCH_SIZE) -> np.ndarray:
+    """
+    Forecast `steps` closes from every origin at once. origins[k] is the row of
+    the last known bar; the forecasts equal calling forecast() on each origin
+    separately. Returns an (len(origins), steps) array of prices.
+    """
+    scaled = scaler.transform(series)
+    # all_windows[i] is scaled[i:i + window], the window ending at row i + window - 1
+    all_windows = sliding_window_view(scaled, (window, scaled.shape[1]))[:, 0]
+    windows = all_windows[origins - window + 1]
+    return inverse_closes(scaler, rollout_scaled(model, windows, steps, batch_size=batch_size))
+
+def horizon_metrics(base: np.ndarray, predicted: np.ndarray, actual: np.ndarray, horizon: int) -> dict:
+    """
+    Error metrics and a simple long/flat strategy for one horizon.
+
+    The strategy buys at the origin close when the forecast is above it and
+    sells `horizon` days later; trades are taken every `horizon` days so they
+    never overlap. It is compared with buying and holding over the same period.
+    """
+    error = predicted - actual
+    move, predicted_move = actual - base, predicted - base
+    trades = np.arange(0, len(base), horizon)
+    long = predicted_move[trades] > 0
+    returns = actual[trades] / base[trades] - 1
+    taken = returns[long]
+    return {
+        "horizon": horizon,
+        "samples": int(len(base)),
+        "mae": float(np.mean(np.abs(error))),
+        "rmse": float(np.sqrt(np.mean(error ** 2))),
+        "mape": float(np.mean(np.abs(error) / actual) * 100),
+        "naive_mae": float(np.mean(np.abs(move))),  # "no change" forecast
+        "direction_accuracy": float(np.mean(np.sign(predicted_move) == np.sign(move)) * 100),
+        "trades": int(long.sum()),
+        "hit_rate": float(np.mean(taken > 0) * 100) if len(taken) else None,
+        "avg_trade_return": float(np.mean(taken) * 100) if len(taken) else None,
+        "strategy_return": float((np.prod(1 + taken) - 1) * 100),
+        "buy_and_hold_return": float((np.prod(1 + returns) - 1) * 100),
+    }
+
+def backtest_symbol(symbol: str, horizons=DEFAULT_HORIZONS, window: int = 60, start: str = None,
+                    batch_size: int = BATCH_SIZE):
+    """
+    Backtest `symbol`'s model from every trading day (from `start`, if given)
+    for every horizon with one batched rollout. Returns (summary, predictions)
+    where predictions maps "date", "close" and "h<N>" columns to arrays.
+
+    The model and scaler were fitted on the whole history, so results before
+    the model's training cutoff are in-sample.
+    """
+    horizons = sorted(set(int(h) for h in horizons))
+    records = get_history(symbol)
+    series = ohlcv_matrix(records)
+    closes = series[:, CLOSE_INDEX]
+    n = len(series)
+    if n <= window:
+        raise ValueError(f"Not enough data ({n}) for window {window}")
+    first = window - 1
+    if start:
+        first = max(first, int(np.searchsorted(records["date"], dates_to_days([start])[0])))
+    origins = np.arange(first, n)
+    if len(origins) == 0:
+        raise ValueError(f"No trading days after {start}")
+
+    model, scaler = get_model(symbol)
+    started = time.monotonic()
+    forecasts = batched_forecasts(model, scaler, series, window, horizons[-1], origins, batch_size)
+    seconds = time.monotonic() - started
+
+    dates = days_to_dates(records["date"][origins])
+    predictions = {"date": dates, "close": closes[origins]}
+    metrics = []
+    for h in horizons:
+        predictions[f"h{h}"] = forecasts[:, h - 1]
+        valid = origins + h < n
+        if valid.any():
+            metrics.append(horizon_metrics(closes[origins[valid]], forecasts[valid, h - 1],
+                                           closes[origins[valid] + h], h))
+    summary = {
+        "symbol": symbol,
+        "window": window,
+        "from": str(dates[0]),
+        "to": str(dates[-1]),
+        "origins": int(len(origins)),
+        "model_calls": horizons[-1],
+        "seconds": round(seconds, 3),
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "horizons": metrics,
+    }
+    return summary, predictions
+
+def write_report(summary: dict, predictions: dict, out_dir: str = BACKTEST_DIR):
+    """Write backtests/<SYMBOL>.json (summary) and backtests/<SYMBOL>_predictions.csv."""
+    os.makedirs(out_dir, exist_ok=True)
+    symbol = summary["symbol"]
+    with open(os.path.join(out_dir, f"{symbol}.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    columns = list(predictions)
+    with open(os.path.join(out_dir, f"{symbol}_predictions.csv"), "w") as f:
+        f.write(",".join(columns) + "\n")
+        for row in zip(*(predictions[c] for c in columns)):
+            f.write(",".join(str(v) if isinstance(v, str) else f"{v:.4f}" for v in row) + "\n")
+
+def print_summary(summary: dict):
+    print(f"\n📊 {summary['symbol']}: {summary['origins']} origins {summary['from']} → {summary['to']} "
+          f"({summary['model_calls']} batched model calls, {summary['seconds']:.2f}s)")
+    print(f"{'h':>3} {'MAE':>9} {'naive':>9} {'MAPE%':>7} {'dir%':>6} {'trades':>6} {'hit%':>6} "
+          f"{'strat%':>8} {'hold%':>8}")
+    for m in summary["horizons"]:
+        hit = f"{m['hit_rate']:.1f}" if m["hit_rate"] is not None else "-"
+        print(f"{m['horizon']:>3} {m['mae']:>9.2f} {m['naive_mae']:>9.2f} {m['mape']:>7.2f} "
+              f"{m['direction_accuracy']:>6.1f} {m['trades']:>6} {hit:>6} "
+              f"{m['strategy_return']:>8.1f} {m['buy_and_hold_return']:>8.1f}")
+
+def backtest_watchlist(symbols, horizons=DEFAULT_HORIZONS, window=60, start=None, out_dir=BACKTEST_DIR) -> dict:
+    """Backtest every symbol, writing per-symbol reports and backtests/watchlist.json."""
+    report = {"generated": datetime.now().isoformat(timespec="seconds"), "symbols": {}, "failed": {}}
+    for symbol in symbols:
+        try:
+            summary, predictions = backtest_symbol(symbol, horizons, window, start)
+        except Exception as e:
+            print(f"❌ {symbol}: {e}")
+            report["failed"][symbol] = str(e)
+            continue
+        write_report(summary, predictions, out_dir)
+        print_summary(summary)
+        report["symbols"][symbol] = summary["horizons"]
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "watchlist.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest LSTM forecasts over the whole history.")
+    parser.add_argument("symbols", nargs="*", help="symbols (default: data/watchlist.json)")
+    parser.add_argument("--horizons", type=int, nargs="+", default=list(DEFAULT_HORIZONS))
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--start", help="first forecast date (YYYY-MM-DD), e.g. after the training cutoff")
+    parser.add_argument("--out", default=BACKTEST_DIR)
+    args = parser.parse_args(argv)
+
+    symbols = args.symbols
+    if not symbols:
+        with open(WATCHLIST_FILE, "r") as f:
+            symbols = json.load(f).get("stocks", [])
+    started = time.monotonic()
+    report = backtest_watchlist(symbols, args.horizons, args.window, args.start, args.out)
+    print(f"\n⏱️ {len(report['symbols'])} symbols in {time.monotonic() - started:.1f}s, reports in {args.out}/")
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from history_store import load_history, ohlcv_matrix
+
+CLOSE_INDEX = 3  # position of 'close' in open/high/low/close/volume
+
+def load_series(symbol: str) -> np.ndarray:
+    """(n, 5) float32 OHLCV matrix for `symbol`, sorted by date."""
+    records = load_history(symbol)
+    if len(records) > 1 and np.any(np.diff(records["date"]) < 0):
+        records = np.sort(records, order="date")
+    return ohlcv_matrix(records).astype(np.float32)
+
+def scale_series(series: np.ndarray, scaler=None):
+    """Scale `series` to float32 with `scaler` (a new MinMaxScaler fitted on it if None)."""
+    if scaler is None:
+        from sklearn.preprocessing import MinMaxScaler
+        scaler = MinMaxScaler().fit(series)
+    return scaler.transform(series).astype(np.float32, copy=False), scaler
+
+def window_view(scaled: np.ndarray, window: int):
+    """
+    Return (X, y) for next-close training without copying the series: X is a
+    read-only strided view of shape (n - window, window, 5) where X[i] is
+    scaled[i:i + window], and y[i] is the close of the following day.
+    """
+    if len(scaled) <= window:
+        return np.empty((0, window, scaled.shape[1]), dtype=scaled.dtype), np.empty(0, dtype=scaled.dtype)
+    X = sliding_window_view(scaled, (window, scaled.shape[1]))[:-1, 0]
+    y = scaled[window:, CLOSE_INDEX]
+    return X, y
+
+def load_windows(symbol: str, window: int = 60, scaler=None):
+    """(X view, y, scaler) for `symbol`; see window_view. Empty arrays and a None scaler if the history is too short."""
+    series = load_series(symbol)
+    if len(series) <= window:
+        return np.array([]), np.array([]), None
+    scaled, scaler = scale_series(series, scaler)
+    X, y = window_view(scaled, window)
+    return X, y, scaler
+
+def batches(X: np.ndarray, y: np.ndarray, batch_size: int = 32, shuffle: bool = True, seed: int = 0,
+            epoch: int = 0):
+    """
+    Yield contiguous float32 (X, y) batches gathered from the window view, so
+    only one batch of windows is materialized at a time. The order depends
+    only on (seed, epoch), so runs are reproducible.
+    """
+    order = np.arange(len(X))
+    if shuffle:
+        np.random.default_rng((seed, epoch)).shuffle(order)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        if shuffle:
+            idx = np.sort(idx)  # gather in memory order; the batch's contents are unchanged
+        yield np.ascontiguousarray(X[idx], dtype=np.float32), np.ascontiguousarray(y[idx], dtype=np.float32)
+
+def to_tf_dataset(X: np.ndarray, y: np.ndarray, batch_size: int = 32, shuffle: bool = True, seed: int = 0):
+    """
+    tf.data pipeline over `batches`: each pass over the dataset (i.e. each
+    Keras epoch) re-runs the generator with the next epoch's shuffle order,
+    and the next batch is prefetched while the current one trains.
+    """
+    import tensorflow as tf
+    epochs = iter(range(1 << 31))
+
+    def generate():
+        yield from batches(X, y, batch_size, shuffle, seed, next(epochs))
+
+    signature = (
+        tf.TensorSpec(shape=(None,) + X.shape[1:], dtype=tf.float32),
+        tf.TensorSpec(shape=(None,), dtype=tf.float32),
+    )
+    return tf.data.Dataset.from_generator(generate, output_signature=signature).prefetch(1)
@@ -0,0 +1,306 @@
+import os
+import sys
+import json
+import math
+import threading
+from collections import deque
+import numpy as np
+from history_store import days_to_dates
+
+INDICATOR_DIR = "data/indicators"
+RSI_LENGTH = 14
+MA_LENGTHS = (20, 50)
+LEVEL_WINDOW = 20  # support/resistance: lowest/highest close of the last 20 days
+STATE_VERSION = 1
+# Running sums are re-added from the stored closes this often to stop rounding drift.
+RESYNC_EVERY = 1024
+
+_decay = 1.0 - 1.0 / RSI_LENGTH
+_BLOCK = 512
+_states = {}
+_lock = threading.Lock()
+
+class IndicatorState:
+    """
+    Rolling indicator state for one symbol, updated in O(1) per appended bar.
+
+    RSI keeps the numerators of pandas_ta's Wilder averages (an adjusted EWM
+    with alpha = 1/14): the EWM denominators are identical for gains and
+    losses, so RSI = 100 * gain / (gain + loss) is exact without them. MA20
+    and MA50 are running sums over the last closes, and support/resistance
+    come from monotonic deques of (row, close) over the last LEVEL_WINDOW rows.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.last_day = None
+        self.prev_close = None
+        self.gain = 0.0
+        self.loss = 0.0
+        self.changes = 0
+        self.closes = deque(maxlen=max(MA_LENGTHS))
+        self.sums = {n: 0.0 for n in MA_LENGTHS}
+        self.lows = deque()
+        self.highs = deque()
+
+    def update(self, day: int, close: float):
+        close = float(close)
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            self.gain = _decay * self.gain + max(change, 0.0)
+            self.loss = _decay * self.loss + max(-change, 0.0)
+            self.changes += 1
+        self.prev_close = close
+
+        for n in MA_LENGTHS:
+            self.sums[n] += close
+            if len(self.closes) >= n:
+                self.sums[n] -= self.closes[-n]
+        self.closes.append(close)
+
+        self._push_level(self.rows, close)
+        self.rows += 1
+        self.last_day = int(day)
+        if self.rows % RESYNC_EVERY == 0:
+            self._resync_sums()
+
+    def _push_level(self, row: int, close: float):
+        while self.lows and self.lows[-1][1] >= close:
+            self.lows.pop()
+        self.lows.append((row, close))
+        while self.highs and self.highs[-1][1] <= close:
+            self.highs.pop()
+        self.highs.append((row, close))
+        for levels in (self.lows, self.highs):
+            while levels[0][0] <= row - LEVEL_WINDOW:
+                levels.popleft()
+
+    def _resync_sums(self):
+        closes = list(self.closes)
+        for n in MA_LENGTHS:
+            self.sums[n] = math.fsum(closes[-n:])
+
+    def raw(self) -> dict:
+        """Unrounded indicator values (None until enough bars are available)."""
+        total = self.gain + self.loss
+        rsi = 100.0 * self.gain / total if self.changes >= RSI_LENGTH and total > 0 else None
+        values = {"RSI": rsi}
+        for n in MA_LENGTHS:
+            values[f"MA{n}"] = self.sums[n] / n if self.rows >= n else None
+        full = self.rows >= LEVEL_WINDOW
+        values["Support"] = self.lows[0][1] if full else None
+        values["Resistance"] = self.highs[0][1] if full else None
+        return values
+
+    def technicals(self) -> dict:
+        """The dict get_technicals returns: values rounded to 2 decimals."""
+        return {k: (round(v, 2) if v is not None else None) for k, v in self.raw().items()}
+
+    def to_dict(self) -> dict:
+        return {
+            "version": STATE_VERSION,
+            "rows": self.rows,
+            "last_day": self.last_day,
+            "prev_close": self.prev_close,
+            "gain": self.gain,
+            "loss": self.loss,
+            "changes": self.changes,
+            "closes": list(self.closes),
+            "sums": {str(n): s for n, s in self.sums.items()},
+            "lows": [list(x) for x in self.lows],
+            "highs": [list(x) for x in self.highs],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        if data.get("version") != STATE_VERSION:
+            raise ValueError("Unsupported indicator state version")
+        state = cls()
+        state.rows = data["rows"]
+        state.last_day = data["last_day"]
+        state.prev_close = data["prev_close"]
+        state.gain = data["gain"]
+        state.loss = data["loss"]
+        state.changes = data["changes"]
+        state.closes.extend(data["closes"])
+        state.sums = {int(n): s for n, s in data["sums"].items()}
+        state.lows.extend(tuple(x) for x in data["lows"])
+        state.highs.extend(tuple(x) for x in data["highs"])
+        return state
+
+def _wilder_sums(values: np.ndarray) -> np.ndarray:
+    """
+    Running decayed sums s[t] = decay * s[t-1] + x[t], vectorized per block as
+    s[j] = decay**j * (decay * carry + cumsum(x[i] / decay**i)[j]). The inputs
+    are non-negative, so the cumsum cannot cancel; blocks keep decay**-i far
+    from overflowing.
+    """
+    out = np.empty(len(values), dtype=np.float64)
+    powers = _decay ** np.arange(_BLOCK, dtype=np.float64)
+    carry = 0.0
+    for start in range(0, len(values), _BLOCK):
+        block = np.asarray(values[start:start + _BLOCK], dtype=np.float64)
+        p = powers[:len(block)]
+        out[start:start + len(block)] = p * (_decay * carry + np.cumsum(block / p))
+        carry = out[start + len(block) - 1]
+    return out
+
+def compute_indicators(close) -> dict:
+    """
+    Full vectorized recompute: every indicator for every row of `close`
+    (NaN where there is not enough history yet), e.g. for backfills and backtests.
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    out = {}
+    rsi = np.full(n, np.nan)
+    if n > 1:
+        change = np.diff(close)
+        gain = _wilder_sums(np.maximum(change, 0.0))
+        loss = _wilder_sums(np.maximum(-change, 0.0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rsi[1:] = 100.0 * gain / (gain + loss)
+        rsi[:RSI_LENGTH] = np.nan
+    out["RSI"] = rsi
+    for length in MA_LENGTHS:
+        ma = np.full(n, np.nan)
+        if n >= length:
+            ma[length - 1:] = sliding_window_view(close, length).mean(axis=1)
+        out[f"MA{length}"] = ma
+    for name, reduce in (("Support", np.min), ("Resistance", np.max)):
+        level = np.full(n, np.nan)
+        if n >= LEVEL_WINDOW:
+            level[LEVEL_WINDOW - 1:] = reduce(sliding_window_view(close, LEVEL_WINDOW), axis=1)
+        out[name] = level
+    return out
+
+def state_from_records(records: np.ndarray) -> IndicatorState:
+    """Build the state for a whole history at once (vectorized), as if every bar had been appended."""
+    state = IndicatorState()
+    n = len(records)
+    if n == 0:
+        return state
+    close = np.asarray(records["close"], dtype=np.float64)
+    if n > 1:
+        change = np.diff(close)
+        state.gain = float(_wilder_sums(np.maximum(change, 0.0))[-1])
+        state.loss = float(_wilder_sums(np.maximum(-change, 0.0))[-1])
+    state.changes = n - 1
+    state.prev_close = float(close[-1])
+    state.closes.extend(close[-state.closes.maxlen:].tolist())
+    state._resync_sums()
+    for row in range(max(0, n - LEVEL_WINDOW), n):
+        state._push_level(row, float(close[row]))
+    state.rows = n
+    state.last_day = int(records["date"][-1])
+    return state
+
+def state_path(symbol: str) -> str:
+    return os.path.join(INDICATOR_DIR, f"{symbol}.json")
+
+def load_state(symbol: str):
+    try:
+        with open(state_path(symbol), "r") as f:
+            return IndicatorState.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Ignoring indicator state for {symbol}: {e}")
+        return None
+
+def save_state(symbol: str, state: IndicatorState):
+    os.makedirs(INDICATOR_DIR, exist_ok=True)
+    path = state_path(symbol)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state.to_dict(), f)
+    os.replace(tmp_path, path)
+
+def _sync(state, records):
+    """
+    Bring `state` up to date with `records`. Appended bars are applied one by
+    one; anything else (no state, a backfill, a rewritten history) triggers a
+    full vectorized rebuild. Returns (state, changed).
+    """
+    n = len(records)
+    if state is not None and state.rows <= n and state.rows > 0 \
+            and int(records["date"][state.rows - 1]) == state.last_day \
+            and float(records["close"][state.rows - 1]) == state.prev_close:
+        if state.rows == n:
+            return state, False
+        for day, close in zip(records["date"][state.rows:], records["close"][state.rows:]):
+            state.update(day, close)
+        return state, True
+    return state_from_records(records), True
+
+def get_state(symbol: str, records: np.ndarray = None) -> IndicatorState:
+    """
+    The up-to-date indicator state for `symbol`: kept in memory, persisted
+    under data/indicators/, and advanced only by the bars appended since it
+    was last saved.
+    """
+    if records is None:
+        from history_cache import get_history
+        records = get_history(symbol)
+    with _lock:
+        state = _states.get(symbol)
+        if state is None:
+            state = load_state(symbol)
+        state, changed = _sync(state, records)
+        if changed:
+            save_state(symbol, state)
+        _states[symbol] = state
+        return state
+
+def technicals(symbol: str) -> dict:
+    return get_state(symbol).technicals()
+
+def check_parity(symbols, tail: int = 30) -> bool:
+    """
+    Compare the engine with the previous pandas_ta / pandas rolling
+    implementation over the full history of each symbol, and the incremental
+    path (state built on all but the last `tail` bars, then updated bar by
+    bar) with the full rebuild. Prints the largest differences.
+    """
+    import pandas as pd
+    import pandas_ta as ta
+    from history_store import load_history
+    ok = True
+    for symbol in symbols:
+        records = load_history(symbol)
+        close = pd.Series(np.asarray(records["close"], dtype=np.float64))
+        expected = {
+            "RSI": ta.rsi(close, length=RSI_LENGTH),
+            "MA20": close.rolling(20).mean(),
+            "MA50": close.rolling(50).mean(),
+            "Support": close.rolling(LEVEL_WINDOW).min(),
+            "Resistance": close.rolling(LEVEL_WINDOW).max(),
+        }
+        series = compute_indicators(close.to_numpy())
+        incremental = state_from_records(records[:-tail])
+        for day, value in zip(records["date"][-tail:], records["close"][-tail:]):
+            incremental.update(day, value)
+        full = state_from_records(records).raw()
+        report = []
+        for name, reference in expected.items():
+            reference = reference.to_numpy()
+            vector_diff = np.nanmax(np.abs(series[name] - reference))
+            nan_match = np.array_equal(np.isnan(series[name]), np.isnan(reference))
+            last = reference[-1]
+            inc_diff = abs(incremental.raw()[name] - last)
+            full_diff = abs(full[name] - last)
+            worst = max(vector_diff, inc_diff, full_diff)
+            good = nan_match and worst <= 1e-8 * max(1.0, abs(last))
+            ok &= good
+            report.append(f"{name} {'✅' if good else '❌'} {worst:.1e}")
+        last_date = days_to_dates(records["date"][-1:])[0]
+        print(f"{symbol} ({len(records)} rows to {last_date}): " + ", ".join(report))
+    return ok
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] != "--check" or len(args) < 2:
+        print("Usage: python -m ml.indicators --check SYMBOL [SYMBOL ...]")
+    else:
+        sys.exit(0 if check_parity(args[1:]) else 1)
@@ -0,0 +1,134 @@
+import os
+import threading
+from collections import OrderedDict
+import joblib
+import tracing
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "trained_models")
+MODEL_REGISTRY_MAX_MODELS = int(os.environ.get("MODEL_REGISTRY_MAX_MODELS", 16))
+# Budget for loaded models, measured by the size of their artifacts on disk.
+MODEL_REGISTRY_MAX_BYTES = int(os.environ.get("MODEL_REGISTRY_MAX_BYTES", 512 * 1024 * 1024))
+
+# "keras" loads models with TensorFlow; "numpy" runs them with ml.numpy_lstm
+# and never imports TensorFlow.
+LSTM_BACKENDS = ("keras", "numpy")
+LSTM_BACKEND = os.environ.get("LSTM_BACKEND", "keras").strip().lower()
+if LSTM_BACKEND not in LSTM_BACKENDS:
+    raise ValueError(f"Unknown LSTM_BACKEND {LSTM_BACKEND!r}, expected one of {LSTM_BACKENDS}")
+
+_lock = threading.Lock()
+_symbol_locks = {}
+_entries = OrderedDict()
+_stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+def safe_model_name(symbol: str) -> str:
+    return symbol.replace(".", "_").replace("/", "_")
+
+def model_paths(symbol: str):
+    """Return (model_path, scaler_path) for `symbol`'s trained artifacts."""
+    safe_name = safe_model_name(symbol)
+    return (
+        os.path.join(MODEL_DIR, f"{safe_name}_lstm_model.h5"),
+        os.path.join(MODEL_DIR, f"{safe_name}_scaler.save"),
+    )
+
+def has_model(symbol: str) -> bool:
+    return all(os.path.exists(p) for p in model_paths(symbol))
+
+def _load_model(path: str):
+    if LSTM_BACKEND == "numpy":
+        from ml.numpy_lstm import load_numpy_model
+        return load_numpy_model(path)
+    from tensorflow.keras.models import load_model
+    return load_model(path)
+
+def set_backend(name: str):
+    """Switch the inference backend; models loaded with the old backend are dropped."""
+    global LSTM_BACKEND
+    name = name.lower()
+    if name not in LSTM_BACKENDS:
+        raise ValueError(f"Unknown LSTM backend {name!r}, expected one of {LSTM_BACKENDS}")
+    with _lock:
+        LSTM_BACKEND = name
+        _entries.clear()
+
+def _signature(paths):
+    sig = []
+    for path in paths:
+        st = os.stat(path)
+        sig.append((st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+def _evict():
+    # Oldest first; the entry just loaded is at the end and is always kept.
+    while len(_entries) > 1 and (
+        len(_entries) > MODEL_REGISTRY_MAX_MODELS
+        or sum(e["nbytes"] for e in _entries.values()) > MODEL_REGISTRY_MAX_BYTES
+    ):
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+def get_model(symbol: str):
+    """
+    Return (model, scaler) for `symbol`, loading them only when they are not
+    cached yet or the files on disk changed since they were loaded.
+    """
+    paths = model_paths(symbol)
+    model_path, scaler_path = paths
+    if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+        raise FileNotFoundError(f"Model or scaler not found for {symbol} at {model_path} / {scaler_path}")
+
+    with _lock:
+        symbol_lock = _symbol_locks.setdefault(symbol, threading.Lock())
+
+    # One loader per symbol: concurrent callers wait for the first load instead of repeating it.
+    with symbol_lock:
+        signature = _signature(paths)
+        with _lock:
+            entry = _entries.get(symbol)
+            if entry is not None and entry["signature"] == signature:
+                _entries.move_to_end(symbol)
+                _stats["hits"] += 1
+                return entry["model"], entry["scaler"]
+
+        with tracing.span("model_registry.load", symbol=symbol, backend=LSTM_BACKEND):
+            model = _load_model(model_path)
+            scaler = joblib.load(scaler_path)
+        with _lock:
+            _entries[symbol] = {
+                "model": model,
+                "scaler": scaler,
+                "signature": signature,
+                "nbytes": sum(size for _, size in signature),
+            }
+            _entries.move_to_end(symbol)
+            _stats["loads"] += 1
+            _evict()
+        return model, scaler
+
+def warm_up(symbols) -> list:
+    """
+    Preload models for `symbols` (e.g. the whole watchlist). Symbols without
+    trained artifacts are skipped. Returns the symbols that were loaded.
+    """
+    loaded = []
+    for symbol in symbols:
+        if not has_model(symbol):
+            continue
+        try:
+            get_model(symbol)
+            loaded.append(symbol)
+        except Exception as e:
+            print(f"⚠️ Failed to warm up model for {symbol}: {e}")
+    return loaded
+
+def invalidate(symbol: str = None):
+    with _lock:
+        if symbol is None:
+            _entries.clear()
+        else:
+            _entries.pop(symbol, None)
+
+def registry_stats() -> dict:
+    with _lock:
+        return {**_stats, "backend": LSTM_BACKEND, "symbols": list(_entries.keys())}
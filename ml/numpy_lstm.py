@@ -0,0 +1,172 @@
+import sys
+import json
+import h5py
+import numpy as np
+
+# Inference-only forward pass for the Sequential LSTM/Dropout/Dense models
+# written by ml.train_lstm_model. Weights are read straight from the Keras
+# .h5 file, so TensorFlow does not need to be installed.
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def _hard_sigmoid(x):
+    return np.clip(0.2 * x + 0.5, 0.0, 1.0)
+
+ACTIVATIONS = {
+    "sigmoid": _sigmoid,
+    "hard_sigmoid": _hard_sigmoid,
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "linear": lambda x: x,
+    None: lambda x: x,
+}
+
+def _activation(name):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation: {name}")
+    return ACTIVATIONS[name]
+
+def _load_attribute(group, name):
+    """Read a list attribute, including the chunked form Keras uses for long lists."""
+    if name in group.attrs:
+        values = list(group.attrs[name])
+    else:
+        values, chunk = [], 0
+        while f"{name}{chunk}" in group.attrs:
+            values.extend(group.attrs[f"{name}{chunk}"])
+            chunk += 1
+    return [v.decode("utf8") if isinstance(v, bytes) else str(v) for v in values]
+
+class LSTMLayer:
+    def __init__(self, config, kernel, recurrent_kernel, bias=None):
+        if config.get("go_backwards") or config.get("stateful"):
+            raise ValueError("Only forward, stateless LSTM layers are supported")
+        self.units = int(config["units"])
+        self.return_sequences = bool(config.get("return_sequences", False))
+        self.activation = _activation(config.get("activation", "tanh"))
+        self.recurrent_activation = _activation(config.get("recurrent_activation", "sigmoid"))
+        self.kernel = kernel.astype(np.float32)
+        self.recurrent_kernel = recurrent_kernel.astype(np.float32)
+        self.bias = (bias if bias is not None else np.zeros(4 * self.units)).astype(np.float32)
+
+    def __call__(self, x):
+        batch, steps, _ = x.shape
+        u = self.units
+        # Input projections for every timestep in one matmul; only the recurrent part is sequential.
+        xw = x @ self.kernel + self.bias
+        h = np.zeros((batch, u), dtype=np.float32)
+        c = np.zeros((batch, u), dtype=np.float32)
+        outputs = np.empty((batch, steps, u), dtype=np.float32) if self.return_sequences else None
+        for t in range(steps):
+            z = xw[:, t] + h @ self.recurrent_kernel
+            i = self.recurrent_activation(z[:, :u])
+            f = self.recurrent_activation(z[:, u:2 * u])
+            g = self.activation(z[:, 2 * u:3 * u])
+            o = self.recurrent_activation(z[:, 3 * u:])
+            c = f * c + i * g
+            h = o * self.activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+class DenseLayer:
+    def __init__(self, config, kernel, bias=None):
+        self.activation = _activation(config.get("activation", "linear"))
+        self.kernel = kernel.astype(np.float32)
+        self.bias = bias.astype(np.float32) if bias is not None else None
+
+    def __call__(self, x):
+        out = x @ self.kernel
+        if self.bias is not None:
+            out = out + self.bias
+        return self.activation(out)
+
+class NumpyLSTMModel:
+    """
+    Drop-in replacement for the Keras model's `predict` at inference time.
+    Accepts a batch of windows shaped (batch, window, features).
+    """
+
+    def __init__(self, layers):
+        self.layers = layers
+
+    def predict(self, X, verbose=0, batch_size=None):
+        x = np.asarray(X, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[np.newaxis]
+        if batch_size is None or batch_size >= len(x):
+            return self._forward(x)
+        return np.concatenate([self._forward(x[i:i + batch_size]) for i in range(0, len(x), batch_size)])
+
+    __call__ = predict
+
+    def _forward(self, x):
+        for layer in self.layers:
+            x = layer(x)
+        return x
+
+def load_numpy_model(path: str) -> NumpyLSTMModel:
+    """Build a NumpyLSTMModel from a Keras .h5 file saved by model.save()."""
+    with h5py.File(path, "r") as f:
+        raw_config = f.attrs["model_config"]
+        if isinstance(raw_config, bytes):
+            raw_config = raw_config.decode("utf8")
+        model_config = json.loads(raw_config)
+        if model_config.get("class_name") != "Sequential":
+            raise ValueError(f"Only Sequential models are supported, got {model_config.get('class_name')}")
+
+        weights_group = f["model_weights"] if "model_weights" in f else f
+        weights = {}
+        for layer_name in _load_attribute(weights_group, "layer_names"):
+            group = weights_group[layer_name]
+            weights[layer_name] = {
+                name.split("/")[-1].split(":")[0]: np.asarray(group[name])
+                for name in _load_attribute(group, "weight_names")
+            }
+
+        layers = []
+        for layer in model_config["config"]["layers"]:
+            kind, config = layer["class_name"], layer["config"]
+            w = weights.get(config.get("name"), {})
+            if kind in ("InputLayer", "Dropout"):
+                continue  # Dropout is the identity at inference time
+            if kind == "LSTM":
+                layers.append(LSTMLayer(config, w["kernel"], w["recurrent_kernel"], w.get("bias")))
+            elif kind == "Dense":
+                layers.append(DenseLayer(config, w["kernel"], w.get("bias")))
+            else:
+                raise ValueError(f"Unsupported layer type for NumPy inference: {kind}")
+    return NumpyLSTMModel(layers)
+
+def check_parity(symbol: str, window: int = 60, samples: int = 64) -> float:
+    """
+    Compare Keras and NumPy outputs on the last `samples` windows of `symbol`'s
+    history and return the largest absolute difference (in scaled units).
+    """
+    import joblib
+    from tensorflow.keras.models import load_model
+    from history_store import load_history, ohlcv_matrix
+    from ml.model_registry import model_paths
+
+    model_path, scaler_path = model_paths(symbol)
+    scaler = joblib.load(scaler_path)
+    scaled = scaler.transform(ohlcv_matrix(load_history(symbol)[-(window + samples - 1):]))
+    X = np.lib.stride_tricks.sliding_window_view(scaled, window, axis=0).transpose(0, 2, 1)
+
+    expected = load_model(model_path).predict(X, verbose=0)
+    actual = load_numpy_model(model_path).predict(X)
+    return float(np.max(np.abs(expected - actual)))
+
+if __name__ == "__main__":
+    symbols = sys.argv[1:]
+    if not symbols:
+        print("Usage: python -m ml.numpy_lstm <SYMBOL> [SYMBOL ...]")
+        sys.exit(1)
+    failed = False
+    for symbol in symbols:
+        diff = check_parity(symbol)
+        ok = diff < 1e-4
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {symbol}: max |keras - numpy| = {diff:.2e}")
+    sys.exit(1 if failed else 0)
@@ -1,148 +1,131 @@
 import os
 import json
-import joblib
 import numpy as np
-import pandas as pd
-import pandas_ta as ta
-from tensorflow.keras.models import load_model
 import datetime
+from history_store import ohlcv_matrix
+from history_cache import get_history
+from ml.model_registry import get_model
+import tracing
+
+DEFAULT_HORIZONS = (1, 5, 20)
+CLOSE_INDEX = 3  # position of 'close' in open/high/low/close/volume
+# Fine-tune the model automatically when check_and_retrain finds a large error
+# (needs TensorFlow, and blocks the prediction while it trains).
+AUTO_RETRAIN = os.environ.get("AUTO_RETRAIN", "0") == "1"
+
+def rollout_scaled(model, windows: np.ndarray, steps: int, batch_size: int = None) -> np.ndarray:
+    """
+    Recursively predict `steps` scaled closes for each of the N scaled
+    (window, 5) inputs in `windows` at once; returns an (N, steps) array.
+
+    The whole rollout lives in one preallocated (N, window + steps, 5) buffer;
+    step i runs one batched model call on the contiguous views
+    buf[:, i:i + window] and writes the predictions into the next free row,
+    so nothing is re-stacked or re-scaled per step. Each predicted day repeats
+    the previous day's open/high/low/volume with the predicted close.
+    """
+    n, window, n_features = windows.shape
+    buf = np.empty((n, window + steps, n_features), dtype=np.float64)
+    buf[:, :window] = windows
+    scaled_closes = np.empty((n, steps), dtype=np.float64)
+    for step in range(steps):
+        X = buf[:, step:step + window]
+        if batch_size is None:
+            preds = model.predict(X, verbose=0)
+        else:
+            preds = model.predict(X, verbose=0, batch_size=batch_size)
+        scaled_pred = np.asarray(preds, dtype=np.float64).reshape(-1)
+        buf[:, window + step] = buf[:, window + step - 1]
+        buf[:, window + step, CLOSE_INDEX] = scaled_pred
+        scaled_closes[:, step] = scaled_pred
+    return scaled_closes
+
+def inverse_closes(scaler, scaled_closes: np.ndarray) -> np.ndarray:
+    """Inverse-scale an array of scaled closes (any shape) through the close column only."""
+    flat = np.asarray(scaled_closes, dtype=np.float64).reshape(-1)
+    dummy = np.zeros((len(flat), scaler.n_features_in_))
+    dummy[:, CLOSE_INDEX] = flat
+    return scaler.inverse_transform(dummy)[:, CLOSE_INDEX].reshape(np.shape(scaled_closes))
+
+def _rollout(model, scaler, arr: np.ndarray, steps: int) -> np.ndarray:
+    """Recursively predict `steps` closes from the (window, 5) OHLCV matrix `arr`."""
+    scaled = scaler.transform(arr)[np.newaxis]
+    return inverse_closes(scaler, rollout_scaled(model, scaled, steps)[0])
+
+def forecast(symbols, horizons=DEFAULT_HORIZONS, window: int = 60) -> dict:
+    """
+    Predict closes at every horizon in `horizons` (trading days ahead) with a
+    single recursive rollout of max(horizons) steps.
 
-def predict_next_close(symbol: str, window: int = 60) -> float:
-    print(f"\n🔮 Predicting next close for {symbol}...")
-
-    safe_name = symbol.replace(".", "_").replace("/", "_")
-    model_path = os.path.join("ml", "trained_models", f"{safe_name}_lstm_model.h5")
-    scaler_path = os.path.join("ml", "trained_models", f"{safe_name}_scaler.save")
-
-    if not os.path.exists(model_path) or not os.path.exists(scaler_path):
-        raise FileNotFoundError(f"Model or scaler not found for {symbol} at {model_path} / {scaler_path}")
-
-    model = load_model(model_path)
-    scaler = joblib.load(scaler_path)
-
-    # Load last `window` days from stock_history
-    path = os.path.join("stock_history", f"{symbol}.json")
-    with open(path, "r") as f:
-        data = json.load(f)
+    `symbols` may be one symbol, which returns {horizon: price}, or a list of
+    symbols, which returns {symbol: {horizon: price}}.
+    """
+    if not isinstance(symbols, str):
+        return {symbol: forecast(symbol, horizons, window) for symbol in symbols}
 
-    df = pd.DataFrame(data).T.astype(float).sort_index().tail(window)
-    if len(df) < window:
-        raise ValueError(f"Not enough data ({len(df)}) for prediction window {window}")
+    symbol = symbols
+    horizons = sorted(set(int(h) for h in horizons))
+    if not horizons or horizons[0] < 1:
+        raise ValueError(f"Horizons must be positive integers, got {horizons}")
 
-    arr = df[["open", "high", "low", "close", "volume"]].values
-    scaled_input = scaler.transform(arr)
-    X = np.reshape(scaled_input, (1, scaled_input.shape[0], scaled_input.shape[1]))
+    with tracing.span("predict.forecast", symbol=symbol, steps=horizons[-1]):
+        model, scaler = get_model(symbol)
+        arr = ohlcv_matrix(get_history(symbol)[-window:])
+        if len(arr) < window:
+            raise ValueError(f"Not enough data ({len(arr)}) for prediction window {window}")
 
-    scaled_pred = model.predict(X, verbose=0)
-    # Inverse-scale only the close value
-    dummy = np.zeros((1, arr.shape[1]))
-    dummy[0][3] = scaled_pred  # index 3 is 'close'
-    unscaled = scaler.inverse_transform(dummy)
-    predicted_close = unscaled[0][3]
+        with tracing.span("predict.rollout"):
+            closes = _rollout(model, scaler, arr, horizons[-1])
+    return {h: float(closes[h - 1]) for h in horizons}
 
-    return float(predicted_close)
+def predict_next_close(symbol: str, window: int = 60) -> float:
+    print(f"\n🔮 Predicting next close for {symbol}...")
+    return forecast(symbol, horizons=[1], window=window)[1]
 
 def predict_multi(symbol: str, days_ahead: int = 5, window: int = 60) -> float:
     """
     Predict the close price N days ahead using recursive LSTM prediction.
     """
-    safe_name = symbol.replace(".", "_").replace("/", "_")
-    model_path = os.path.join("ml", "trained_models", f"{safe_name}_lstm_model.h5")
-    scaler_path = os.path.join("ml", "trained_models", f"{safe_name}_scaler.save")
-    if not os.path.exists(model_path) or not os.path.exists(scaler_path):
-        raise FileNotFoundError(f"Model or scaler not found for {symbol} at {model_path} / {scaler_path}")
-    model = load_model(model_path)
-    scaler = joblib.load(scaler_path)
-    path = os.path.join("stock_history", f"{symbol}.json")
-    with open(path, "r") as f:
-        data = json.load(f)
-    df = pd.DataFrame(data).T.astype(float).sort_index()
-    arr = df[["open", "high", "low", "close", "volume"]].values
-    window_data = arr[-window:].copy()
-    for _ in range(days_ahead):
-        scaled_input = scaler.transform(window_data)
-        X = np.reshape(scaled_input, (1, scaled_input.shape[0], scaled_input.shape[1]))
-        scaled_pred = model.predict(X, verbose=0)
-        dummy = np.zeros((1, arr.shape[1]))
-        dummy[0][3] = scaled_pred  # index 3 is 'close'
-        unscaled = scaler.inverse_transform(dummy)
-        next_close = unscaled[0][3]
-        # Roll window: add predicted close, keep other values same as last day
-        last_row = window_data[-1].copy()
-        last_row[3] = next_close
-        window_data = np.vstack([window_data[1:], last_row])
-    return float(next_close)
+    return forecast(symbol, horizons=[days_ahead], window=window)[days_ahead]
 
 def get_technicals(symbol: str, window: int = 60) -> dict:
     """
-    Calculate RSI, 20/50-day moving averages, support/resistance for the stock.
+    RSI, 20/50-day moving averages and support/resistance for the stock,
+    from the incrementally maintained indicator state (see ml/indicators.py).
     """
-    path = os.path.join("stock_history", f"{symbol}.json")
-    with open(path, "r") as f:
-        data = json.load(f)
-    df = pd.DataFrame(data).T.astype(float).sort_index()
-    close = df["close"]
-    rsi = ta.rsi(close, length=14).iloc[-1]
-    ma20 = close.rolling(20).mean().iloc[-1]
-    ma50 = close.rolling(50).mean().iloc[-1]
-    support = close.rolling(20).min().iloc[-1]
-    resistance = close.rolling(20).max().iloc[-1]
-    return {
-        "RSI": round(rsi, 2) if not pd.isna(rsi) else None,
-        "MA20": round(ma20, 2) if not pd.isna(ma20) else None,
-        "MA50": round(ma50, 2) if not pd.isna(ma50) else None,
-        "Support": round(support, 2) if not pd.isna(support) else None,
-        "Resistance": round(resistance, 2) if not pd.isna(resistance) else None,
-    }
+    from ml.indicators import technicals
+    with tracing.span("predict.technicals", symbol=symbol):
+        return technicals(symbol)
 
 def save_prediction(symbol, window, price, week, month, technicals):
-    today = datetime.date.today().isoformat()
-    out = {
-        "date": today,
-        "symbol": symbol,
-        "window": window,
-        "predicted_next_close": price,
-        "predicted_next_week": week,
-        "predicted_month": month,
-        "technicals": technicals
-    }
-    os.makedirs("predictions", exist_ok=True)
-    fname = f"predictions/{symbol}_predictions.json"
-    if os.path.exists(fname):
-        with open(fname, "r") as f:
-            all_preds = json.load(f)
-    else:
-        all_preds = []
-    all_preds.append(out)
-    with open(fname, "w") as f:
-        json.dump(all_preds, f, indent=2)
+    from ml.prediction_store import save_prediction as store_prediction
+    store_prediction(symbol, window, price, week, month, technicals)
 
-def check_and_retrain(symbol, window):
+def check_and_retrain(symbol, window, auto_retrain=None):
     """
-    Check yesterday's prediction vs actual, retrain if error is large.
+    Check yesterday's prediction vs actual and, if the error is large,
+    fine-tune the model on the newest bars (with AUTO_RETRAIN=1).
     """
-    import numpy as np
-    fname = f"predictions/{symbol}_predictions.json"
-    path = os.path.join("stock_history", f"{symbol}.json")
-    if not os.path.exists(fname) or not os.path.exists(path):
+    from ml.prediction_store import last_with_actual
+    # Last prediction with a matching date in actuals
+    pred = last_with_actual(symbol)
+    if pred is None:
         return
-    with open(fname, "r") as f:
-        preds = json.load(f)
-    with open(path, "r") as f:
-        data = json.load(f)
-    df = pd.DataFrame(data).T.astype(float).sort_index()
-    # Find last prediction with a matching date in actuals
-    for pred in reversed(preds):
-        pred_date = pred["date"]
-        if pred_date in df.index:
-            actual = df.loc[pred_date]["close"]
-            predicted = pred["predicted_next_close"]
-            error = abs(actual - predicted)
-            if error > max(2, 0.03 * actual):  # >₹2 or >3% error
-                print(f"Retraining suggested: {pred_date} prediction error {error:.2f}")
-                # Here you would call your training script, e.g.:
-                # os.system(f"python -m ml.train_lstm_model {symbol} {window}")
-            break
+    pred_date = pred["date"]
+    actual = pred["actual_close"]
+    error = abs(actual - pred["predicted_next_close"])
+    if error > max(2, 0.03 * actual):  # >₹2 or >3% error
+        print(f"Retraining suggested: {pred_date} prediction error {error:.2f}")
+        if AUTO_RETRAIN if auto_retrain is None else auto_retrain:
+            try:
+                from ml.train_all import train_symbol, FINE_TUNE_EPOCHS
+                # Skipped if the model has already been updated with the current history.
+                status = train_symbol(symbol, window=window, epochs=FINE_TUNE_EPOCHS, fine_tune=True)
+            except ImportError as e:
+                print(f"⚠️ Retraining unavailable ({e}); run `python -m ml.train_all --fine-tune` "
+                      f"where TensorFlow is installed")
+                return
+            print(f"🔁 {symbol}: {status['status']} ({status['seconds']:.1f}s, log: {status['log']})")
 
 def log_llm_training_example(symbol, window, price, week, month, technicals, actual_close=None, action=None, rationale=None):
     """
@@ -168,34 +151,22 @@ def log_actual_and_action(symbol, window):
     """
     After prediction, log the actual close and retraining suggestion for LLM fine-tuning.
     """
-    # Load last prediction
-    pred_file = f"predictions/{symbol}_predictions.json"
-    if not os.path.exists(pred_file):
-        return
-    with open(pred_file, "r") as f:
-        preds = json.load(f)
-    if not preds:
-        return
-    last_pred = preds[-1]
-    # Load actual close
-    path = os.path.join("stock_history", f"{symbol}.json")
-    if not os.path.exists(path):
+    from ml.prediction_store import resolve_actuals, latest_prediction
+    resolve_actuals(symbol)
+    last_pred = latest_prediction(symbol)
+    # Only once the actual close for the prediction date is in the history
+    if last_pred is None or last_pred["actual_close"] is None:
         return
-    with open(path, "r") as f:
-        data = json.load(f)
-    df = pd.DataFrame(data).T.astype(float).sort_index()
-    pred_date = last_pred["date"]
-    if pred_date in df.index:
-        actual = df.loc[pred_date]["close"]
-        predicted = last_pred["predicted_next_close"]
-        error = abs(actual - predicted)
-        retrain = error > max(2, 0.03 * actual)
-        action = "Retrain" if retrain else "NoRetrain"
-        rationale = f"Prediction error: {error:.2f} (actual: {actual:.2f}, predicted: {predicted:.2f})"
-        log_llm_training_example(
-            symbol, window, predicted, last_pred["predicted_next_week"], last_pred["predicted_month"],
-            last_pred["technicals"], actual_close=actual, action=action, rationale=rationale
-        )
+    actual = last_pred["actual_close"]
+    predicted = last_pred["predicted_next_close"]
+    error = abs(actual - predicted)
+    retrain = error > max(2, 0.03 * actual)
+    action = "Retrain" if retrain else "NoRetrain"
+    rationale = f"Prediction error: {error:.2f} (actual: {actual:.2f}, predicted: {predicted:.2f})"
+    log_llm_training_example(
+        symbol, window, predicted, last_pred["predicted_next_week"], last_pred["predicted_month"],
+        last_pred["technicals"], actual_close=actual, action=action, rationale=rationale
+    )
 
 if __name__ == "__main__":
     import sys
@@ -207,11 +178,10 @@ if __name__ == "__main__":
         except Exception:
             print("Invalid window size, using default 60.")
     if not symbol:
-        print("Usage: python predict.py <SYMBOL> [WINDOW]")
+        print("Usage: python -m ml.predict <SYMBOL> [WINDOW]")
     else:
-        price = predict_next_close(symbol, window=window)
-        week = predict_multi(symbol, days_ahead=5, window=window)
-        month = predict_multi(symbol, days_ahead=20, window=window)
+        predictions = forecast(symbol, horizons=[1, 5, 20], window=window)
+        price, week, month = predictions[1], predictions[5], predictions[20]
         technicals = get_technicals(symbol, window=window)
         print(f"\n📈 Predicted next close for {symbol} (window={window}): ₹{price:.2f}")
         print(f"📅 Predicted next week close: ₹{week:.2f}")
@@ -0,0 +1,223 @@
+import os
+import sys
+import glob
+import json
+import sqlite3
+import datetime
+import threading
+from history_store import history_source, days_to_dates, find_date
+
+PREDICTIONS_DIR = "predictions"
+DB_PATH = os.path.join(PREDICTIONS_DIR, "predictions.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    window INTEGER,
+    predicted_next_close REAL,
+    predicted_next_week REAL,
+    predicted_month REAL,
+    technicals TEXT,
+    actual_close REAL,
+    resolved INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS predictions_symbol_date ON predictions (symbol, date);
+CREATE INDEX IF NOT EXISTS predictions_unresolved ON predictions (symbol) WHERE resolved = 0;
+
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    rows INTEGER
+);
+"""
+# One prediction per symbol, day and window. Databases created before the key
+# existed may hold duplicates from repeated imports: keep the newest of each.
+UNIQUE_KEY = """
+DELETE FROM predictions WHERE id NOT IN (SELECT MAX(id) FROM predictions GROUP BY symbol, date, window);
+CREATE UNIQUE INDEX IF NOT EXISTS predictions_key ON predictions (symbol, date, window);
+"""
+COLUMNS = ("symbol", "date", "window", "predicted_next_close", "predicted_next_week", "predicted_month",
+           "technicals")
+
+_local = threading.local()
+_import_lock = threading.RLock()
+
+def connect(path: str = None) -> sqlite3.Connection:
+    """Per-thread connection to the prediction database, created (with its schema) on first use."""
+    path = path or DB_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        created = not os.path.exists(path)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'predictions_key'").fetchone() is None:
+            conn.executescript(UNIQUE_KEY)
+        connections[path] = conn
+        if created and path == DB_PATH:
+            # First use after upgrading: bring in the predictions logged as JSON so far.
+            import_json(PREDICTIONS_DIR, path=path)
+    return conn
+
+def _row_values(p: dict) -> tuple:
+    technicals = p.get("technicals")
+    return (
+        p["symbol"], p["date"], p.get("window"), p.get("predicted_next_close"), p.get("predicted_next_week"),
+        p.get("predicted_month"), json.dumps(technicals) if technicals is not None else None,
+    )
+
+def _insert(conn, predictions, replace: bool = True) -> int:
+    rows = [_row_values(p) for p in predictions]
+    query = f"INSERT OR IGNORE INTO predictions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+    if replace:
+        query = query.replace("OR IGNORE ", "") + (
+            " ON CONFLICT (symbol, date, window) DO UPDATE SET "
+            + ", ".join(f"{c} = excluded.{c}" for c in COLUMNS[3:]))
+    before = conn.total_changes
+    conn.executemany(query, rows)
+    return conn.total_changes - before
+
+def save_predictions(predictions, path: str = None) -> int:
+    """
+    Insert many prediction dicts (the layout of the old JSON files) in one
+    transaction. A prediction for a symbol, day and window already stored is
+    replaced by the new one.
+    """
+    conn = connect(path)
+    with conn:
+        return _insert(conn, predictions)
+
+def save_prediction(symbol, window, price, week, month, technicals, date=None, path: str = None):
+    save_predictions([{
+        "symbol": symbol,
+        "date": date or datetime.date.today().isoformat(),
+        "window": window,
+        "predicted_next_close": price,
+        "predicted_next_week": week,
+        "predicted_month": month,
+        "technicals": technicals,
+    }], path)
+
+def _to_dict(row) -> dict:
+    out = dict(row)
+    if out.get("technicals"):
+        out["technicals"] = json.loads(out["technicals"])
+    return out
+
+def predictions(symbol: str, start: str = None, end: str = None, path: str = None) -> list:
+    """`symbol`'s predictions between ISO dates `start` and `end` (inclusive), oldest first."""
+    query, args = "SELECT * FROM predictions WHERE symbol = ?", [symbol]
+    if start:
+        query += " AND date >= ?"
+        args.append(start)
+    if end:
+        query += " AND date <= ?"
+        args.append(end)
+    rows = connect(path).execute(query + " ORDER BY date, id", args).fetchall()
+    return [_to_dict(r) for r in rows]
+
+def latest_prediction(symbol: str, path: str = None):
+    row = connect(path).execute(
+        "SELECT * FROM predictions WHERE symbol = ? ORDER BY date DESC, id DESC LIMIT 1", (symbol,)
+    ).fetchone()
+    return _to_dict(row) if row else None
+
+def resolve_actuals(symbol: str, records=None, path: str = None) -> int:
+    """
+    Fill in the actual close of every unresolved prediction whose date is
+    covered by the stored history (found by binary search on the history).
+    Predictions dated after the last bar stay unresolved, so each call only
+    touches the few newest rows. Returns the number of rows resolved.
+    """
+    conn = connect(path)
+    pending = conn.execute(
+        "SELECT id, date FROM predictions WHERE symbol = ? AND resolved = 0", (symbol,)
+    ).fetchall()
+    if not pending:
+        return 0
+    if records is None:
+        if history_source(symbol) is None:
+            return 0
+        from history_cache import get_history
+        records = get_history(symbol)
+    if len(records) == 0:
+        return 0
+    last_date = str(days_to_dates(records["date"][-1:])[0])
+    updates = []
+    for row in pending:
+        if row["date"] > last_date:
+            continue
+        idx = find_date(records, row["date"])
+        # Dates that are not trading days are resolved without an actual close.
+        actual = float(records["close"][idx]) if idx is not None else None
+        updates.append((actual, row["id"]))
+    with conn:
+        conn.executemany("UPDATE predictions SET actual_close = ?, resolved = 1 WHERE id = ?", updates)
+    return len(updates)
+
+def last_with_actual(symbol: str, path: str = None):
+    """The newest prediction of `symbol` that has an actual close to compare with, or None."""
+    resolve_actuals(symbol, path=path)
+    row = connect(path).execute(
+        "SELECT * FROM predictions WHERE symbol = ? AND actual_close IS NOT NULL "
+        "ORDER BY date DESC, id DESC LIMIT 1", (symbol,)
+    ).fetchone()
+    return _to_dict(row) if row else None
+
+def import_json(directory: str = PREDICTIONS_DIR, remove_json: bool = False, path: str = None) -> dict:
+    """
+    Import the legacy predictions/<SYMBOL>_predictions.json files. Each file
+    is imported once (recorded in the migrations table, in the same
+    transaction as its rows) and predictions already stored are skipped, so
+    this is safe to call repeatedly. Of several predictions a file holds for
+    the same day and window, the last (newest) one is kept. Returns
+    {symbol: rows imported}.
+    """
+    imported = {}
+    with _import_lock:
+        conn = connect(path)
+        for fname in sorted(glob.glob(os.path.join(directory, "*_predictions.json"))):
+            symbol = os.path.basename(fname)[:-len("_predictions.json")]
+            try:
+                with open(fname, "r") as f:
+                    rows = json.load(f)
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if conn.execute("SELECT 1 FROM migrations WHERE name = ?", (fname,)).fetchone():
+                        conn.rollback()
+                        continue
+                    # The files were appended to, so the last prediction for a day is the newest one.
+                    newest = {}
+                    for r in rows:
+                        r = {**r, "symbol": r.get("symbol", symbol)}
+                        newest[(r["symbol"], r["date"], r.get("window"))] = r
+                    count = _insert(conn, list(newest.values()), replace=False)
+                    conn.execute("INSERT INTO migrations (name, rows) VALUES (?, ?)", (fname, count))
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                if remove_json:
+                    os.remove(fname)
+                imported[symbol] = count
+                print(f"✅ Imported {count} predictions for {symbol}")
+            except Exception as e:
+                print(f"❌ Failed to import {fname}: {e}")
+    return imported
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "--import":
+        import_json(remove_json="--remove-json" in args)
+    elif args == ["--stats"]:
+        for row in connect().execute("SELECT symbol, COUNT(*) AS n, MAX(date) AS last FROM predictions GROUP BY symbol"):
+            print(f"{row['symbol']}: {row['n']} predictions, last {row['last']}")
+    else:
+        print("Usage: python -m ml.prediction_store --import [--remove-json] | --stats")
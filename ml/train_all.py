@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import contextlib
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from history_store import history_source
+from ml.model_registry import MODEL_DIR, safe_model_name, has_model
+
+LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
+SUMMARY_FILE = os.path.join(LOG_DIR, "train_all.json")
+WATCHLIST_FILE = "data/watchlist.json"
+# Small LSTMs stop scaling beyond a couple of threads, so more processes with
+# fewer threads each beat one process using every core.
+THREADS_PER_WORKER = int(os.environ.get("TRAIN_THREADS_PER_WORKER", 2))
+FINE_TUNE_EPOCHS = 3
+
+def meta_path(symbol: str) -> str:
+    return os.path.join(MODEL_DIR, f"{safe_model_name(symbol)}_meta.json")
+
+def log_path(symbol: str, log_dir: str = LOG_DIR) -> str:
+    return os.path.join(log_dir, f"{safe_model_name(symbol)}.log")
+
+def history_fingerprint(symbol: str):
+    """sha256 of the file backing `symbol`'s history, or None if there is none."""
+    path = history_source(symbol)
+    if path is None:
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_meta(symbol: str) -> dict:
+    try:
+        with open(meta_path(symbol), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_meta(symbol: str, meta: dict):
+    path = meta_path(symbol)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, path)
+
+def is_up_to_date(symbol: str, window: int, fingerprint: str = None) -> bool:
+    """True if a model exists that was trained on exactly the current history with the same window."""
+    if not has_model(symbol):
+        return False
+    meta = load_meta(symbol)
+    fingerprint = fingerprint or history_fingerprint(symbol)
+    return fingerprint is not None and meta.get("history_sha256") == fingerprint and meta.get("window") == window
+
+def thread_settings(workers: int, cores: int = None):
+    """(intra_op, inter_op) thread counts for each of `workers` processes sharing `cores` cores."""
+    cores = cores or os.cpu_count() or 1
+    intra = max(1, cores // max(1, workers))
+    inter = 2 if intra >= 4 else 1
+    return intra, inter
+
+def _init_worker(intra: int, inter: int):
+    """Process-pool initializer: pin TensorFlow's thread pools before any op runs."""
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter)
+    os.environ["OMP_NUM_THREADS"] = str(intra)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra)
+    tf.config.threading.set_inter_op_parallelism_threads(inter)
+
+def _history_summary(symbol: str) -> dict:
+    from history_store import load_history, days_to_dates
+    records = load_history(symbol)
+    last = str(days_to_dates(records["date"][-1:])[0]) if len(records) else None
+    return {"rows": len(records), "last_date": last}
+
+def train_symbol(symbol: str, window: int = 60, epochs: int = 20, force: bool = False,
+                 log_dir: str = LOG_DIR, fine_tune: bool = False) -> dict:
+    """
+    Train one symbol (in the current process), sending its output to
+    ml/logs/<symbol>.log and recording the history fingerprint in the model's
+    meta file. With `fine_tune`, the saved model is warm-started on the bars
+    added since it was last trained (see fine_tune_model); symbols without a
+    model get a full training. Returns a status dict: trained, fine_tuned,
+    skipped or failed.
+    """
+    started = time.monotonic()
+    status = {"symbol": symbol, "log": log_path(symbol, log_dir), "seconds": 0.0, "error": None}
+    fingerprint = history_fingerprint(symbol)
+    if fingerprint is None:
+        return {**status, "status": "failed", "error": "no history"}
+    if not force and is_up_to_date(symbol, window, fingerprint):
+        return {**status, "status": "skipped"}
+
+    from ml.train_lstm_model import train_model, fine_tune_model
+    fine_tune = fine_tune and has_model(symbol)
+    history = _history_summary(symbol)
+    os.makedirs(log_dir, exist_ok=True)
+    with open(status["log"], "a" if fine_tune else "w", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        mode = "fine-tuning" if fine_tune else "training"
+        print(f"{datetime.now().isoformat(timespec='seconds')} {mode} {symbol} (window={window}, epochs={epochs})")
+        try:
+            if fine_tune:
+                trained_rows = load_meta(symbol).get("rows")
+                new_rows = history["rows"] - trained_rows if trained_rows else None
+                model_path = fine_tune_model(symbol, window=window, new_rows=new_rows, epochs=epochs, verbose=2)
+            else:
+                model_path = train_model(symbol, window=window, epochs=epochs, verbose=2)
+        except Exception as e:
+            model_path = None
+            status["error"] = str(e)
+            print(f"❌ {e}")
+        seconds = time.monotonic() - started
+        print(f"{datetime.now().isoformat(timespec='seconds')} finished in {seconds:.1f}s")
+
+    status["seconds"] = round(seconds, 2)
+    if model_path is None:
+        return {**status, "status": "failed", "error": status["error"] or f"see {status['log']}"}
+    meta = load_meta(symbol) if fine_tune else {}
+    meta.update({
+        "history_sha256": fingerprint,
+        **history,
+        "window": window,
+        ("fine_tune_epochs" if fine_tune else "epochs"): epochs,
+        ("fine_tuned_at" if fine_tune else "trained_at"): datetime.now().isoformat(timespec="seconds"),
+        "seconds": status["seconds"],
+    })
+    save_meta(symbol, meta)
+    return {**status, "status": "fine_tuned" if fine_tune else "trained"}
+
+def train_all(symbols, window=60, epochs=20, workers=None, force=False, log_dir=LOG_DIR,
+              on_status=None, summary_path=SUMMARY_FILE, fine_tune=False) -> list:
+    """
+    Train `symbols` on a spawn process pool. Symbols whose history is unchanged
+    since their model was saved are skipped up front without starting a worker.
+    Each worker's TensorFlow intra/inter-op pools are sized so that all workers
+    together use every core once. Returns the status of every symbol.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    statuses = []
+    def report(status):
+        statuses.append(status)
+        if on_status:
+            on_status(status)
+
+    pending = []
+    for symbol in symbols:
+        if not force and is_up_to_date(symbol, window):
+            report({"symbol": symbol, "status": "skipped", "seconds": 0.0, "error": None,
+                    "log": log_path(symbol, log_dir)})
+        else:
+            pending.append(symbol)
+
+    if pending:
+        cores = os.cpu_count() or 1
+        workers = max(1, min(len(pending), workers or cores // THREADS_PER_WORKER or 1))
+        intra, inter = thread_settings(workers, cores)
+        print(f"🧠 Training {len(pending)} symbols on {workers} processes "
+              f"({intra} intra-op / {inter} inter-op threads each)")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(intra, inter)) as pool:
+            futures = {pool.submit(train_symbol, s, window, epochs, True, log_dir, fine_tune): s for s in pending}
+            for future in as_completed(futures):
+                try:
+                    report(future.result())
+                except Exception as e:
+                    report({"symbol": futures[future], "status": "failed", "seconds": 0.0, "error": str(e),
+                            "log": log_path(futures[future], log_dir)})
+
+    if summary_path:
+        os.makedirs(os.path.dirname(summary_path) or ".", exist_ok=True)
+        with open(summary_path, "w") as f:
+            json.dump({"finished": datetime.now().isoformat(timespec="seconds"), "symbols": statuses}, f, indent=2)
+    return statuses
+
+def print_report(statuses):
+    icons = {"trained": "✅", "fine_tuned": "✅", "skipped": "⏭️", "failed": "❌"}
+    for s in sorted(statuses, key=lambda s: s["symbol"]):
+        detail = s["status"] + (f": {s['error']}" if s.get("error") else "")
+        print(f"{icons.get(s['status'], '•')} {s['symbol']}: {detail} ({s['seconds']:.1f}s, log: {s['log']})")
+
+def _watchlist():
+    with open(WATCHLIST_FILE, "r") as f:
+        return json.load(f).get("stocks", [])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train LSTM models for the watchlist on a process pool.")
+    parser.add_argument("symbols", nargs="*", help="symbols to train (default: data/watchlist.json)")
+    parser.add_argument("--workers", type=int, help="training processes (default: cores / TRAIN_THREADS_PER_WORKER)")
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--epochs", type=int, help="default: 20, or 3 with --fine-tune")
+    parser.add_argument("--force", action="store_true", help="retrain even if the history is unchanged")
+    parser.add_argument("--fine-tune", action="store_true",
+                        help="warm-start existing models on the newest bars instead of training from scratch")
+    args = parser.parse_args(argv)
+
+    try:
+        symbols = args.symbols or _watchlist()
+    except Exception as e:
+        print(f"❌ Failed to read {WATCHLIST_FILE}: {e}")
+        return 1
+    if not symbols:
+        print("❌ No symbols to train.")
+        return 1
+    started = time.monotonic()
+    epochs = args.epochs or (FINE_TUNE_EPOCHS if args.fine_tune else 20)
+    statuses = train_all(symbols, window=args.window, epochs=epochs, workers=args.workers, force=args.force,
+                         fine_tune=args.fine_tune,
+                         on_status=lambda s: print(f"• {s['symbol']}: {s['status']} ({s['seconds']:.1f}s)"))
+    print_report(statuses)
+    print(f"⏱️ Total {time.monotonic() - started:.1f}s")
+    return 1 if any(s["status"] == "failed" for s in statuses) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
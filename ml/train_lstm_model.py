@@ -1,15 +1,16 @@
 import os
-import json
+import sys
 import joblib
 import numpy as np
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
-from sklearn.preprocessing import MinMaxScaler
 
 # Import from the ml package
 from ml.prepare_data import load_stock_data
+from ml.dataset import load_series, window_view, to_tf_dataset
 
-def train_model(symbol: str, window=60, epochs=20, batch_size=32):
+def train_model(symbol: str, window=60, epochs=20, batch_size=32, verbose=1):
+    """Train a fresh model for `symbol` and save it. Returns the model path, or None on failure."""
     print(f"\n🔁 Training model for {symbol}...")
 
     # Load data and scaler
@@ -17,11 +18,11 @@ def train_model(symbol: str, window=60, epochs=20, batch_size=32):
         X, y, scaler = load_stock_data(symbol, window=window)
     except Exception as e:
         print(f"❌ Failed to load data for {symbol}: {e}")
-        return
+        return None
 
     if X.size == 0:
         print(f"❌ Not enough data to train for {symbol}.")
-        return
+        return None
 
     # Define LSTM model
     model = Sequential()
@@ -33,8 +34,8 @@ def train_model(symbol: str, window=60, epochs=20, batch_size=32):
 
     model.compile(optimizer="adam", loss="mean_squared_error")
 
-    # Train
-    model.fit(X, y, epochs=epochs, batch_size=batch_size, verbose=1)
+    # Train on batches gathered from the window view; X itself is never copied
+    model.fit(to_tf_dataset(X, y, batch_size=batch_size, shuffle=True, seed=0), epochs=epochs, verbose=verbose)
 
     # Prepare directories
     trained_dir = os.path.join(os.path.dirname(__file__), "trained_models")
@@ -53,22 +54,57 @@ def train_model(symbol: str, window=60, epochs=20, batch_size=32):
         print(f"✅ Scaler saved to {scaler_path}")
     except Exception as e:
         print(f"❌ Failed to save model/scaler for {symbol}: {e}")
+        return None
+    return model_path
+
+def fine_tune_model(symbol: str, window=60, new_rows=None, min_recent=20, replay=256, epochs=3,
+                    batch_size=32, learning_rate=1e-4, verbose=0, seed=None):
+    """
+    Warm-start `symbol`'s saved model and train it briefly on the newest windows.
+
+    Windows whose target is one of the last `new_rows` bars (at least
+    `min_recent`) are mixed with a random replay sample of `replay` older
+    windows so the model does not forget the rest of the history. The saved
+    scaler is reused unchanged, so the model's inputs keep their meaning, and
+    a low learning rate keeps the update small. The model file is replaced
+    atomically. Returns the model path, or None if there is no model to start from.
+    """
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.optimizers import Adam
+    from ml.model_registry import model_paths, has_model, invalidate
+
+    if not has_model(symbol):
+        print(f"❌ No saved model to fine-tune for {symbol}; run a full training first.")
+        return None
+    model_path, scaler_path = model_paths(symbol)
+    series = load_series(symbol)
+    if len(series) <= window:
+        print(f"❌ Not enough data to fine-tune {symbol}.")
+        return None
+    X_all, y_all = window_view(joblib.load(scaler_path).transform(series).astype(np.float32), window)
+
+    samples = np.arange(len(X_all))
+    recent = max(min_recent, new_rows or 0)
+    recent_samples, older_samples = samples[-recent:], samples[:-recent]
+    rng = np.random.default_rng(seed)
+    if len(older_samples) > replay:
+        older_samples = rng.choice(older_samples, size=replay, replace=False)
+    selected = np.sort(np.concatenate([recent_samples, older_samples]))
+    X, y = X_all[selected], y_all[selected]
+
+    model = load_model(model_path, compile=False)
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss="mean_squared_error")
+    print(f"🔁 Fine-tuning {symbol} on {len(recent_samples)} new + {len(older_samples)} replay windows")
+    model.fit(X, y, epochs=epochs, batch_size=batch_size, shuffle=True, verbose=verbose)
+
+    tmp_path = model_path[:-len(".h5")] + ".tmp.h5"
+    model.save(tmp_path)
+    os.replace(tmp_path, model_path)
+    invalidate(symbol)
+    print(f"✅ Fine-tuned model saved to {model_path}")
+    return model_path
 
 if __name__ == "__main__":
-    # Load watchlist.json from project root
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    watchlist_path = os.path.join(project_root, "data/watchlist.json")
-    if not os.path.exists(watchlist_path):
-        print(f"❌ data/watchlist.json not found at {watchlist_path}")
-    else:
-        with open(watchlist_path, "r") as f:
-            try:
-                symbols = json.load(f).get("stocks", [])
-            except Exception as e:
-                print(f"❌ Failed to parse watchlist.json: {e}")
-                symbols = []
-        if not symbols:
-            print("❌ No symbols in watchlist.json to train.")
-        else:
-            for symbol in symbols:
-                train_model(symbol, window=60)
+    # Trains the whole watchlist in parallel; see ml/train_all.py for the options.
+    from ml.train_all import main
+    sys.exit(main())
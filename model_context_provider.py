@@ -1,28 +1,35 @@
-import os
-import json
-
-TRADE_LOG_PATH = "data/trade_log.json"
-NEWS_PATH = "data/news.json"
-
-def safe_load_json(path, default):
-    if not os.path.exists(path):
-        return default
+import datetime
+import data_repository
+from prompt_builder import PROMPT_NEWS_TOKENS, PROMPT_NEWS_DAYS, summarize_trades, format_trade_summary, news_section
 
+def load_trades(symbol: str = None) -> list:
+    """Trades of `symbol` (all trades if None), read from the indexed repository."""
     try:
-        with open(path, "r") as f:
-            content = f.read().strip()
-            if not content:
-                return default
-            data = json.loads(content)
-            return data
+        return data_repository.get_trades(symbol)
     except Exception as e:
-        print(f"⚠️ Failed to load {path}: {e}")
-        return default
+        print(f"⚠️ Failed to load trades: {e}")
+        return []
 
-def get_trade_context() -> str:
-    trades = safe_load_json(TRADE_LOG_PATH, [])
-
-    if not isinstance(trades, list) or not trades:
+def load_news(symbol: str, today: str = None, max_days: int = PROMPT_NEWS_DAYS) -> list:
+    """`symbol`'s headlines from the last `max_days` days, newest first; nothing older is read."""
+    today = datetime.date.fromisoformat(today) if today else datetime.date.today()
+    start = (today - datetime.timedelta(days=max_days)).isoformat()
+    try:
+        return data_repository.get_news(symbol, start=start, end=today.isoformat())
+    except Exception as e:
+        print(f"⚠️ Failed to load news for {symbol}: {e}")
+        return []
+
+def get_trade_context(symbol: str = None, last_close: float = None) -> str:
+    """
+    Trade history for the prompt. With a symbol, only that symbol's trades
+    are used, compressed into position, average cost and the latest entries.
+    """
+    if symbol is not None:
+        return format_trade_summary(summarize_trades(load_trades(symbol), symbol), last_close)
+
+    trades = load_trades()
+    if not trades:
         return "No past trades found."
 
     summary = []
@@ -32,15 +39,10 @@ def get_trade_context() -> str:
         )
     return "\n".join(summary)
 
-def get_news_summary(symbol: str) -> str:
-    news = safe_load_json(NEWS_PATH, {})
-
-    if not isinstance(news, dict):
-        return f"No news found for {symbol}."
-
-    stock_news = news.get(symbol, [])
+def get_news_summary(symbol: str, today: str = None, token_budget: int = PROMPT_NEWS_TOKENS) -> str:
+    """The symbol's most relevant recent headlines, trimmed to `token_budget` tokens."""
+    stock_news = load_news(symbol, today)
     if not stock_news:
         return f"No news found for {symbol}."
 
-    # Show date and headline for each news item
-    return "\n".join(f"- [{item['date']}] {item['headline']}" for item in stock_news)
+    return news_section(stock_news, symbol, today, token_budget)
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import httpx
+import data_repository
+import tracing
+from stock_data import google_news_url, parse_google_news
+
+NEWS_CACHE_PATH = "data/news_cache.json"
+# Seconds a symbol's feed is served from the cache before it is re-validated.
+NEWS_TTL = int(os.environ.get("NEWS_TTL", 30 * 60))
+NEWS_CONCURRENCY = int(os.environ.get("NEWS_CONCURRENCY", 8))
+NEWS_TIMEOUT = 15.0
+
+_file_lock = threading.Lock()
+
+def _load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Failed to load {path}: {e}")
+        return default
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _is_fresh(entry, ttl, now):
+    return entry is not None and now - entry.get("fetched_at", 0) < ttl
+
+async def _fetch(client, semaphore, symbol, entry, days):
+    """
+    Fetch one feed, sending the cached ETag / Last-Modified validators.
+    Returns the updated cache entry; on a 304 the cached items are kept.
+    """
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    async with semaphore:
+        response = await client.get(google_news_url(symbol), headers=headers)
+
+    if response.status_code == 304 and entry is not None:
+        return {**entry, "fetched_at": time.time(), "status": 304}
+    response.raise_for_status()
+    return {
+        "fetched_at": time.time(),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "status": response.status_code,
+        "items": parse_google_news(response.content, days),
+    }
+
+async def refresh_news(symbols, days=90, ttl=NEWS_TTL, force=False, news_path=None,
+                       cache_path=NEWS_CACHE_PATH, concurrency=NEWS_CONCURRENCY) -> dict:
+    """
+    Refresh the Google News feeds of `symbols` concurrently and return {symbol: items}.
+
+    Feeds fetched less than `ttl` seconds ago are served from the cache
+    without any request (unless `force`); stale ones are re-validated with a
+    conditional GET. Fetched headlines are appended to the news table of
+    data_repository (headlines already stored are skipped); `news_path`, if
+    given, additionally gets a JSON export of the refreshed symbols.
+    """
+    with _file_lock:
+        cache = _load_json(cache_path, {})
+    now = time.time()
+    stale = [s for s in dict.fromkeys(symbols) if force or not _is_fresh(cache.get(s), ttl, now)]
+
+    tracing.set_attrs(feeds=len(stale), cached=len(symbols) - len(stale))
+    if stale:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        with tracing.span("news.fetch", feeds=len(stale)) as sp:
+            async with httpx.AsyncClient(timeout=NEWS_TIMEOUT, follow_redirects=True,
+                                         headers={"User-Agent": "Mozilla/5.0"}) as client:
+                results = await asyncio.gather(
+                    *(_fetch(client, semaphore, s, cache.get(s), days) for s in stale),
+                    return_exceptions=True,
+                )
+            sp.set(not_modified=sum(1 for r in results if isinstance(r, dict) and r.get("status") == 304),
+                   failed=sum(1 for r in results if isinstance(r, Exception)))
+        for symbol, result in zip(stale, results):
+            if isinstance(result, Exception):
+                print(f"Failed to fetch news for {symbol}: {result}")
+                if symbol not in cache:
+                    cache[symbol] = {"fetched_at": 0, "items": []}
+            else:
+                cache[symbol] = result
+
+    news = {s: cache.get(s, {}).get("items", []) for s in symbols}
+    if not stale:
+        return news
+    with tracing.span("news.store") as sp:
+        sp.set(added=sum(data_repository.add_news(symbol, news.get(symbol, [])) for symbol in stale))
+    with _file_lock:
+        # Re-read the cache under the lock so concurrent refreshes of other symbols are not lost.
+        merged_cache = _load_json(cache_path, {})
+        merged_cache.update({s: cache[s] for s in stale if s in cache})
+        _write_json(cache_path, merged_cache)
+    if news_path:
+        data_repository.export_news_json(symbols, news_path)
+    return news
+
+def refresh_news_sync(symbols, **kwargs) -> dict:
+    """Blocking wrapper around refresh_news for non-async callers."""
+    return asyncio.run(refresh_news(symbols, **kwargs))
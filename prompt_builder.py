@@ -0,0 +1,121 @@
+import os
+import re
+import datetime
+
+# Rough budget for the news section; local models slow down sharply with prompt length.
+PROMPT_NEWS_TOKENS = int(os.environ.get("PROMPT_NEWS_TOKENS", 250))
+# Headlines older than this are never sent.
+PROMPT_NEWS_DAYS = int(os.environ.get("PROMPT_NEWS_DAYS", 30))
+# How many of the symbol's most recent trades are listed individually.
+PROMPT_RECENT_TRADES = int(os.environ.get("PROMPT_RECENT_TRADES", 5))
+# Average characters per token for Llama-style tokenizers on English text.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer needed); Ollama reports the exact count after the call."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def summarize_trades(trades: list, symbol: str, recent: int = PROMPT_RECENT_TRADES) -> dict:
+    """
+    Aggregate `symbol`'s trades into a position: open quantity, average cost
+    of the open quantity, realised P&L and the `recent` latest entries.
+    Trades without a quantity count as one share.
+    """
+    own = sorted((t for t in trades if t.get("symbol") == symbol), key=lambda t: t.get("date", ""))
+    quantity, cost, realised = 0.0, 0.0, 0.0
+    for trade in own:
+        qty = float(trade.get("quantity", 1) or 1)
+        price = float(trade["price"])
+        action = str(trade.get("action", "")).upper()
+        if action == "SELL":
+            sold = min(qty, quantity)
+            if quantity:
+                avg = cost / quantity
+                realised += sold * (price - avg)
+                cost -= sold * avg
+            quantity -= sold
+        else:
+            quantity += qty
+            cost += qty * price
+    return {
+        "symbol": symbol,
+        "trades": len(own),
+        "quantity": quantity,
+        "avg_cost": cost / quantity if quantity else None,
+        "realised": realised,
+        "first_date": own[0].get("date") if own else None,
+        "recent": own[-recent:][::-1] if recent else [],
+    }
+
+def format_trade_summary(summary: dict, last_close: float = None) -> str:
+    if not summary["trades"]:
+        return f"No past trades in {summary['symbol']}."
+    lines = []
+    if summary["quantity"]:
+        line = f"Position: {summary['quantity']:g} shares, avg cost ₹{summary['avg_cost']:.2f}"
+        if last_close:
+            line += f" (last close {(last_close / summary['avg_cost'] - 1) * 100:+.1f}% vs cost)"
+        lines.append(line)
+    else:
+        lines.append("Position: none open")
+    lines.append(f"{summary['trades']} trades since {summary['first_date']}")
+    if summary["realised"]:
+        lines.append(f"Realised P&L: ₹{summary['realised']:.2f}")
+    if summary["recent"]:
+        lines.append("Latest:")
+        lines.extend(
+            f"- {t['date']} {str(t.get('action', '')).upper()} {t.get('quantity', 1)} at ₹{t['price']}"
+            for t in summary["recent"]
+        )
+    return "\n".join(lines)
+
+def _keywords(symbol: str) -> list:
+    base = symbol.split(".")[0]
+    return [k for k in {base.lower(), re.sub(r"[^a-z]", "", base.lower())} if len(k) >= 3]
+
+def rank_news(items: list, symbol: str, today: str = None, max_days: int = PROMPT_NEWS_DAYS) -> list:
+    """
+    Order headlines by relevance: the newest first, with headlines that name
+    the ticker ahead of same-age ones that do not. Headlines older than
+    `max_days` and duplicates (same text, different source) are dropped.
+    """
+    today = datetime.date.fromisoformat(today) if today else datetime.date.today()
+    keywords = _keywords(symbol)
+    seen, ranked = set(), []
+    for item in items:
+        try:
+            age = (today - datetime.date.fromisoformat(item["date"])).days
+        except (KeyError, ValueError):
+            continue
+        if age > max_days:
+            continue
+        headline = " ".join(str(item.get("headline", "")).split())
+        key = headline.rsplit(" - ", 1)[0].lower()
+        if not headline or key in seen:
+            continue
+        seen.add(key)
+        mentions = any(k in headline.lower() for k in keywords)
+        # A mention is worth about a week of recency.
+        ranked.append((age - (7 if mentions else 0), -len(ranked), {**item, "headline": headline}))
+    ranked.sort(key=lambda r: (r[0], -r[1]))
+    return [item for _, _, item in ranked]
+
+def trim_news(items: list, token_budget: int = PROMPT_NEWS_TOKENS) -> list:
+    """Keep the leading headlines of `items` whose formatted lines fit in `token_budget` tokens."""
+    kept, used = [], 0
+    for item in items:
+        cost = estimate_tokens(format_news_line(item)) + 1
+        if used + cost > token_budget:
+            break
+        kept.append(item)
+        used += cost
+    return kept
+
+def format_news_line(item: dict) -> str:
+    return f"- [{item['date']}] {item['headline']}"
+
+def news_section(items: list, symbol: str, today: str = None, token_budget: int = PROMPT_NEWS_TOKENS) -> str:
+    selected = trim_news(rank_news(items, symbol, today), token_budget)
+    if not selected:
+        return f"No recent news found for {symbol}."
+    return "\n".join(format_news_line(item) for item in selected)
@@ -0,0 +1,234 @@
+# scan_watchlist.py
+
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+WATCHLIST_FILE = "data/watchlist.json"
+REPORT_DIR = "reports"
+# Forecasts and technicals run on this many threads (NumPy/TensorFlow release the GIL).
+SCAN_WORKERS = int(os.environ.get("SCAN_WORKERS", max(1, min(8, os.cpu_count() or 1))))
+# Requests in flight to Ollama at once; match the server's OLLAMA_NUM_PARALLEL.
+SCAN_LLM_CONCURRENCY = int(os.environ.get("SCAN_LLM_CONCURRENCY", os.environ.get("OLLAMA_NUM_PARALLEL", 1)))
+
+def load_watchlist(path=WATCHLIST_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f).get("stocks", [])
+    return []
+
+def _pct(value, base):
+    return round((value / base - 1) * 100, 2) if base else None
+
+def numeric_stage(symbol: str) -> dict:
+    """Forecasts, technicals and prompt context for `symbol` (everything except the LLM)."""
+    import tracing
+    from llm_agent import gather_inputs
+    from history_store import last_close
+    from history_cache import get_history
+
+    started = time.monotonic()
+    result = {"symbol": symbol}
+    try:
+        with tracing.trace("scan.numeric", symbol=symbol):
+            close = last_close(get_history(symbol))
+            inputs = gather_inputs(symbol, close)
+    except Exception as e:
+        result.update(status="failed", stage="numeric", error=str(e))
+    else:
+        result.update(
+            status="ok",
+            inputs=inputs,
+            last_close=close,
+            predicted={"1d": inputs["predicted_price"], "5d": inputs["predicted_week"],
+                       "20d": inputs["predicted_month"]},
+            change_pct={"1d": _pct(inputs["predicted_price"], close), "5d": _pct(inputs["predicted_week"], close),
+                        "20d": _pct(inputs["predicted_month"], close)},
+            technicals=inputs["technicals"],
+        )
+    result["numeric_seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+def llm_stage(result: dict, use_cache: bool = True) -> dict:
+    """Ask the LLM about one numeric result and parse the answer into it."""
+    import tracing
+    import llm_scheduler
+    from llm_agent import answer, parse_suggestion
+
+    started = time.monotonic()
+    try:
+        with tracing.trace("scan.llm", symbol=result["symbol"]):
+            response, cached = answer(result["inputs"], use_cache=use_cache, priority=llm_scheduler.BATCH)
+    except Exception as e:
+        response, cached = f"❌ LLM Error: {e}", False
+    result.update(response=response, cached=cached, **parse_suggestion(response))
+    if response.startswith("❌"):
+        result.update(status="failed", stage="llm", error=response)
+    result["llm_seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+def rank_results(results: list) -> list:
+    """Order by action (Buy, Average, Hold, Exit), then confidence, then 20-day forecast; failures last."""
+    from llm_agent import ACTIONS
+
+    def key(r):
+        if r["status"] != "ok":
+            return (2, 0, 0, 0, r["symbol"])
+        action = r.get("action")
+        order = ACTIONS.index(action) if action in ACTIONS else len(ACTIONS)
+        change = (r.get("change_pct") or {}).get("20d")
+        return (0, order, -(r.get("confidence") or 0), -(change if change is not None else float("-inf")),
+                r["symbol"])
+    ranked = sorted(results, key=key)
+    for rank, r in enumerate(ranked, 1):
+        r["rank"] = rank
+    return ranked
+
+def scan(symbols, workers=SCAN_WORKERS, llm_concurrency=SCAN_LLM_CONCURRENCY, use_llm=True, use_cache=True,
+         refresh_news=True, log=print) -> dict:
+    """
+    Run the suggestion pipeline for every symbol. News for all symbols is
+    refreshed in one concurrent batch; the numeric stages run on `workers`
+    threads and each result is queued for the LLM as soon as it is ready, with
+    at most `llm_concurrency` requests in flight. Returns the report dict.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    started = time.monotonic()
+    timings = {}
+    if refresh_news and symbols:
+        from news_service import refresh_news_sync
+        news_started = time.monotonic()
+        try:
+            refresh_news_sync(symbols)
+        except Exception as e:
+            log(f"⚠️ News refresh failed: {e}")
+        timings["news_seconds"] = round(time.monotonic() - news_started, 3)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="scan") as numeric_pool, \
+            ThreadPoolExecutor(max_workers=max(1, llm_concurrency), thread_name_prefix="scan-llm") as llm_pool:
+        numeric = [numeric_pool.submit(numeric_stage, s) for s in symbols]
+        pending_llm = []
+        for future in as_completed(numeric):
+            result = future.result()
+            if result["status"] == "ok" and use_llm:
+                pending_llm.append(llm_pool.submit(llm_stage, result, use_cache))
+            else:
+                results.append(result)
+                if result["status"] != "ok":
+                    log(f"❌ {result['symbol']}: {result['error']}")
+        timings["numeric_done_seconds"] = round(time.monotonic() - started, 3)
+        for future in as_completed(pending_llm):
+            result = future.result()
+            results.append(result)
+            if result["status"] == "ok":
+                log(f"✅ {result['symbol']}: {result.get('action') or '?'} "
+                    f"({result.get('confidence') if result.get('confidence') is not None else '?'}%)"
+                    f"{' ⚡' if result.get('cached') else ''} [{len(results)}/{len(symbols)}]")
+            else:
+                log(f"❌ {result['symbol']}: {result['error']}")
+
+    for r in results:
+        r.pop("inputs", None)
+    elapsed = time.monotonic() - started
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "symbols": len(symbols),
+        "succeeded": sum(r["status"] == "ok" for r in results),
+        "failed": sum(r["status"] != "ok" for r in results),
+        "llm": use_llm,
+        "workers": workers,
+        "llm_concurrency": llm_concurrency,
+        "seconds": round(elapsed, 3),
+        "symbols_per_minute": round(len(symbols) / elapsed * 60, 1) if elapsed else None,
+        **timings,
+        "results": rank_results(results),
+    }
+
+def _fmt(value, fmt="{:.2f}"):
+    return fmt.format(value) if value is not None else "-"
+
+def markdown_report(report: dict) -> str:
+    lines = [
+        f"# Watchlist scan — {report['generated']}",
+        "",
+        f"{report['succeeded']}/{report['symbols']} symbols in {report['seconds']:.1f}s "
+        f"({report['symbols_per_minute']} per minute, {report['workers']} workers, "
+        f"{report['llm_concurrency']} concurrent LLM requests).",
+        "",
+        "| # | Symbol | Action | Conf. | Last | 1d % | 5d % | 20d % | RSI | Rationale |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in report["results"]:
+        if r["status"] != "ok":
+            continue
+        change = r.get("change_pct", {})
+        rationale = (r.get("rationale") or "").replace("|", "/")
+        if len(rationale) > 160:
+            rationale = rationale[:157] + "..."
+        lines.append(
+            f"| {r['rank']} | {r['symbol']} | {r.get('action') or '-'} | {_fmt(r.get('confidence'), '{}')} "
+            f"| {_fmt(r.get('last_close'))} | {_fmt(change.get('1d'), '{:+.2f}')} "
+            f"| {_fmt(change.get('5d'), '{:+.2f}')} | {_fmt(change.get('20d'), '{:+.2f}')} "
+            f"| {_fmt((r.get('technicals') or {}).get('RSI'), '{}')} | {rationale} |"
+        )
+    failed = [r for r in report["results"] if r["status"] != "ok"]
+    if failed:
+        lines += ["", "## Failed", ""]
+        lines += [f"- {r['symbol']} ({r.get('stage')}): {r.get('error')}" for r in failed]
+    return "\n".join(lines) + "\n"
+
+def write_report(report: dict, out_dir: str = REPORT_DIR) -> tuple:
+    """Write reports/scan_<timestamp>.{json,md} and copies as scan_latest.{json,md}. Returns the two paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = report["generated"].replace(":", "").replace("-", "")
+    paths = []
+    for ext, content in (("json", json.dumps(report, indent=2, default=str)), ("md", markdown_report(report))):
+        path = os.path.join(out_dir, f"scan_{stamp}.{ext}")
+        for target in (path, os.path.join(out_dir, f"scan_latest.{ext}")):
+            tmp_path = target + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, target)
+        paths.append(path)
+    return tuple(paths)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the suggestion pipeline for the whole watchlist, headless.")
+    parser.add_argument("symbols", nargs="*", help="symbols (default: data/watchlist.json)")
+    parser.add_argument("--watchlist", default=WATCHLIST_FILE)
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS, help="threads for forecasts and technicals")
+    parser.add_argument("--llm-concurrency", type=int, default=SCAN_LLM_CONCURRENCY,
+                        help="max concurrent Ollama requests")
+    parser.add_argument("--no-llm", action="store_true", help="only run the numeric stages")
+    parser.add_argument("--no-cache", action="store_true", help="always ask the LLM, even if nothing changed")
+    parser.add_argument("--no-news", action="store_true", help="skip the news refresh (use stored headlines)")
+    parser.add_argument("--out", default=REPORT_DIR)
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output (prompts, answers)")
+    args = parser.parse_args(argv)
+
+    symbols = args.symbols or load_watchlist(args.watchlist)
+    if not symbols:
+        print(f"❌ No stocks in {args.watchlist}")
+        return 1
+
+    out = sys.stdout
+    def log(message):
+        print(message, file=out, flush=True)
+
+    log(f"🔎 Scanning {len(symbols)} symbols ({args.workers} workers, {args.llm_concurrency} LLM)…")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(out if args.verbose else devnull):
+        report = scan(symbols, workers=args.workers, llm_concurrency=args.llm_concurrency, use_llm=not args.no_llm,
+                      use_cache=not args.no_cache, refresh_news=not args.no_news, log=log)
+    json_path, md_path = write_report(report, args.out)
+    log(f"⏱️ {report['succeeded']}/{report['symbols']} symbols in {report['seconds']:.1f}s "
+        f"({report['symbols_per_minute']}/min); report: {md_path}, {json_path}")
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
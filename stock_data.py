@@ -1,14 +1,14 @@
-import yfinance as yf
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
 from datetime import datetime, timedelta
-import feedparser
 import re
 import urllib.parse
 
+# yfinance, requests/bs4 and feedparser are imported inside the functions that
+# use them, so importing this module (e.g. from the GUI) stays cheap.
+
 def get_price(symbol: str) -> float:
+    import yfinance as yf
     data = yf.Ticker(symbol)
     hist = data.history(period="1d")
     return round(hist['Close'].iloc[-1], 2) if not hist.empty else None
@@ -18,6 +18,8 @@ def get_moneycontrol_news(symbol: str, days: int = 90) -> list:
     Download news headlines for the last `days` days for the given symbol from Moneycontrol.
     Returns a list of dicts: [{"date": ..., "headline": ...}, ...]
     """
+    import requests
+    from bs4 import BeautifulSoup
     url = f"https://www.moneycontrol.com/india/stockpricequote/{symbol.lower()}"
     headers = {'User-Agent': 'Mozilla/5.0'}
     resp = requests.get(url, headers=headers)
@@ -49,6 +51,7 @@ def get_yahoo_news(symbol: str, days: int = 90) -> list:
     Fetch news headlines for the last `days` days for the given symbol from Yahoo Finance using yfinance.
     Returns a list of dicts: [{"date": ..., "headline": ...}, ...]
     """
+    import yfinance as yf
     ticker = yf.Ticker(symbol)
     news_items = []
     try:
@@ -66,15 +69,21 @@ def get_yahoo_news(symbol: str, days: int = 90) -> list:
         print(f"Failed to fetch Yahoo news for {symbol}: {e}")
     return news_items
 
-def get_google_news(symbol: str, days: int = 90) -> list:
-    """
-    Fetch news headlines for the last `days` days for the given symbol from Google News RSS.
-    Returns a list of dicts: [{"date": ..., "headline": ...}, ...]
-    """
+# Overridable so the news code can be pointed at a local fake RSS server.
+GOOGLE_NEWS_BASE = os.environ.get("GOOGLE_NEWS_BASE", "https://news.google.com")
+
+def google_news_url(symbol: str) -> str:
     query = symbol.replace('.NS', '') + ' stock'
     encoded_query = urllib.parse.quote(query)
-    url = f"https://news.google.com/rss/search?q={encoded_query}+when:90d&hl=en-IN&gl=IN&ceid=IN:en"
-    feed = feedparser.parse(url)
+    return f"{GOOGLE_NEWS_BASE}/rss/search?q={encoded_query}+when:90d&hl=en-IN&gl=IN&ceid=IN:en"
+
+def parse_google_news(source, days: int = 90) -> list:
+    """
+    Parse a Google News RSS feed (URL, file or raw bytes) into
+    [{"date": ..., "headline": ...}, ...], keeping the last `days` days.
+    """
+    import feedparser
+    feed = feedparser.parse(source)
     news_items = []
     cutoff = datetime.now() - timedelta(days=days)
     for entry in feed.entries:
@@ -90,23 +99,26 @@ def get_google_news(symbol: str, days: int = 90) -> list:
             news_items.append({"date": date.strftime("%Y-%m-%d"), "headline": clean_title})
     return news_items
 
-def download_all_news(watchlist_path='data/watchlist.json', news_path='data/news.json', days=90):
+def get_google_news(symbol: str, days: int = 90) -> list:
+    """
+    Fetch news headlines for the last `days` days for the given symbol from Google News RSS.
+    Returns a list of dicts: [{"date": ..., "headline": ...}, ...]
+    """
+    return parse_google_news(google_news_url(symbol), days)
+
+def download_all_news(watchlist_path='data/watchlist.json', news_path=None, days=90):
     """
-    Download news for all stocks in the watchlist and save to news_path using Google News RSS.
+    Download news for all stocks in the watchlist using Google News RSS and append new
+    headlines to the news table of data_repository (also exported to news_path, if given).
+    Feeds are fetched concurrently and served from the news cache while fresh (see news_service).
     """
+    from news_service import refresh_news_sync
+    from data_repository import DB_PATH
+
     if not os.path.exists(watchlist_path):
         print(f"Watchlist not found: {watchlist_path}")
         return
     with open(watchlist_path, 'r') as f:
         stocks = json.load(f).get('stocks', [])
-    all_news = {}
-    for symbol in stocks:
-        print(f"Fetching Google News for {symbol}...")
-        try:
-            all_news[symbol] = get_google_news(symbol, days)
-        except Exception as e:
-            print(f"Failed to fetch news for {symbol}: {e}")
-            all_news[symbol] = []
-    with open(news_path, 'w', encoding='utf-8') as f:
-        json.dump(all_news, f, indent=2, ensure_ascii=False)
-    print(f"News saved to {news_path}")
+    refresh_news_sync(stocks, days=days, news_path=news_path)
+    print(f"News saved to {news_path or DB_PATH}")
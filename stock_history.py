@@ -1,42 +1,23 @@
-import os
-import json
 import yfinance as yf
 import pandas as pd
+from history_store import (
+    load_history, history_source, append_history, frame_to_records, last_stored_date, records_to_dict,
+)
 
 def get_stock_history(symbol, years=10):
-    path = f"stock_history/{symbol}.json"
     end = pd.Timestamp.today().normalize()
-    start = end - pd.DateOffset(years=10)
+    start = end - pd.DateOffset(years=years)
 
-    os.makedirs("stock_history", exist_ok=True)
+    # Only fetch bars newer than what is already stored
+    last = last_stored_date(symbol)
+    if last is not None:
+        start = max(start, pd.Timestamp(last) + pd.Timedelta(days=1))
 
-    # Load existing data if available
-    if os.path.exists(path):
-        with open(path, "r") as f:
-            data = json.load(f)
-        existing_dates = set(pd.to_datetime(data.keys()))
-    else:
-        data = {}
-        existing_dates = set()
+    if start < end:
+        df = yf.download(symbol, start=start, end=end, progress=False)
+        if not df.empty:
+            append_history(symbol, frame_to_records(df))
 
-    # Download historical data
-    df = yf.download(symbol, start=start, end=end)
-    df = df[["Open", "High", "Low", "Close", "Volume"]]
-    df.index = pd.to_datetime(df.index).normalize()
-
-    for date in df.index:
-        if date in existing_dates:
-            continue
-        row = df.loc[date]
-        data[str(date.date())] = {
-            "open": float(row["Open"]),
-            "high": float(row["High"]),
-            "low": float(row["Low"]),
-            "close": float(row["Close"]),
-            "volume": int(row["Volume"])
-        }
-
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
-
-    return data
+    if history_source(symbol) is None:
+        return {}
+    return records_to_dict(load_history(symbol))
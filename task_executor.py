@@ -0,0 +1,216 @@
+import os
+import time
+import queue
+import itertools
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, CancelledError
+import tracing
+
+class TaskCancelled(Exception):
+    pass
+
+class TaskHandle:
+    """A submitted task: its status, stage timings and a way to cancel it."""
+
+    def __init__(self, task_id, name):
+        self.id = task_id
+        self.name = name
+        self.status = "queued"
+        self.started = None
+        self.finished = None
+        self.stages = []  # [(stage name, seconds)]
+        self.future = None
+        self.cancel_event = threading.Event()
+        self._on_cancel = []
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def cancel(self):
+        """Request cancellation: queued tasks never start, running ones stop at their next check."""
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+        for callback in list(self._on_cancel):
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback):
+        """Run `callback` (on the cancelling thread) when cancel() is called, e.g. to kill a subprocess."""
+        self._on_cancel.append(callback)
+        if self.cancelled:
+            callback()
+
+    def timings(self) -> str:
+        parts = [f"{name} {seconds:.1f}s" for name, seconds in self.stages]
+        return " · ".join(parts)
+
+class TaskContext:
+    """Passed to thread tasks so they can report progress, time stages and honour cancellation."""
+
+    def __init__(self, handle, events):
+        self.handle = handle
+        self._events = events
+
+    @property
+    def cancelled(self):
+        return self.handle.cancelled
+
+    def check_cancelled(self):
+        if self.handle.cancelled:
+            raise TaskCancelled(f"{self.handle.name} cancelled")
+
+    def progress(self, fraction=None, message=None, **extra):
+        """Report progress; any `extra` keys (e.g. a streamed token) are passed to on_progress as-is."""
+        self._events.put(("progress", self.handle, {"fraction": fraction, "message": message, **extra}))
+
+    @contextmanager
+    def stage(self, name):
+        self.check_cancelled()
+        self.progress(message=f"{self.handle.name}: {name}…")
+        start = time.monotonic()
+        try:
+            with tracing.span(name):
+                yield
+        finally:
+            self.handle.stages.append((name, time.monotonic() - start))
+        self.check_cancelled()
+
+class TaskExecutor:
+    """
+    Runs work off the Tk main thread and delivers results back on it.
+
+    Thread tasks are called as fn(ctx, *args) with a TaskContext; process
+    tasks are called as fn(*args) in a worker process and must be picklable.
+    Callbacks (on_done, on_error, on_progress, on_cancelled) always run on the
+    Tk thread: worker threads only put events on a queue that is drained by
+    a root.after() poll.
+    """
+
+    def __init__(self, root, thread_workers=None, process_workers=None, poll_ms=100,
+                 process_initializer=None, process_initargs=()):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.threads = ThreadPoolExecutor(max_workers=thread_workers or min(8, (os.cpu_count() or 2) + 2),
+                                          thread_name_prefix="task")
+        self._process_workers = process_workers or max(1, (os.cpu_count() or 2) - 1)
+        self._processes = None
+        self._process_init = (process_initializer, process_initargs)
+        self._events = queue.Queue()
+        self._ids = itertools.count(1)
+        self._callbacks = {}
+        self.running = {}
+        self.listeners = []  # called with (event, handle, payload) for every event, e.g. a status bar
+        self._closed = False
+        self.root.after(self.poll_ms, self._poll)
+
+    @property
+    def processes(self):
+        if self._processes is None:
+            # spawn, not fork: the parent has Tk and worker threads running
+            initializer, initargs = self._process_init
+            self._processes = ProcessPoolExecutor(max_workers=self._process_workers,
+                                                  mp_context=multiprocessing.get_context("spawn"),
+                                                  initializer=initializer, initargs=initargs)
+        return self._processes
+
+    def submit(self, fn, *args, name=None, on_done=None, on_error=None, on_progress=None,
+               on_cancelled=None, **kwargs) -> TaskHandle:
+        handle = self._new_handle(name or getattr(fn, "__name__", "task"),
+                                  on_done, on_error, on_progress, on_cancelled)
+        ctx = TaskContext(handle, self._events)
+
+        def run():
+            if handle.cancelled:
+                raise TaskCancelled(f"{handle.name} cancelled")
+            handle.status = "running"
+            handle.started = time.monotonic()
+            self._events.put(("started", handle, None))
+            return fn(ctx, *args, **kwargs)
+
+        handle.future = self.threads.submit(run)
+        handle.future.add_done_callback(lambda f: self._finished(handle, f))
+        return handle
+
+    def submit_process(self, fn, *args, name=None, on_done=None, on_error=None,
+                       on_cancelled=None, **kwargs) -> TaskHandle:
+        handle = self._new_handle(name or getattr(fn, "__name__", "task"), on_done, on_error, None, on_cancelled)
+        handle.status = "running"
+        handle.started = time.monotonic()
+        handle.future = self.processes.submit(fn, *args, **kwargs)
+        self._events.put(("started", handle, None))
+        handle.future.add_done_callback(lambda f: self._finished(handle, f))
+        return handle
+
+    def cancel_all(self):
+        for handle in list(self.running.values()):
+            handle.cancel()
+
+    def shutdown(self):
+        self._closed = True
+        self.cancel_all()
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    def _new_handle(self, name, on_done, on_error, on_progress, on_cancelled):
+        handle = TaskHandle(next(self._ids), name)
+        self._callbacks[handle.id] = (on_done, on_error, on_progress, on_cancelled)
+        self.running[handle.id] = handle
+        return handle
+
+    def _finished(self, handle, future):
+        handle.finished = time.monotonic()
+        if handle.started is None:
+            handle.started = handle.finished
+        try:
+            result = future.result()
+        except (CancelledError, TaskCancelled):
+            self._events.put(("cancelled", handle, None))
+            return
+        except Exception as e:
+            self._events.put(("error", handle, e))
+            return
+        if handle.cancelled:
+            self._events.put(("cancelled", handle, None))
+        else:
+            self._events.put(("done", handle, result))
+
+    def _poll(self):
+        if self._closed:
+            return
+        try:
+            while True:
+                event, handle, payload = self._events.get_nowait()
+                self._dispatch(event, handle, payload)
+        except queue.Empty:
+            pass
+        self.root.after(self.poll_ms, self._poll)
+
+    def _dispatch(self, event, handle, payload):
+        on_done, on_error, on_progress, on_cancelled = self._callbacks.get(handle.id, (None,) * 4)
+        if event in ("done", "error", "cancelled"):
+            handle.status = event
+            self.running.pop(handle.id, None)
+            self._callbacks.pop(handle.id, None)
+        callback = {"done": on_done, "error": on_error, "progress": on_progress, "cancelled": on_cancelled}.get(event)
+        try:
+            if callback is not None and event == "cancelled":
+                callback()
+            elif callback is not None:
+                callback(payload)
+            for listener in list(self.listeners):
+                listener(event, handle, payload)
+        except Exception as e:
+            print(f"⚠️ Task callback for {handle.name} failed: {e}")
@@ -0,0 +1,127 @@
+import json
+import argparse
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_RESPONSE = (
+    "Action: Hold\n"
+    "Confidence: 70\n"
+    "Rationale: Fake Ollama response for local testing. Price is near the 20-day average.\n"
+)
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for Ollama's POST /api/generate. Supports streaming
+    (NDJSON over chunked transfer encoding) and non-streaming responses over
+    keep-alive HTTP/1.1, with configurable latency. Every request and every
+    new TCP connection is recorded on the server.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with server.lock:
+            server.requests.append(payload)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if self.path != "/api/generate":
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+                return
+            if server.fail_next > 0:
+                with server.lock:
+                    server.fail_next -= 1
+                self._send_json(503, {"error": "fake: simulated overload"})
+                return
+            time.sleep(server.first_token_delay)
+            tokens = server.response_text.split(" ")
+            tokens = [t + " " for t in tokens[:-1]] + tokens[-1:]
+            stats = {"prompt_eval_count": len(payload.get("prompt", "")) // 4, "eval_count": len(tokens)}
+            if payload.get("stream", True):
+                self._stream(payload, tokens, stats)
+            else:
+                time.sleep(server.token_delay * len(tokens))
+                self._send_json(200, {"model": payload.get("model"), "response": "".join(tokens),
+                                      "done": True, **stats})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, payload, tokens, stats):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                self._chunk({"model": payload.get("model"), "response": token, "done": False})
+                time.sleep(self.server.token_delay)
+            self._chunk({"model": payload.get("model"), "response": "", "done": True, **stats})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with self.server.lock:
+                self.server.aborted += 1
+            self.close_connection = True
+
+    def _chunk(self, data):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_ollama(port=0, first_token_delay=0.05, token_delay=0.01, response_text=DEFAULT_RESPONSE):
+    """
+    Start the fake server on a background thread. Returns (server, generate_url);
+    point llm_client.OLLAMA_API (or the OLLAMA_API env var) at generate_url.
+    Tune server.first_token_delay / token_delay / fail_next at runtime.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.handle_error = lambda request, client_address: None  # clients hanging up early is expected
+    server.first_token_delay = first_token_delay
+    server.token_delay = token_delay
+    server.response_text = response_text
+    server.fail_next = 0
+    server.requests = []
+    server.connections = 0
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.aborted = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Ollama /api/generate endpoint for local testing.")
+    parser.add_argument("port", type=int, nargs="?", default=11435)
+    parser.add_argument("--first-token", type=float, default=0.5, help="delay before the first token (s)")
+    parser.add_argument("--token", type=float, default=0.05, help="delay between tokens (s)")
+    parser.add_argument("--fail", type=int, default=0, help="answer the first N requests with 503")
+    args = parser.parse_args()
+    server, url = start_fake_ollama(args.port, first_token_delay=args.first_token, token_delay=args.token)
+    server.fail_next = args.fail
+    print(f"Fake Ollama on {url} (set OLLAMA_API={url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
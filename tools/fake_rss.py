@@ -0,0 +1,79 @@
+import sys
+import time
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+FEED_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>{query}</title>
+{items}
+</channel></rss>"""
+ITEM_TEMPLATE = "<item><title>{title}</title><pubDate>{date}</pubDate></item>"
+
+class FakeRSSHandler(BaseHTTPRequestHandler):
+    """
+    Serves a small Google-News-style RSS feed for any /rss/search?q=... URL,
+    with a stable ETag / Last-Modified per query and 304 responses to matching
+    conditional requests. Every request is recorded on the server.
+    """
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        etag = '"' + hashlib.sha1(f"{query}\n{server.version}".encode("utf-8")).hexdigest() + '"'
+        with server.lock:
+            server.requests.append({"path": self.path, "if_none_match": self.headers.get("If-None-Match")})
+        if server.delay:
+            time.sleep(server.delay)
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        now = time.time()
+        items = "\n".join(
+            ITEM_TEMPLATE.format(title=f"{query} headline {i}", date=formatdate(now - i * 86400, usegmt=True))
+            for i in range(server.items_per_feed)
+        )
+        body = FEED_TEMPLATE.format(query=query, items=items).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", server.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_rss_server(port=0, delay=0.0, items_per_feed=5):
+    """
+    Start the fake feed server on a background thread. Returns (server, base_url);
+    point stock_data.GOOGLE_NEWS_BASE at base_url and call server.shutdown() when done.
+    Bump server.version to make every feed change (new ETag).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeRSSHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.items_per_feed = items_per_feed
+    server.version = 0
+    server.last_modified = formatdate(time.time(), usegmt=True)
+    server.requests = []
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server, url = start_fake_rss_server(port)
+    print(f"Fake RSS server on {url} (set GOOGLE_NEWS_BASE={url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
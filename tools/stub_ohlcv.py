@@ -0,0 +1,51 @@
+import os
+import json
+import time
+import threading
+import pandas as pd
+from history_store import FIELDS, records_from_dict, days_to_dates
+
+class StubOHLCVFetcher:
+    """
+    Offline stand-in for history_downloader.YFinanceFetcher that serves canned
+    OHLCV responses from `<canned_dir>/<SYMBOL>.json` (the legacy
+    stock_history JSON layout). `latency` adds a per-call delay and
+    `fail_first` makes the first N calls raise, to exercise concurrency,
+    rate limiting and retries without touching the network.
+    """
+    host = "stub"
+
+    def __init__(self, canned_dir: str, latency: float = 0.0, fail_first: int = 0):
+        self.canned_dir = canned_dir
+        self.latency = latency
+        self.fail_first = fail_first
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _frame(self, symbol, start, end):
+        path = os.path.join(self.canned_dir, f"{symbol}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            records = records_from_dict(json.load(f))
+        dates = days_to_dates(records["date"])
+        mask = (dates >= start) & (dates < end)
+        return pd.DataFrame(
+            {field.capitalize(): records[field][mask] for field in FIELDS},
+            index=pd.DatetimeIndex(dates[mask].astype("datetime64[D]"), name="Date"),
+        )
+
+    def __call__(self, symbols, start, end) -> dict:
+        with self.lock:
+            self.calls.append({"symbols": list(symbols), "start": start, "end": end, "time": time.monotonic()})
+            failing = len(self.calls) <= self.fail_first
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            raise ConnectionError("stub: simulated transient failure")
+        frames = {}
+        for symbol in symbols:
+            df = self._frame(symbol, start, end)
+            if df is not None:
+                frames[symbol] = df
+        return frames
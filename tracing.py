@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+
+# Per-stage timings of the suggestion pipeline. trace() starts a trace and
+# span() times a stage inside it; spans nest through a context variable, so
+# nesting follows each thread's call stack and carries into asyncio tasks.
+# Spans opened outside a trace do nothing, so the instrumented helpers cost
+# nothing when called on their own (backtests, scans, the CLI). Every
+# finished trace is appended to TRACE_FILE as one JSON line and handed to the
+# registered listeners (the GUI timing panel).
+TRACE_ENABLED = os.environ.get("TRACE", "1") != "0"
+TRACE_FILE = os.environ.get("TRACE_FILE", "data/traces.jsonl")
+# The file is rolled over to TRACE_FILE.1 … .N when it grows past this size.
+TRACE_MAX_BYTES = int(os.environ.get("TRACE_MAX_BYTES", 5 * 1024 * 1024))
+TRACE_BACKUPS = int(os.environ.get("TRACE_BACKUPS", 3))
+
+_current = contextvars.ContextVar("trace_span", default=None)
+_write_lock = threading.Lock()
+listeners = []
+
+class Span:
+    __slots__ = ("name", "attrs", "children", "parent", "trace_id", "start", "_t0", "duration_ms", "_token")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+        self.parent = None
+        self.trace_id = None
+        self.duration_ms = None
+
+    def set(self, **attrs):
+        """Attach attributes (token counts, cache hits, ...) to the span."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.parent = _current.get()
+        self.trace_id = self.parent.trace_id if self.parent is not None else uuid.uuid4().hex[:12]
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            _current.set(self.parent)  # exited in another context (e.g. a generator finalized elsewhere)
+        if self.parent is not None:
+            self.parent.children.append(self)
+        else:
+            _finish(self)
+        return False
+
+    def to_dict(self, origin=None) -> dict:
+        origin = self.start if origin is None else origin
+        out = {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+        }
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.children:
+            out["children"] = [child.to_dict(origin) for child in self.children]
+        return out
+
+class _NullSpan:
+    """Returned while tracing is off: entering, exiting and set() do nothing."""
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+def trace(name: str, **attrs):
+    """Start a trace (or a span, if one is already open): `with trace("app.suggest_trade", symbol=s): ...`."""
+    if not TRACE_ENABLED:
+        return NULL_SPAN
+    return Span(name, attrs)
+
+def span(name: str, **attrs):
+    """Context manager timing one stage of the current trace: `with span("predict", symbol=s) as sp: ...`."""
+    if not TRACE_ENABLED or _current.get() is None:
+        return NULL_SPAN
+    return Span(name, attrs)
+
+def current_span():
+    """The innermost open span, or NULL_SPAN (so `current_span().set(...)` is always safe)."""
+    if not TRACE_ENABLED:
+        return NULL_SPAN
+    return _current.get() or NULL_SPAN
+
+def set_attrs(**attrs):
+    current_span().set(**attrs)
+
+def set_enabled(enabled: bool):
+    global TRACE_ENABLED
+    TRACE_ENABLED = bool(enabled)
+
+def _rotate(path):
+    for i in range(TRACE_BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{path}.{i}"):
+            os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+    if TRACE_BACKUPS > 0:
+        os.replace(path, f"{path}.1")
+    else:
+        os.remove(path)
+
+def _finish(root: Span):
+    record = {"trace_id": root.trace_id, "time": round(root.start, 3), **root.to_dict()}
+    if TRACE_FILE:
+        try:
+            line = json.dumps(record, default=str) + "\n"
+            with _write_lock:
+                os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+                if os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) + len(line) > TRACE_MAX_BYTES:
+                    _rotate(TRACE_FILE)
+                with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            print(f"⚠️ Failed to write trace: {e}")
+    for listener in list(listeners):
+        try:
+            listener(record)
+        except Exception as e:
+            print(f"⚠️ Trace listener failed: {e}")
+
+def load_traces(limit: int = None, path: str = None) -> list:
+    """The most recent traces from the current JSONL file, oldest first."""
+    path = path or TRACE_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    if limit:
+        lines = lines[-limit:]
+    traces = []
+    for line in lines:
+        try:
+            traces.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue  # a line cut short by a crash
+    return traces
+
+def format_trace(record: dict, indent: str = "  ") -> list:
+    """Indented "name  123.4 ms  key=value" lines for a trace record."""
+    lines = []
+
+    def walk(node, depth):
+        attrs = " ".join(f"{k}={v}" for k, v in node.get("attrs", {}).items())
+        lines.append(f"{indent * depth}{node['name']:<{max(1, 36 - len(indent) * depth)}} "
+                     f"{node['duration_ms']:>9.1f} ms  {attrs}".rstrip())
+        for child in node.get("children", []):
+            walk(child, depth + 1)
+    walk(record, 0)
+    return lines
+
+def stage_summary(traces: list) -> dict:
+    """{span name: {"count", "median_ms", "max_ms"}} over every span in `traces`."""
+    durations = {}
+
+    def walk(node):
+        durations.setdefault(node["name"], []).append(node["duration_ms"])
+        for child in node.get("children", []):
+            walk(child)
+    for record in traces:
+        walk(record)
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {"count": len(values), "median_ms": values[len(values) // 2], "max_ms": values[-1]}
+    return summary
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--last"]:
+        for record in load_traces(int(args[1]) if len(args) > 1 else 1):
+            print("\n".join(format_trace(record)))
+            print()
+    elif args == ["--summary"]:
+        for name, s in stage_summary(load_traces()).items():
+            print(f"{name:<40} {s['count']:>5}× median {s['median_ms']:>9.1f} ms  max {s['max_ms']:>9.1f} ms")
+    else:
+        print("Usage: python tracing.py --last [N] | --summary")
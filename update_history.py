@@ -2,11 +2,15 @@
 
 import os
 import json
+import argparse
 import yfinance as yf
 from datetime import datetime
+from history_store import HISTORY_DIR, append_history, merge_history, frame_to_records
+from history_downloader import (
+    DEFAULT_WORKERS, DEFAULT_BATCH_SIZE, download_start, download_watchlist, print_report,
+)
 
 WATCHLIST_FILE = "data/watchlist.json"
-HISTORY_DIR = "stock_history"
 
 if not os.path.exists(HISTORY_DIR):
     os.makedirs(HISTORY_DIR)
@@ -18,44 +22,52 @@ def load_watchlist():
             return data.get("stocks", [])
     return []
 
-def download_and_update(symbol):
+def download_and_update(symbol, incremental=True):
+    """
+    Fetch bars for `symbol` and add them to its history. In incremental mode
+    only bars after the last stored date are downloaded and appended; a full
+    run (incremental=False) re-downloads from FULL_HISTORY_START and backfills gaps.
+    """
     try:
-        path = os.path.join(HISTORY_DIR, f"{symbol}.json")
-        existing_data = {}
-
-        if os.path.exists(path):
-            with open(path, "r") as f:
-                existing_data = json.load(f)
-
-        start = "2013-01-01"
+        start = download_start(symbol, incremental)
         end = datetime.today().strftime("%Y-%m-%d")
-        data = yf.download(symbol, start=start, end=end)
+        if start >= end:
+            print(f"✅ {symbol} already up to date")
+            return
+
+        data = yf.download(symbol, start=start, end=end, progress=False)
         if data.empty:
             print(f"⚠️ No data for {symbol}")
             return
 
-        for index, row in data.iterrows():
-            day = index.strftime("%Y-%m-%d")
-            if day not in existing_data:
-                existing_data[day] = {
-                    "open": float(row["Open"]),
-                    "high": float(row["High"]),
-                    "low": float(row["Low"]),
-                    "close": float(row["Close"]),
-                    "volume": int(row["Volume"])
-                }
-
-        with open(path, "w") as f:
-            json.dump(existing_data, f, indent=2)
+        records = frame_to_records(data)
+        if incremental:
+            added = append_history(symbol, records)
+        else:
+            added = merge_history(symbol, records)
 
-        print(f"✅ Updated {symbol}")
+        print(f"✅ Updated {symbol} (+{added} rows)")
 
     except Exception as e:
         print(f"❌ Failed to update {symbol}: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update stock_history/ for every watchlist symbol.")
+    parser.add_argument("--full", action="store_true", help="Re-download from 2013 and backfill gaps")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--rate", type=float, help="Max requests per second to Yahoo")
+    parser.add_argument("--stub", metavar="DIR", help="Serve canned <SYMBOL>.json responses from DIR instead of Yahoo")
+    args = parser.parse_args()
+
     symbols = load_watchlist()
     if not symbols:
         print("❌ No stocks in watchlist.json")
-    for sym in symbols:
-        download_and_update(sym)
+    else:
+        fetcher = None
+        if args.stub:
+            from tools.stub_ohlcv import StubOHLCVFetcher
+            fetcher = StubOHLCVFetcher(args.stub)
+        statuses = download_watchlist(symbols, incremental=not args.full, workers=args.workers,
+                                      batch_size=args.batch_size, rate=args.rate, fetcher=fetcher)
+        print_report(statuses)